@@ -0,0 +1,146 @@
+# HABMODEL_BuildSpeciesModels.py
+#
+# Description: Runs the full habitat modeling chain for a list of species, rebuilding
+#  only the files that are out of date, as "make" does:
+#
+#   AllHUC8Records.csv  (HABMODEL_CreateDataFileBatch)
+#   SH_Correlations.csv (HABMODEL_SHCorrelate)
+#   RV_Correlations.csv (HABMODEL_CalculateCrossCorrelations)
+#   [spp]_RedundantVars.html (HABMODEL_PruneRedundantVariables, if a rankings table is
+#                             given; otherwise the existing file is used)
+#   [spp]_SWD.csv       (HABMODEL_CreateSWDFile)
+#   RunMaxent.bat       (HABMODEL_CreateMaxentBatchFile)
+#   Output\maxentResults.csv (MaxEnt, see HABMODEL_MaxentJobs)
+#
+# Each tool is run in its own process and skips its work if its outputs are up to date
+#  with its inputs (see HABMODEL_BuildStamps). The data files are always re-extracted,
+#  but only replaced if their contents change, so editing one response variable only
+#  rebuilds the files (and species) that depend on it.
+#
+# Fall 2026
+
+import sys, os, subprocess, multiprocessing, arcpy
+import HABMODEL_DataTools as dataTools
+import HABMODEL_BuildStamps as buildStamps
+import HABMODEL_MaxentJobs as maxentJobs
+
+# Input variables
+speciesTbl = arcpy.GetParameterAsText(0)     # Table of all ENDRIES surveyed catchments with a binary column for each species presence
+speciesNames = arcpy.GetParameterAsText(1)   # Species to model (semicolon separated); each should be a field in the above table
+envVarsTbl = arcpy.GetParameterAsText(2)     # Table listing all the catchment attributes to be used as environment layer values
+statsFolder = arcpy.GetParameterAsText(3)    # Root folder holding a subfolder for each species
+envRankingsXLS = arcpy.GetParameterAsText(4) # Optional: variable rankings table; if given, redundant variables are selected automatically
+threshold = arcpy.GetParameterAsText(5)      # Optional: cross correlation threshold for redundant variables (default 0.7)
+maxJobs = arcpy.GetParameterAsText(6)        # Optional: number of MaxEnt runs at once (default 1)
+rebuildAll = arcpy.GetParameterAsText(7)     # Optional: whether to rebuild all outputs, even if up to date (default false)
+javaCmd = arcpy.GetParameterAsText(8)        # Optional: command used in place of "java" (default: java)
+
+if threshold in ("","#"): threshold = "0.7"
+if maxJobs in ("","#"): maxJobs = 1
+else: maxJobs = int(maxJobs)
+rebuildAll = rebuildAll == "true"
+if javaCmd in ("","#"): javaCmd = "java"
+
+# Script variables
+scriptsDir = os.path.dirname(sys.argv[0])
+
+## ---Functions---
+def msg(txt,type="message"):
+    print txt
+    if type == "message":
+        arcpy.AddMessage(txt)
+    elif type == "warning":
+        arcpy.AddWarning(txt)
+    elif type == "error":
+        arcpy.AddError(txt)
+
+def runTool(scriptName,args):
+    #Runs the tool script in its own process, relaying its messages. Empty arguments
+    # are passed as "#". Returns True if the tool succeeded.
+    cmd = [dataTools.pythonExecutable(),os.path.join(scriptsDir,scriptName)]
+    cmd += [arg if arg else "#" for arg in args]
+    proc = subprocess.Popen(cmd,stdout=subprocess.PIPE,stderr=subprocess.STDOUT)
+    for line in iter(proc.stdout.readline,""):
+        msg("   " + line.rstrip())
+    returnCode = proc.wait()
+    if returnCode != 0:
+        msg("{} failed (return code {})".format(scriptName,returnCode),"warning")
+    return returnCode == 0
+
+## ---Processes---
+if maxJobs < 1:
+    msg("The number of MaxEnt runs at once must be at least 1.\nExiting.","error")
+    sys.exit(1)
+
+sppNames = []
+for sppName in speciesNames.split(";"):
+    sppName = sppName.strip().strip("'")
+    if sppName and not sppName in sppNames:
+        sppNames.append(sppName)
+msg("{} species to process".format(len(sppNames)))
+
+# Remove the stamps of all outputs so they are rebuilt
+if rebuildAll:
+    msg("Removing build stamps")
+    for sppName in sppNames:
+        sppFolder = os.path.join(statsFolder,sppName)
+        for fileName in ("SH_Correlations.csv","RV_Correlations.csv","{}_RedundantVars.html".format(sppName),"{}_SWD.csv".format(sppName)):
+            buildStamps.removeStamp(os.path.join(sppFolder,fileName))
+        buildStamps.removeStamp(None,maxentJobs.jobStampFilename(os.path.join(sppFolder,"RunMaxent.bat")))
+
+# Extract the data files of all species (replaced only if changed)
+msg("Creating data files")
+if not runTool("HABMODEL_CreateDataFileBatch.py",[speciesTbl,";".join(sppNames),envVarsTbl,statsFolder]):
+    msg("Data files could not be created.\nExiting.","error")
+    sys.exit(1)
+
+# Compute the correlations and select the redundant variables of each species
+for sppName in list(sppNames):
+    msg("Processing {}".format(sppName))
+    sppFolder = os.path.join(statsFolder,sppName)
+    speciesCSV = os.path.join(sppFolder,"AllHUC8Records.csv")
+    shCorrCSV = os.path.join(sppFolder,"SH_Correlations.csv")
+    rvCorrCSV = os.path.join(sppFolder,"RV_Correlations.csv")
+    redundantHTML = os.path.join(sppFolder,"{}_RedundantVars.html".format(sppName))
+    if not os.path.exists(speciesCSV):
+        msg("   No data file for {}; skipping".format(sppName),"warning")
+        sppNames.remove(sppName)
+        continue
+    ok = runTool("HABMODEL_SHCorrelate.py",[speciesCSV,shCorrCSV])
+    ok = ok and runTool("HABMODEL_CalculateCrossCorrelations.py",[speciesCSV,shCorrCSV,threshold,rvCorrCSV])
+    if envRankingsXLS not in ("","#"):
+        ok = ok and runTool("HABMODEL_PruneRedundantVariables.py",[shCorrCSV,rvCorrCSV,envRankingsXLS,redundantHTML])
+    elif ok and not os.path.exists(redundantHTML):
+        msg("   {} not found; select redundant variables with HABMODEL_VisualizeCorrelations".format(redundantHTML),"warning")
+        ok = False
+    if not ok:
+        msg("   Skipping the rest of the models for {}".format(sppName),"warning")
+        sppNames.remove(sppName)
+if len(sppNames) == 0:
+    msg("No species left to model.\nExiting.","error")
+    sys.exit(1)
+
+# Create the SWD files
+msg("Creating SWD files")
+if not runTool("HABMODEL_CreateSWDFile.py",[";".join(sppNames),statsFolder]):
+    msg("SWD files could not be created.\nExiting.","error")
+    sys.exit(1)
+
+# Create the MaxEnt batch files (unchanged batch files don't make the runs stale)
+msg("Creating MaxEnt batch files")
+jobs = []
+for sppName in sppNames:
+    sppFolder = os.path.join(statsFolder,sppName)
+    if runTool("HABMODEL_CreateMaxentBatchFile.py",[os.path.join(sppFolder,"{}_SWD.csv".format(sppName)),"true"]):
+        jobs.append(os.path.join(sppFolder,"RunMaxent.bat"))
+
+# Run the out of date MaxEnt models
+msg("Running MaxEnt")
+results = maxentJobs.runJobs(jobs,maxJobs,multiprocessing.cpu_count(),None,javaCmd,msg,skipUpToDate=True)
+for batchFN, returnCode, seconds in results:
+    if returnCode != 0:
+        msg("{} failed (return code {}); see {}".format(batchFN,returnCode,maxentJobs.logFilename(batchFN)),"warning")
+msg("{} of {} MaxEnt models were rebuilt".format(len(results),len(jobs)))
+
+# Set the output parameters
+arcpy.SetParameterAsText(9,";".join([os.path.join(statsFolder,sppName) for sppName in sppNames]))  #Output species folders
@@ -0,0 +1,129 @@
+# HABMODEL_BuildStamps.py
+#
+# Description: Build stamps let the modeling tools skip work whose outputs are already
+#  up to date, as "make" does. This is a helper module imported by the scripts in this
+#  folder; it is not run as a tool itself.
+#
+# When a tool writes an output it also writes a stamp file (the output's name plus
+#  ".stamp.json") recording the MD5 hash of each of its input files and the parameters
+#  that affect the output. The next time the tool is run, it skips the work if the
+#  outputs exist and the inputs and parameters still hash to the same key. Because the
+#  key depends on file contents rather than time stamps, rewriting a file with the same
+#  contents does not make the tools downstream of it stale.
+#
+# File hashes are cached in the stamp along with each file's size and time stamp, so an
+#  input is only re-hashed when one of those has changed. Inputs that are not files
+#  (e.g. geodatabase tables) can't be hashed and always make the output stale; an
+#  Excel sheet (e.g. "ResponseVars.xlsx\Sheet1$") is hashed as its workbook file.
+#
+# Fall 2026
+
+import os, json, hashlib
+import HABMODEL_DataTools as dataTools
+
+STAMPSUFFIX = ".stamp.json"
+
+## ---Functions---
+def stampFilename(outFN):
+    #Returns the name of the stamp file of the output
+    return outFN + STAMPSUFFIX
+
+def inputFile(path):
+    #Returns the file holding the input: the path itself, or the first parent of the
+    # path that is a file (e.g. the workbook of an Excel sheet). None if there is none.
+    while path and not os.path.isfile(path):
+        parent = os.path.dirname(path)
+        if parent == path or os.path.isdir(path): return None
+        path = parent
+    return path or None
+
+def inputHashes(inputs,cached=None):
+    #Returns a list of the size, time stamp and hash of each input file. Hashes in the
+    # cached list (from a stamp) are reused if the file's size and time stamp match.
+    cachedDict = {}
+    for item in cached or []:
+        cachedDict[item["path"]] = item
+    hashes = []
+    for path in inputs:
+        fileName = inputFile(path)
+        if fileName is None:
+            hashes.append({"path":path,"md5":None})
+            continue
+        fileStat = os.stat(fileName)
+        item = cachedDict.get(path)
+        if not (item and item.get("size") == fileStat.st_size and item.get("mtime") == fileStat.st_mtime):
+            item = {"path":path,"size":fileStat.st_size,"mtime":fileStat.st_mtime,"md5":dataTools.fileHash(fileName)}
+        hashes.append(item)
+    return hashes
+
+def buildKey(hashes,params):
+    #Returns the key of the input hashes (in order) and the parameters
+    if [item for item in hashes if item["md5"] is None]:
+        return None
+    keyText = json.dumps({"inputs":[item["md5"] for item in hashes],"params":params},sort_keys=True)
+    return hashlib.md5(keyText.encode("utf-8")).hexdigest()
+
+def readStamp(stampFN):
+    #Returns the contents of the stamp file, or None if it doesn't exist or can't be read
+    if not os.path.exists(stampFN):
+        return None
+    try:
+        f = open(stampFN,'r')
+        stamp = json.load(f)
+        f.close()
+        return stamp
+    except ValueError:
+        return None
+
+def isUpToDate(outputs,inputs,params,stampFN=None):
+    #Returns True if the outputs all exist and were built from inputs and parameters
+    # with the same key as now. The stamp is that of the first output unless given.
+    if stampFN is None: stampFN = stampFilename(outputs[0])
+    if [outFN for outFN in outputs if not os.path.exists(outFN)]:
+        return False
+    stamp = readStamp(stampFN)
+    if stamp is None or stamp.get("key") is None:
+        return False
+    return buildKey(inputHashes(inputs,stamp.get("inputs")),params) == stamp["key"]
+
+def writeStamp(outputs,inputs,params,stampFN=None):
+    #Writes the stamp of the outputs built from the inputs and parameters
+    if stampFN is None: stampFN = stampFilename(outputs[0])
+    hashes = inputHashes(inputs)
+    stamp = {"outputs":[os.path.basename(outFN) for outFN in outputs],
+             "inputs":hashes,
+             "params":params,
+             "key":buildKey(hashes,params)}
+    f = open(stampFN,'w')
+    json.dump(stamp,f,indent=1,sort_keys=True)
+    f.close()
+
+def removeStamp(outFN,stampFN=None):
+    #Removes the stamp of the output so it is rebuilt the next time
+    if stampFN is None: stampFN = stampFilename(outFN)
+    if os.path.exists(stampFN):
+        os.remove(stampFN)
+
+def replaceFile(newFN,outFN):
+    #Replaces the output file with the new file
+    if os.path.exists(outFN):
+        os.remove(outFN)
+    os.rename(newFN,outFN)
+
+def replaceIfChanged(newFN,outFN,companions=()):
+    #Replaces the output file with the new file only if their contents differ, so an
+    # unchanged output keeps its time stamp. Companion (new file, output file) pairs,
+    # such as a CSV file's sidecar, are replaced along with it, or else deleted.
+    # Returns True if the output was replaced.
+    changed = not (os.path.exists(outFN) and dataTools.fileHash(newFN) == dataTools.fileHash(outFN))
+    for fileNames in [(newFN,outFN)] + list(companions):
+        if not os.path.exists(fileNames[0]): continue
+        if changed: replaceFile(*fileNames)
+        else: os.remove(fileNames[0])
+    return changed
+
+def replaceDataFile(newCSV,csvFN):
+    #Replaces the species CSV file and its binary sidecar with the new ones if the
+    # CSV file's contents differ (see replaceIfChanged)
+    companions = list(zip(dataTools.sidecarFilenames(newCSV),dataTools.sidecarFilenames(csvFN)))
+    return replaceIfChanged(newCSV,csvFN,companions)
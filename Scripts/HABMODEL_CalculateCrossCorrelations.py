@@ -6,16 +6,27 @@
 #  presence/absence) and computes pairwise correlation coefficients for all variables,
 #  producing a table of variable pairs and their coefficients.  
 #
+#  If a memory limit is given, the data file is read in chunks sized to fit the limit
+#  and the correlations are computed from running sums (see HABMODEL_CorrelationTools)
+#  so files larger than memory can be processed.
+#
+#  The tool is skipped if RV_Correlations.csv is up to date with the input files and
+#  threshold (see HABMODEL_BuildStamps).
+#
 # Spring 2015
 # John.Fay@duke.edu
 
-import sys, os, csv, arcpy, numpy
+import sys, os, csv, arcpy, numpy, datetime
+import HABMODEL_DataTools as dataTools
+import HABMODEL_CorrelationTools as corTools
+import HABMODEL_BuildStamps as buildStamps
 arcpy.env.overwriteOutput = 1
 
 # Input variables
 speciesCSV = arcpy.GetParameterAsText(0)
 shCorrCSV = arcpy.GetParameterAsText(1)
 threshold = arcpy.GetParameterAsText(2)
+memLimit = arcpy.GetParameterAsText(4)      #(Optional) Maximum memory (MB) to use; if given, data are read in chunks
 
 # Output variables
 coeffCSV = os.path.join(os.path.dirname(speciesCSV),"RV_Correlations.csv")
@@ -33,59 +44,70 @@ def msg(txt,type="message"):
         arcpy.AddError(txt)
         
 ## ---Processes---
+#Skip the tool if the output is up to date
+stampParams = {"tool":"CalculateCrossCorrelations","threshold":float(threshold)}
+if buildStamps.isUpToDate([coeffCSV],[speciesCSV,shCorrCSV],stampParams):
+    msg("{} is up to date".format(coeffCSV))
+    sys.exit(0)
+
+#Initialize the log file
+now = datetime.datetime.now()
+logFile = open(logFilename,'w')
+logFile.write("INFO ON RESPONSE VARIABLE CROSS CORRELATIONS\n")
+logFile.write("File created at {}:{} on {}/{}/{}\n".format(now.hour,now.minute,now.month,now.day,now.year))
+
 #Read in columns to process
 msg("...Reading in fields")
-colNames = []               # Create an empty list to add field names to 
+colNames = set()            # Create an empty set to add field names to
 f = open(shCorrCSV,'rt')    # Open the csv file
-line = f.readline()         # Skip the header line
-line = f.readline()         # Get the first data line
-while line:                 # Loop through the remaining lines
-    lineData = f.readline().split(",")  # Get the string in the line and split it into a list
+f.readline()                # Skip the header line
+for lineData in csv.reader(f):          # Loop through the data lines
     if len(lineData) > 1:               # If the line includes field names (the last one may not)
         colName = lineData[0].strip()              # Get the column name (first item)
         colName = colName.replace('"','')          # Remove any quotes
-        colNames.append(colName)                   # Add the column name to the list 
-    line = f.readline()                 # Go to the next line in the CSV file
+        colNames.add(colName)                      # Add the column name to the set
 f.close()                   # Close the file
 msg("...{} columns to analyze".format(len(colNames)))
 
 #Read in all the column header names (from the full data file)
 msg("...Reading in column header names")
-f = open(speciesCSV,'rt')
-headerText = f.readline()
-headerItems = headerText.split(",")
-f.close()
+headerItems = dataTools.readColumnNames(speciesCSV)
 
-#Read in the csv file as a numpy vector
-msg("...Reading in data")
-arrData = numpy.genfromtxt(speciesCSV,delimiter=",")
+#Get the data columns to analyze, in the order they appear in the data file
+cols = []
+selNames = []
+for i in range(len(headerItems)):
+    if headerItems[i] in colNames and not headerItems[i] in selNames:
+        cols.append(i)
+        selNames.append(headerItems[i])
 
-#Create variables from data array
-nCols = arrData.shape[1]
+#Compute the correlation matrix of all the columns at once and get the pairs
+# (upper triangle of the matrix) with coefficients at or above the threshold
+if memLimit in ("","#"):
+    #Read in the data (memory-mapped from the CSV file's binary sidecar)
+    msg("...Reading in data")
+    header, arrData = dataTools.loadRecords(speciesCSV)
+    msg("Computing correlation values")
+    rows1, rows2, coeffs = corTools.correlatedPairs(arrData[:,cols],float(threshold))
+else:
+    #Set the number of records to read at a time to stay within the memory limit
+    chunkRows, peakMB = corTools.streamingChunkSize(float(memLimit),len(headerItems),len(cols))
+    msg("...Reading data in chunks of {} records (estimated peak memory {:.1f} MB)".format(chunkRows,peakMB))
+    logFile.write("Memory limit: {} MB; records read in chunks of {}; estimated peak memory: {:.1f} MB\n".format(memLimit,chunkRows,peakMB))
+    msg("Computing correlation values")
+    moments = corTools.streamingMoments(dataTools.iterRecordChunks(speciesCSV,chunkRows,cols),len(cols))
+    rows1, rows2, coeffs = corTools.thresholdPairs(corTools.momentsCorrelation(moments),float(threshold))
+logFile.write("{} variables analyzed; {} pairs with coefficients >= {}\n".format(len(cols),len(coeffs),threshold))
 
-#Create the output CSV file
+#Write the pairs to the output CSV file
 f = open(coeffCSV,'wt')
 f.write("Var1, Var2, Coeff\n")
-
-#Loop through column pairs
-msg("Computing correlation values")
-for i in range(0,nCols):
-    for j in range(0,nCols):
-        if j > i:
-            # Get the names of the two columns
-            name1 = headerItems[i]
-            name2 = headerItems[j]
-            # Process only if both the columns are in the colNames list (and the pairs aren't the same)
-            if name1 in colNames and name2 in colNames and not (name1 == name2):
-                # Get the data vectors of the two columns
-                v1 = arrData[1:,i]
-                v2 = arrData[1:,j]
-                # Calculate the correlation coefficient
-                pearson = numpy.corrcoef(v1,v2)[0,1]
-                # If the coefficient is > the threshold consider them redundant and add to the CSV
-                if abs(pearson) >= float(threshold):
-                    f.write("{}, {}, {}\n".format(str(name1),name2,pearson))
+for k in range(len(coeffs)):
+    f.write("{}, {}, {}\n".format(str(selNames[rows1[k]]),selNames[rows2[k]],coeffs[k]))
 
 msg("Values written to {}".format(coeffCSV))
 f.close()
+logFile.close()
+buildStamps.writeStamp([coeffCSV],[speciesCSV,shCorrCSV],stampParams)
+
 
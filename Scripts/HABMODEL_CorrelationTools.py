@@ -0,0 +1,158 @@
+# HABMODEL_CorrelationTools.py
+#
+# Description: Vectorized correlation functions shared by the HABMODEL tools. Rather
+#  than computing one coefficient at a time, these compute the coefficients (and
+#  p-values) for all variables in a single matrix operation. This is a helper module
+#  imported by the scripts in this folder; it is not run as a tool itself.
+#
+# For data too large to hold in memory, the "moments" functions accumulate the record
+#  count, column means and the matrix of co-moments (sums of cross-products of
+#  deviations from the mean) over chunks of records, merging each chunk with the
+#  pairwise update of Chan, Golub & LeVeque (1979). This is numerically stable, unlike
+#  summing raw squares and cross-products. Only one chunk and the co-moment matrix are
+#  held in memory at a time.
+#
+#  The p-value calculations require the SciPy module (see HABMODEL_SHCorrelate).
+#
+# Fall 2026
+
+import numpy
+
+## ---Functions---
+def standardize(arrData):
+    #Centers each column of a (records x variables) array and scales it to unit length.
+    # Columns with no variance are returned as NaN.
+    arrCentered = arrData - arrData.mean(axis=0)
+    ss = numpy.sqrt((arrCentered ** 2).sum(axis=0))
+    with numpy.errstate(divide="ignore",invalid="ignore"):
+        return arrCentered / ss
+
+def pearsonPValues(arrCoef,n):
+    #Returns the two-tailed p-values of Pearson coefficients computed from n records,
+    # calculated as in scipy.stats.pearsonr
+    from scipy import special
+    df = n - 2
+    arrCoef = numpy.clip(arrCoef,-1.0,1.0)
+    with numpy.errstate(divide="ignore",invalid="ignore"):
+        tSquared = arrCoef * arrCoef * (df / ((1.0 - arrCoef) * (1.0 + arrCoef)))
+        return special.betainc(0.5 * df,0.5,df / (df + tSquared))
+
+def speciesHabitatCorrelations(arrPresence,arrEnv):
+    #Computes the correlation of each species' presence/absence with each environment
+    # variable. With binary presence values these are point-biserial coefficients.
+    #  arrPresence - (species x records) array of 1 (presence) and 0 (background) values
+    #                or a single species' presence vector
+    #  arrEnv      - (records x variables) array of environment values
+    # Returns (species x variables) arrays of coefficients and p-values (or vectors if a
+    # single presence vector was given)
+    arrPresence = numpy.asarray(arrPresence,dtype="float64")
+    singleSpp = arrPresence.ndim == 1
+    arrPresence = numpy.atleast_2d(arrPresence)
+    n = arrEnv.shape[0]
+    if arrPresence.shape[1] != n:
+        raise ValueError("Presence matrix has {} records; environment matrix has {}".format(arrPresence.shape[1],n))
+    #Standardize the environment matrix once; the coefficients are then a single product
+    arrCoef = numpy.dot(standardize(arrPresence.T).T,standardize(arrEnv))
+    arrCoef = numpy.clip(arrCoef,-1.0,1.0)
+    arrP = pearsonPValues(arrCoef,n)
+    if singleSpp:
+        return arrCoef[0], arrP[0]
+    return arrCoef, arrP
+
+def correlationMatrix(arrData):
+    #Returns the (variables x variables) matrix of Pearson coefficients among the columns
+    # of a (records x variables) array
+    arrStd = standardize(arrData)
+    return numpy.clip(numpy.dot(arrStd.T,arrStd),-1.0,1.0)
+
+def correlatedPairs(arrData,threshold):
+    #Finds all pairs of columns whose correlation (absolute value) is at or above the
+    # threshold. Returns arrays of the first column index, second column index, and
+    # coefficient of each pair, in row order of the upper triangle of the matrix.
+    return thresholdPairs(correlationMatrix(arrData),threshold)
+
+def thresholdPairs(arrCoef,threshold):
+    #Returns the pairs in the upper triangle of a correlation matrix with coefficients
+    # (absolute value) at or above the threshold; see correlatedPairs
+    rows1, rows2 = numpy.triu_indices(arrCoef.shape[0],1)
+    coeffs = arrCoef[rows1,rows2]
+    with numpy.errstate(invalid="ignore"):
+        isCorrelated = numpy.abs(coeffs) >= threshold
+    return rows1[isCorrelated], rows2[isCorrelated], coeffs[isCorrelated]
+
+def newMoments(nVars):
+    #Returns empty running moments for nVars variables
+    return {"n":0,
+            "mean":numpy.zeros(nVars,dtype="float64"),
+            "comoment":numpy.zeros((nVars,nVars),dtype="float64")}
+
+def updateMoments(moments,arrChunk):
+    #Merges a (records x variables) chunk of records into the running moments
+    nB = arrChunk.shape[0]
+    if nB == 0: return moments
+    nA = moments["n"]
+    meanB = arrChunk.mean(axis=0)
+    arrCentered = arrChunk - meanB
+    delta = meanB - moments["mean"]
+    n = nA + nB
+    moments["comoment"] += numpy.dot(arrCentered.T,arrCentered) + numpy.outer(delta,delta) * (float(nA) * nB / n)
+    moments["mean"] += delta * (float(nB) / n)
+    moments["n"] = n
+    return moments
+
+def momentsCorrelation(moments):
+    #Returns the (variables x variables) matrix of Pearson coefficients from the moments.
+    # Variables with no variance have NaN coefficients.
+    sd = numpy.sqrt(numpy.diag(moments["comoment"]))
+    with numpy.errstate(divide="ignore",invalid="ignore"):
+        arrCoef = moments["comoment"] / numpy.outer(sd,sd)
+    return numpy.clip(arrCoef,-1.0,1.0)
+
+def streamingChunkSize(memLimitMB,nFileCols,nVars):
+    #Returns the number of records to read at a time so that the working memory of a
+    # streaming correlation stays within memLimitMB, along with the estimated peak
+    # memory (MB). The fixed cost is the running and chunk co-moment matrices; each
+    # record costs its parsed text (allowing ~80 bytes a value) plus its float copies.
+    fixedBytes = 3 * nVars * nVars * 8
+    recordBytes = nFileCols * 80 + nVars * 8 * 2
+    chunkRows = int((memLimitMB * 1024 * 1024 - fixedBytes) / recordBytes)
+    chunkRows = max(chunkRows,100)
+    peakMB = (fixedBytes + chunkRows * recordBytes) / (1024.0 * 1024.0)
+    return chunkRows, peakMB
+
+def streamingMoments(chunks,nVars):
+    #Accumulates the moments of nVars variables over an iterable of (records x nVars)
+    # chunks of records (e.g. from HABMODEL_DataTools.iterRecordChunks)
+    moments = newMoments(nVars)
+    for arrChunk in chunks:
+        updateMoments(moments,arrChunk)
+    return moments
+
+def pruneCorrelated(varNames,priorities,pairs):
+    #Selects a set of variables in which no two are correlated, keeping the best variable
+    # in each cluster of correlated variables. Variables are visited in order of priority
+    # (highest first) and kept unless correlated with a variable already kept; this is a
+    # greedy maximal independent set of the correlation graph.
+    #  varNames   - list of variable names (the nodes of the graph)
+    #  priorities - dictionary of variable name: sortable priority (e.g. a tuple)
+    #  pairs      - list of (name1, name2) pairs of correlated variables (the edges)
+    # Returns a list of the redundant (dropped) variables in the order they were dropped
+    # and a dictionary of dropped variable: the kept variables it is correlated with.
+    neighbors = {}
+    for name in varNames:
+        neighbors[name] = set()
+    for name1, name2 in pairs:
+        if name1 in neighbors and name2 in neighbors and name1 != name2:
+            neighbors[name1].add(name2)
+            neighbors[name2].add(name1)
+    keptVars = set()
+    dropped = []
+    droppedFor = {}
+    for name in sorted(varNames,key=lambda name: (priorities[name],name),reverse=True):
+        keptNeighbors = neighbors[name] & keptVars
+        if keptNeighbors:
+            dropped.append(name)
+            droppedFor[name] = sorted(keptNeighbors)
+        else:
+            keptVars.add(name)
+    return dropped, droppedFor
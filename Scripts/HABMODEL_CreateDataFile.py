@@ -10,10 +10,17 @@
 #   species was observed (via Endries' data) are tagged with 1, others with 0.bit_length
 #   Environment variables with missing data are eliminated. 
 #
+# The records are written to a new file that replaces AllHUC8Records.csv only if its
+#   contents have changed, so the tools downstream of it don't see it as changed
+#   (see HABMODEL_BuildStamps).
+#
 # Spring 2015
 # John.Fay@duke.edu
 
-import sys, os, csv, arcpy, datetime
+import sys, os, arcpy, datetime
+import HABMODEL_DataTools as dataTools
+import HABMODEL_BuildStamps as buildStamps
+import MISC_HUCIndex as hucTools
 arcpy.env.overwriteOutput = 1
 
 # Input variables
@@ -26,7 +33,6 @@ statsFolder = arcpy.GetParameterAsText(3) #Root folder to hold all species model
 sppOnlyTbl = "in_memory/sppOnlyTbl"
 freqTbl = "in_memory/FreqTbl"
 resultsCopyTbl = "in_memory/Results2"
-counter = 0
 ##
 ## ---Functions---
 def msg(txt,type="message"):
@@ -72,15 +78,12 @@ msg("{} records extracted".format(arcpy.GetCount_management(sppOnlyTbl)))
 
 # Make a list of HUC8s
 msg("...Making a list of HUCs in which {} was observed".format(speciesName))
-HUC6s = []
-HUC8s = []
+HUC6s = set()
+HUC8s = set()
 for rec in arcpy.da.SearchCursor(sppOnlyTbl,("REACHCODE")):
-    HUC8 = str(rec[0][:8])
-    if not HUC8 in HUC8s:
-        HUC8s.append(HUC8)
-    HUC6 = str(rec[0][:6])
-    if not HUC6 in HUC6s:
-        HUC6s.append(HUC6)
+    HUC8s.add(str(rec[0][:8]))
+    HUC6s.add(str(rec[0][:6]))
+HUC8s = sorted(HUC8s)
 msg("{} was found in {} HUC6s and {} HUC8s".format(speciesName,len(HUC6s),len(HUC8s)),"warning")
 
 # Set a filename to save info on the species (list of HUC8s and HUC6s)
@@ -93,11 +96,7 @@ for HUC8 in HUC8s:
 #Select data rows in the response variables that are within the specified HUC8s
 # Create a where clause from the HUC8s
 msg("...Creating the query string to extract records")
-whereClause = ""
-for HUC8 in HUC8s:
-    whereClause += "REACHCODE LIKE '{}%' OR ".format(HUC8)
-# Trim of the last "OR "
-whereClause = whereClause[:-3]
+whereClause = hucTools.hucWhereClause(HUC8s,hucTools.getHUCIndex(envVarsTbl))
 
 # Select the records...
 # Make a copy of the environment variable table and join the species table to it
@@ -116,19 +115,23 @@ for fld in arcpy.ListFields(resultsCopyTbl):
         outFldList.append(fld.name)
 
 # Filter the field list: remove fields with null values
+msg("...Scanning fields for missing (-9998/-9999 or null) values")
+scanFlds = outFldList[2:] #Skip the first two fields (GRIDCODE and REACHCODE)
+arrData = dataTools.toColumns(dataTools.readRecords(resultsCopyTbl,scanFlds),scanFlds)
+sentinelCounts, nullCounts = dataTools.missingValueCounts(arrData)
+del arrData
 fldList = []
-for fld in outFldList[2:]: #Skip the first two fields (GRIDCODE and REACHCODE)
-    #Create the SQL filter
-    sql = "{} IN (-9998.0,-9999)".format(fld)
-    #Select records
-    tmpTbl = arcpy.TableSelect_analysis(resultsCopyTbl,"in_memory/tmpSelect",sql)
-    #See if any records are selected
-    if int(arcpy.GetCount_management(tmpTbl).getOutput(0)) == 0:
+for i in range(len(scanFlds)):
+    fld = scanFlds[i]
+    if sentinelCounts[i] + nullCounts[i] == 0:
         fldList.append(fld)
     else:
         msg("   Field <<{}>> has null values and will be removed".format(fld),"warning")
         logFile.write("Field <<{}>> has null values and will be removed\n".format(fld))
 
+# Write the missing value counts for each field to the log file
+dataTools.writeMissingValueReport(logFile,scanFlds,sentinelCounts,nullCounts)
+
 # Insert GRIDCODE and REACHCODE
 fldList.insert(0,"REACHCODE")
 fldList.insert(0,"GRIDCODE")
@@ -136,43 +139,25 @@ if "Shape_Length" in fldList: fldList.remove("Shape_Length")
 if "Shape_Area" in fldList: fldList.remove("Shape_Area")
 
 ## WRITE THE SPECIES RECORDS TO THE FILE ##
-msg("...Creating the output species file")
-# Initialize the species output csv file & create the writer object
-msg("...Initializing the output CSV files")
-csvFile = open(speciesCSV,'wb')
-writer = csv.writer(csvFile)
-
-# Write header row to CSV file
-msg("...Writing headers to CSV file")
-writer.writerow(["Species"] + fldList)
-
-# Create a search cursor for the resultsTbl
-msg("...Writing presence values to CSV file")
-whereClause = '"{}" = 1'.format(speciesName)
-# Create a cursor including all but the first and last fields (species names)
-cursor = arcpy.da.SearchCursor(resultsCopyTbl,fldList,whereClause) #<- the 1: skips the first & last field
-for row in cursor:
-    #write the species name + all the row data
-    writer.writerow([1] + list(row))
-    counter += 1
-msg("{} presence records written to file".format(counter))
-logFile.write("{} presence records written to file\n".format(counter))
-counter = 0
-
-# Create a search cursor for the resultsTbl
-msg("...Writing background values to CSV file")
-whereClause = '"{}" IS Null'.format(speciesName)
-cursor = arcpy.da.SearchCursor(resultsCopyTbl,fldList,whereClause)
-for row in cursor:
-    #write the species name + all the row data
-    writer.writerow([0] + list(row))
-    counter +=1
-msg("{} absence records writted to file".format(counter))
-logFile.write("{} absence records writted to file\n".format(counter))
+# Read the joined table once, tagging each record as a presence (1) or background (0)
+# by its species value, and write the records to the CSV file in large chunks
+msg("...Writing presence and background values to CSV file")
+cursor = arcpy.da.SearchCursor(resultsCopyTbl,fldList + [speciesName])
+records = ((1 if row[-1] == 1 else 0, row[:-1]) for row in cursor)
+newCSV = speciesCSV[:-4] + "_new.csv"
+presCount, bkgdCount = dataTools.writeRecordsCSV(newCSV,fldList,records)
+del cursor
+if buildStamps.replaceDataFile(newCSV,speciesCSV):
+    msg("...{} updated".format(speciesCSV))
+else:
+    msg("...{} is unchanged".format(speciesCSV))
+msg("{} presence records written to file".format(presCount))
+logFile.write("{} presence records written to file\n".format(presCount))
+msg("{} absence records writted to file".format(bkgdCount))
+logFile.write("{} absence records writted to file\n".format(bkgdCount))
 
 # Close file and clean up
 logFile.close()
-csvFile.close()
 
 # Set the output parameters
 arcpy.SetParameterAsText(4,speciesCSV)                 #Output CSV 
@@ -0,0 +1,178 @@
+# HABMODEL_CreateDataFileBatch.py
+#
+# Description: Batch version of HABMODEL_CreateDataFile. Creates the AllHUC8Records.csv
+#  and metadata files for a list of species in one run. Outputs, written to a
+#  sub-folder of the stats folder for each species, match those of the single species
+#  tool: the records are written in table order, each tagged as a presence or
+#  background record (see Tests\test_CreateDataFile.py).
+#
+# The species table and the environment variable table are each read only once: the
+#  environment records for every HUC8 in which any of the species occur are pulled into
+#  memory, and each species' records are taken from there. Missing value counts are
+#  computed once per HUC8 and shared by all species found in that HUC8.
+#
+# As in the single species tool, a species' AllHUC8Records.csv is only replaced if its
+#  contents have changed (see HABMODEL_BuildStamps).
+#
+# Fall 2026
+
+import sys, os, arcpy, numpy, datetime
+import HABMODEL_DataTools as dataTools
+import HABMODEL_BuildStamps as buildStamps
+import MISC_HUCIndex as hucTools
+arcpy.env.overwriteOutput = 1
+
+# Input variables
+speciesTbl = arcpy.GetParameterAsText(0)    # Table of all ENDRIES surveyed catchments with a binary column for each species presence...
+speciesNames = arcpy.GetParameterAsText(1)  # Species to model (semicolon separated); each should be a field in the above table
+envVarsTbl = arcpy.GetParameterAsText(2)    # Table listing all the catchment attributes to be used as environment layer values
+statsFolder = arcpy.GetParameterAsText(3)   # Root folder into which a subfolder for each species will be created
+
+##
+## ---Functions---
+def msg(txt,type="message"):
+    print txt
+    if type == "message":
+        arcpy.AddMessage(txt)
+    elif type == "warning":
+        arcpy.AddWarning(txt)
+    elif type == "error":
+        arcpy.AddError(txt)
+##
+## ---Processes---
+# Make the list of species from the multivalue parameter
+sppNames = []
+for sppName in speciesNames.split(";"):
+    sppName = sppName.strip().strip("'")
+    if sppName and not sppName in sppNames:
+        sppNames.append(sppName)
+msg("{} species to process".format(len(sppNames)))
+
+# Read the species presences for all species in one pass
+msg("...Reading species presences from {}".format(speciesTbl))
+arrSpp = dataTools.readRecords(speciesTbl,["GRIDCODE","REACHCODE"] + sppNames)
+
+# Find the catchments and HUC8s in which each species was observed
+msg("...Making a list of HUCs in which each species was observed")
+sppGridcodes = {}
+sppHUC8s = {}
+for sppName in list(sppNames):
+    isPresent = arrSpp[sppName] == 1
+    if not isPresent.any():
+        msg("   {} has no presence records and will be skipped".format(sppName),"warning")
+        sppNames.remove(sppName)
+        continue
+    sppGridcodes[sppName] = numpy.unique(arrSpp["GRIDCODE"][isPresent])
+    sppHUC8s[sppName] = sorted(set([str(reachcode[:8]) for reachcode in arrSpp["REACHCODE"][isPresent]]))
+del arrSpp
+
+# Make the list of HUC8s in which any of the species occur
+allHUC8s = set()
+for sppName in sppNames:
+    allHUC8s.update(sppHUC8s[sppName])
+allHUC8s = sorted(allHUC8s)
+msg("Species were found in {} HUC8s".format(len(allHUC8s)),"warning")
+if len(allHUC8s) == 0:
+    msg("No species presences found.\nExiting","error")
+    sys.exit(1)
+
+# Create a list of field names: remove non-numeric fields
+outFldList = []
+for fld in arcpy.ListFields(envVarsTbl):
+    if fld.type not in ("OID","String"):
+        outFldList.append(fld.name)
+scanFlds = outFldList[2:] #Skip the first two fields (GRIDCODE and REACHCODE)
+readFlds = ["GRIDCODE","REACHCODE"] + [fld for fld in scanFlds if fld not in ("GRIDCODE","REACHCODE")]
+
+# Create a where clause from the HUC8s
+msg("...Creating the query string to extract records")
+whereClause = hucTools.hucWhereClause(allHUC8s,hucTools.getHUCIndex(envVarsTbl))
+
+# Read the environment variables for all HUC8s in one pass
+msg("...Reading environment variables for all HUC8s")
+arrEnv = dataTools.readRecords(envVarsTbl,readFlds,whereClause)
+msg("{} catchment records read".format(arrEnv.shape[0]))
+
+# Count missing values in each field, by HUC8
+msg("...Scanning fields for missing (-9998/-9999 or null) values")
+arrData = dataTools.toColumns(arrEnv,scanFlds)
+isSentinel, isNull = dataTools.missingValueFlags(arrData)
+del arrData
+hucRows = dataTools.groupRows(numpy.array([str(reachcode[:8]) for reachcode in arrEnv["REACHCODE"]]))
+hucSentinelCounts = {}
+hucNullCounts = {}
+for HUC8 in hucRows.keys():
+    hucSentinelCounts[HUC8] = isSentinel[hucRows[HUC8]].sum(axis=0)
+    hucNullCounts[HUC8] = isNull[hucRows[HUC8]].sum(axis=0)
+del isSentinel, isNull
+
+# Write the files for each species
+outFolders = []
+for sppName in sppNames:
+    msg("Processing {}".format(sppName))
+    # Create the species output folder, if not present
+    outFolder = os.path.join(statsFolder,sppName)
+    if not os.path.exists(outFolder):
+        msg("...{} does not exist, creating it".format(outFolder))
+        os.mkdir(outFolder)
+    outFolders.append(outFolder)
+
+    # Set the output species and log filenames
+    speciesCSV = os.path.join(outFolder,"AllHUC8Records.csv")
+    logFilename = speciesCSV[:-4]+"_metadata.txt"
+
+    # Get the current time and initialize the log file
+    now = datetime.datetime.now()
+    logFile = open(logFilename,'w')
+    logFile.write("File created at {}:{} on {}/{}/{}\n".format(now.hour,now.minute,now.month,now.day,now.year))
+
+    # Write info on the species HUCs to the log
+    HUC8s = [HUC8 for HUC8 in sppHUC8s[sppName] if HUC8 in hucRows]
+    HUC6s = sorted(set([HUC8[:6] for HUC8 in HUC8s]))
+    msg("...{} was found in {} HUC6s and {} HUC8s".format(sppName,len(HUC6s),len(HUC8s)))
+    logFile.write("{} was found in {} HUC6s and {} HUC8s\n".format(sppName,len(HUC6s),len(HUC8s)))
+    logFile.write("HUC8s:\n")
+    for HUC8 in HUC8s:
+        logFile.write("\t{}\n".format(HUC8))
+    if len(HUC8s) == 0:
+        msg("   No environment records found for {}; skipping".format(sppName),"warning")
+        logFile.close()
+        continue
+
+    # Get the species' records and sum the missing value counts of its HUC8s
+    rows = numpy.sort(numpy.concatenate([hucRows[HUC8] for HUC8 in HUC8s]))
+    sentinelCounts = numpy.sum([hucSentinelCounts[HUC8] for HUC8 in HUC8s],axis=0)
+    nullCounts = numpy.sum([hucNullCounts[HUC8] for HUC8 in HUC8s],axis=0)
+
+    # Filter the field list: remove fields with null values
+    fldList = []
+    for i in range(len(scanFlds)):
+        fld = scanFlds[i]
+        if sentinelCounts[i] + nullCounts[i] == 0:
+            fldList.append(fld)
+        else:
+            msg("   Field <<{}>> has null values and will be removed".format(fld),"warning")
+            logFile.write("Field <<{}>> has null values and will be removed\n".format(fld))
+    dataTools.writeMissingValueReport(logFile,scanFlds,sentinelCounts,nullCounts)
+
+    # Insert GRIDCODE and REACHCODE
+    fldList.insert(0,"REACHCODE")
+    fldList.insert(0,"GRIDCODE")
+    if "Shape_Length" in fldList: fldList.remove("Shape_Length")
+    if "Shape_Area" in fldList: fldList.remove("Shape_Area")
+
+    # Tag the presences and write the records to the CSV file in table order, as the
+    # single species tool does
+    msg("...Writing records to {}".format(speciesCSV))
+    isPresent = numpy.in1d(arrEnv["GRIDCODE"][rows],sppGridcodes[sppName])
+    newCSV = speciesCSV[:-4] + "_new.csv"
+    presCount, bkgdCount = dataTools.writeSpeciesCSV(newCSV,fldList,arrEnv,rows,isPresent)
+    if not buildStamps.replaceDataFile(newCSV,speciesCSV):
+        msg("...{} is unchanged".format(speciesCSV))
+    msg("{} presence and {} background records written to file".format(presCount,bkgdCount))
+    logFile.write("{} presence records written to file\n".format(presCount))
+    logFile.write("{} absence records writted to file\n".format(bkgdCount))
+    logFile.close()
+
+# Set the output parameters
+arcpy.SetParameterAsText(4,";".join(outFolders))      #Output species folders
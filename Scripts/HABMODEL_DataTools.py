@@ -0,0 +1,296 @@
+# HABMODEL_DataTools.py
+#
+# Description: Functions shared by the HABMODEL tools for reading catchment records
+#  into NumPy arrays and writing species data files from them. This is a helper
+#  module imported by the scripts in this folder; it is not run as a tool itself.
+#
+# Species CSV files (AllHUC8Records.csv) are written with a binary "sidecar": the data
+#  values as a (records x columns) float64 array in a NumPy .npy file, along with a
+#  JSON header listing the column names and the size, time stamp and MD5 hash of the
+#  CSV file. Downstream tools memory-map the .npy file instead of re-parsing the CSV.
+#  A sidecar is only used if the CSV file's size and time stamp (or, if the time stamp
+#  differs, its hash) match those in the header; otherwise it is rebuilt from the CSV.
+#
+# SWD (species with data) files for MaxEnt are written from the sidecar as well: only
+#  the needed columns are taken from the memory-mapped array, the species/background
+#  labels are set for all records at once, and rows are written in chunks.
+#
+# Fall 2026
+
+import os, sys, csv, json, hashlib, itertools, multiprocessing, arcpy, numpy
+
+# Values used in the response variable tables to flag missing data
+SENTINELS = (-9998,-9999)
+
+# Number of records written to CSV files at a time, and the file buffer size (bytes)
+CHUNKSIZE = 10000
+BUFFERSIZE = 4 * 1024 * 1024
+
+## ---Functions---
+def readRecords(tbl,flds,whereClause=""):
+    #Reads the fields of the records matching the where clause into a NumPy record
+    # array in a single table scan. Nulls in floating point fields are read as NaN;
+    # integer fields can't hold NaN so their nulls are read as a sentinel value.
+    # Null strings are read as empty strings.
+    fldTypes = {}
+    for fld in arcpy.ListFields(tbl):
+        fldTypes[fld.name] = fld.type
+    nullValues = {}
+    for fld in flds:
+        if fldTypes[fld] in ("Double","Single"): nullValues[fld] = numpy.nan
+        elif fldTypes[fld] == "String": nullValues[fld] = ""
+        else: nullValues[fld] = SENTINELS[-1]
+    return arcpy.da.TableToNumPyArray(tbl,flds,whereClause,null_value=nullValues)
+
+def toColumns(arrRecs,flds):
+    #Copies the fields of a record array into a single (records x fields) float array
+    arrData = numpy.empty((arrRecs.shape[0],len(flds)),dtype="float64")
+    for i in range(len(flds)):
+        arrData[:,i] = arrRecs[flds[i]]
+    return arrData
+
+def missingValueFlags(arrData):
+    #Flags, across all fields at once, the sentinel values and the null (NaN) values
+    # in a (records x fields) float array. Returns two boolean arrays of the same shape.
+    isSentinel = numpy.zeros(arrData.shape,dtype="bool")
+    for val in SENTINELS:
+        isSentinel |= (arrData == val)
+    return isSentinel, numpy.isnan(arrData)
+
+def missingValueCounts(arrData):
+    #Returns the number of sentinel values and the number of nulls in each field
+    isSentinel, isNull = missingValueFlags(arrData)
+    return isSentinel.sum(axis=0), isNull.sum(axis=0)
+
+def writeMissingValueReport(logFile,flds,sentinelCounts,nullCounts):
+    #Writes the missing value counts for each field to an open log file
+    logFile.write("Missing value counts (field: -9998/-9999 values, null values):\n")
+    for i in range(len(flds)):
+        logFile.write("\t{}: {}, {}\n".format(flds[i],sentinelCounts[i],nullCounts[i]))
+
+def groupRows(keys):
+    #Returns a dictionary of key: row indices (in ascending order) for each unique
+    # value in the keys array
+    order = numpy.argsort(keys,kind="mergesort")
+    uniqKeys, starts = numpy.unique(keys[order],return_index=True)
+    ends = list(starts[1:]) + [len(keys)]
+    groups = {}
+    for i in range(len(uniqKeys)):
+        groups[uniqKeys[i]] = order[starts[i]:ends[i]]
+    return groups
+
+def writeRecordsCSV(csvFN,fldList,records,sidecar=True):
+    #Writes the records, an iterable of (species value, row values) pairs, to the species
+    # CSV file in a single pass. Rows are written in chunks through a large file buffer.
+    # If sidecar is true, the binary sidecar of the CSV file is written too.
+    # Returns the number of presence (species value 1) and background records written.
+    arrChunks = []
+    csvFile = open(csvFN,'wb',BUFFERSIZE)
+    writer = csv.writer(csvFile)
+    writer.writerow(["Species"] + fldList)
+    presCount = 0
+    bkgdCount = 0
+    chunk = []
+    for sppValue, row in records:
+        chunk.append([sppValue] + list(row))
+        if sppValue == 1: presCount += 1
+        else: bkgdCount += 1
+        if len(chunk) == CHUNKSIZE:
+            writer.writerows(chunk)
+            if sidecar: arrChunks.append(numpy.array(chunk,dtype="float64"))
+            chunk = []
+    writer.writerows(chunk)
+    csvFile.close()
+    if sidecar:
+        arrChunks.append(numpy.array(chunk,dtype="float64").reshape(-1,len(fldList) + 1))
+        writeSidecar(csvFN,["Species"] + fldList,numpy.concatenate(arrChunks))
+    return presCount, bkgdCount
+
+def writeSpeciesCSV(csvFN,fldList,arrRecs,rows,isPresent):
+    #Writes the rows of the record array, in the order given, to the species CSV file,
+    # as presences where isPresent is true and background records otherwise. With the
+    # rows in table order, the file matches the one HABMODEL_CreateDataFile writes.
+    # Returns the number of presence and background records written.
+    arrOut = arrRecs[fldList]
+    def iterRecords():
+        for start in range(0,len(rows),CHUNKSIZE):
+            sppValues = isPresent[start:start + CHUNKSIZE].tolist()
+            for sppValue, rec in zip(sppValues,arrOut[rows[start:start + CHUNKSIZE]].tolist()):
+                yield (1 if sppValue else 0), rec
+    return writeRecordsCSV(csvFN,fldList,iterRecords())
+
+def sidecarFilenames(csvFN):
+    #Returns the names of the binary data and JSON header files of the CSV file's sidecar
+    baseName = os.path.splitext(csvFN)[0]
+    return baseName + ".npy", baseName + "_header.json"
+
+def fileHash(fileName):
+    #Returns the MD5 hash of the file's contents
+    md5 = hashlib.md5()
+    f = open(fileName,'rb')
+    block = f.read(BUFFERSIZE)
+    while block:
+        md5.update(block)
+        block = f.read(BUFFERSIZE)
+    f.close()
+    return md5.hexdigest()
+
+def writeSidecar(csvFN,colNames,arrData):
+    #Writes the binary sidecar of the CSV file: the data array and its JSON header
+    npyFN, headerFN = sidecarFilenames(csvFN)
+    arrData = numpy.asarray(arrData,dtype="float64")
+    numpy.save(npyFN,arrData)
+    #Flag columns holding only whole numbers so they can be written back out as integers
+    # (a column with a missing value, NaN, is not flagged, as NaN has no integer value)
+    isInteger = numpy.all(arrData == numpy.floor(arrData),axis=0)
+    csvStat = os.stat(csvFN)
+    header = {"columns":list(colNames),
+              "integerColumns":[colNames[i] for i in range(len(colNames)) if isInteger[i]],
+              "dtype":"float64",
+              "shape":list(arrData.shape),
+              "csvSize":csvStat.st_size,
+              "csvMtime":csvStat.st_mtime,
+              "csvHash":fileHash(csvFN)}
+    f = open(headerFN,'w')
+    json.dump(header,f,indent=1)
+    f.close()
+
+def readSidecarHeader(csvFN):
+    #Returns the sidecar header of the CSV file, or None if there is no sidecar or the
+    # CSV file has changed since the sidecar was written
+    npyFN, headerFN = sidecarFilenames(csvFN)
+    if not (os.path.exists(npyFN) and os.path.exists(headerFN)):
+        return None
+    f = open(headerFN,'r')
+    header = json.load(f)
+    f.close()
+    csvStat = os.stat(csvFN)
+    if header["csvSize"] != csvStat.st_size:
+        return None
+    if header["csvMtime"] != csvStat.st_mtime:
+        #The time stamp changed (e.g. the file was copied); check the contents
+        if header["csvHash"] != fileHash(csvFN):
+            return None
+        header["csvMtime"] = csvStat.st_mtime
+        f = open(headerFN,'w')
+        json.dump(header,f,indent=1)
+        f.close()
+    return header
+
+def loadRecords(csvFN):
+    #Returns the sidecar header and the memory-mapped (records x columns) data array of
+    # the species CSV file. The sidecar is built from the CSV file first if it is
+    # missing or stale.
+    header = readSidecarHeader(csvFN)
+    if header is None:
+        f = open(csvFN,'rt')
+        colNames = [item.strip() for item in f.readline().split(",")]
+        f.close()
+        arrData = numpy.genfromtxt(csvFN,delimiter=",",skip_header=1)
+        writeSidecar(csvFN,colNames,arrData.reshape(-1,len(colNames)))
+        header = readSidecarHeader(csvFN)
+    return header, numpy.load(sidecarFilenames(csvFN)[0],mmap_mode="r")
+
+def readColumnNames(csvFN):
+    #Returns the column names in the first line of the CSV file
+    f = open(csvFN,'rt')
+    colNames = [item.strip() for item in f.readline().split(",")]
+    f.close()
+    return colNames
+
+def iterRecordChunks(csvFN,chunkRows,cols=None):
+    #Yields the records of the species CSV file as (records x columns) float arrays of
+    # up to chunkRows records, limited to the cols column indices if given. Records are
+    # sliced from the memory-mapped sidecar if it is current; otherwise the CSV file is
+    # parsed a chunk at a time. Either way only one chunk is held in memory.
+    if readSidecarHeader(csvFN) is not None:
+        arrData = numpy.load(sidecarFilenames(csvFN)[0],mmap_mode="r")
+        for start in range(0,arrData.shape[0],chunkRows):
+            arrChunk = arrData[start:start + chunkRows]
+            if cols is None: yield numpy.array(arrChunk)
+            else: yield arrChunk[:,cols]
+        return
+    nCols = len(readColumnNames(csvFN))
+    f = open(csvFN,'rt')
+    f.readline() #Skip the header line
+    lines = list(itertools.islice(f,chunkRows))
+    while lines:
+        arrChunk = numpy.genfromtxt(lines,delimiter=",").reshape(-1,nCols)
+        if cols is None: yield arrChunk
+        else: yield arrChunk[:,cols]
+        lines = list(itertools.islice(f,chunkRows))
+    f.close()
+
+def readSWDFieldList(varFilterCSV,varFilterHTML):
+    #Returns the fields to write to a species' SWD file: SPECIES, GRIDCODE, REACHCODE
+    # and the variables listed in the SH_Correlations file that are not listed in the
+    # RedundantVars file. Also returns the list of redundant variables removed.
+    f = open(varFilterCSV,'rt')
+    reader = csv.reader(f)
+    next(reader) #Skip the header line
+    varNames = [row[0].strip() for row in reader if row]
+    f.close()
+    f = open(varFilterHTML,'rt')
+    redundantVars = set(f.readline().split("<br>")[1:-1])
+    f.close()
+    removedVars = [varName for varName in varNames if varName in redundantVars]
+    fldList = ["SPECIES","GRIDCODE","REACHCODE"] + [varName for varName in varNames if not varName in redundantVars]
+    return fldList, removedVars
+
+def writeSWDFile(csvFN,swdFN,speciesName,fldList):
+    #Writes the fields of the species CSV file to a MaxEnt SWD file. The first field
+    # (SPECIES) is written as the species name for presences and "Background" otherwise,
+    # and the second and third (GRIDCODE and REACHCODE) are labeled X and Y. Returns the
+    # number of presence and background records written.
+    header, arrData = loadRecords(csvFN)
+    colIndex = {}
+    for i in range(len(header["columns"])):
+        colIndex[header["columns"][i].upper()] = i
+    missingFlds = [fld for fld in fldList if not fld.upper() in colIndex]
+    if missingFlds:
+        raise ValueError("Fields {} not found in {}".format(missingFlds,csvFN))
+    cols = [colIndex[fld.upper()] for fld in fldList]
+    intCols = set([col.upper() for col in header["integerColumns"]])
+    isInteger = [fld.upper() in intCols for fld in fldList]
+    csvFile = open(swdFN,'wb',BUFFERSIZE)
+    writer = csv.writer(csvFile)
+    writer.writerow(["SPECIES","X","Y"] + fldList[3:])
+    presCount = 0
+    for start in range(0,arrData.shape[0],CHUNKSIZE):
+        arrChunk = arrData[start:start + CHUNKSIZE][:,cols]
+        isPresent = arrChunk[:,0] == 1
+        presCount += int(isPresent.sum())
+        columns = [numpy.where(isPresent,speciesName,"Background").tolist()]
+        for i in range(1,len(cols)):
+            if isInteger[i]: columns.append(arrChunk[:,i].astype("int64").tolist())
+            else: columns.append(arrChunk[:,i].tolist())
+        writer.writerows(zip(*columns))
+    csvFile.close()
+    return presCount, arrData.shape[0] - presCount
+
+def createSWDFile(sppFolder,speciesName):
+    #Creates the SWD file of the species from the files in its stats folder. Returns
+    # the SWD file name, the redundant variables removed, and the number of presence
+    # and background records written. Can be run in a worker process (see processPool).
+    fldList, removedVars = readSWDFieldList(os.path.join(sppFolder,"SH_Correlations.csv"),
+                                            os.path.join(sppFolder,"{}_RedundantVars.html".format(speciesName)))
+    swdFN = os.path.join(sppFolder,"{}_SWD.csv".format(speciesName))
+    presCount, bkgdCount = writeSWDFile(os.path.join(sppFolder,"ALLHUC8Records.csv"),swdFN,speciesName,fldList)
+    return swdFN, removedVars, presCount, bkgdCount
+
+def pythonExecutable():
+    #Returns the Python executable to start other processes with. When run from within
+    # ArcMap/ArcCatalog, sys.executable is the application itself, so the pythonw.exe
+    # of ArcGIS's Python installation is used instead.
+    if not os.path.basename(sys.executable).lower().startswith("python"):
+        pythonw = os.path.join(sys.exec_prefix,"pythonw.exe")
+        if os.path.exists(pythonw):
+            return pythonw
+    return sys.executable
+
+def processPool(processes=None):
+    #Returns a multiprocessing pool whose workers are started with pythonExecutable()
+    # (on Windows; elsewhere workers are forked)
+    if sys.platform == "win32":
+        multiprocessing.set_executable(pythonExecutable())
+    return multiprocessing.Pool(processes)
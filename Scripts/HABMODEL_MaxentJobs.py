@@ -0,0 +1,149 @@
+# HABMODEL_MaxentJobs.py
+#
+# Description: Finds and runs MaxEnt jobs (the RunMaxent.bat files written by
+#  HABMODEL_CreateMaxentBatchFile and HABMODEL_CreateMaxentUpliftBatchFile) as a pool
+#  of concurrent JVMs. This is a helper module imported by the scripts in this folder;
+#  it is not run as a tool itself.
+#
+# The CPU threads and memory available are split evenly among the jobs running at
+#  once: the "threads=" and "-mx"/"-Xmx" settings in each batch file's command are
+#  replaced with the job's share before it is started. Each job's output is written to
+#  a log file next to its batch file (e.g. RunMaxent.log).
+#
+# Jobs can be skipped if their outputs are up to date: a job's stamp (see
+#  HABMODEL_BuildStamps) records the hashes of its batch file and of the samples,
+#  environment layer and projection layer files named in its command.
+#
+# The "java" at the start of each command can be replaced with another command to test
+#  the scheduling without Java (e.g. Tests\Fixtures\FakeMaxent\fakeMaxent.py, which
+#  mimics MaxEnt's outputs; see Tests\test_MaxentJobs.py).
+#
+# Fall 2026
+
+import os, re, time, subprocess
+import HABMODEL_BuildStamps as buildStamps
+
+# Seconds between checks on running jobs
+POLLINTERVAL = 1.0
+
+## ---Functions---
+def findJobs(statsFolder,batchName="RunMaxent.bat"):
+    #Returns the batch files with the given name in the stats folder and its sub folders
+    jobs = []
+    for root, dirs, files in os.walk(statsFolder):
+        if batchName in files:
+            jobs.append(os.path.join(root,batchName))
+    return sorted(jobs)
+
+def readJobCommand(batchFN):
+    #Returns the MaxEnt command in the batch file (its lines joined into one command)
+    f = open(batchFN,'rt')
+    cmd = " ".join([line.strip() for line in f.readlines() if line.strip()])
+    f.close()
+    return cmd
+
+def allocateResources(nJobs,maxJobs,totalThreads,totalMemoryMB=None):
+    #Returns the number of threads and memory (MB) given to each of the jobs running
+    # at once. Memory is None if no memory budget is given.
+    nRunning = max(min(nJobs,maxJobs),1)
+    threads = max(totalThreads // nRunning,1)
+    if totalMemoryMB is None:
+        return threads, None
+    return threads, max(totalMemoryMB // nRunning,1)
+
+def setJobResources(cmd,threads,memoryMB=None,javaCmd="java"):
+    #Returns the MaxEnt command with its thread count and (if given) maximum Java heap
+    # size replaced, set to run without waiting for the user, and run with javaCmd
+    if re.search(r"\bthreads=\d+",cmd):
+        cmd = re.sub(r"\bthreads=\d+","threads={}".format(threads),cmd)
+    else:
+        cmd += " threads={}".format(threads)
+    if memoryMB is not None:
+        if re.search(r"\s-X?mx\S+",cmd):
+            cmd = re.sub(r"\s-X?mx\S+"," -Xmx{}m".format(memoryMB),cmd)
+        else:
+            cmd = re.sub(r"^java\b","java -Xmx{}m".format(memoryMB),cmd)
+    if re.search(r"\bautorun=\w+",cmd):
+        cmd = re.sub(r"\bautorun=\w+","autorun=true",cmd)
+    else:
+        cmd += " autorun=true"
+    return re.sub(r"^java\b",javaCmd.replace("\\","\\\\"),cmd)
+
+def logFilename(batchFN):
+    #Returns the name of the log file of the job
+    return os.path.splitext(batchFN)[0] + ".log"
+
+def commandSetting(cmd,name):
+    #Returns the value of a name=value setting in the MaxEnt command, or None
+    match = re.search(r"\b{}=(\S+)".format(name),cmd)
+    if match: return match.group(1)
+    return None
+
+def jobInputs(batchFN):
+    #Returns the input files of the job: its batch file, samples and environment layer
+    # files, and the files in its projection layer folders
+    cmd = readJobCommand(batchFN)
+    inputs = [batchFN]
+    for name in ("samplesfile","environmentallayers"):
+        fileName = commandSetting(cmd,name)
+        if fileName and not fileName in inputs: inputs.append(fileName)
+    projFolders = commandSetting(cmd,"projectionlayers")
+    for projFolder in (projFolders or "").split(","):
+        if os.path.isdir(projFolder):
+            inputs.extend([os.path.join(projFolder,fileName) for fileName in sorted(os.listdir(projFolder))])
+    return inputs
+
+def jobOutputs(batchFN):
+    #Returns the main output file of the job (maxentResults.csv in its output folder)
+    outDir = commandSetting(readJobCommand(batchFN),"outputdirectory") or os.path.dirname(batchFN)
+    return [os.path.join(outDir,"maxentResults.csv")]
+
+def jobStampFilename(batchFN):
+    #Returns the name of the stamp file of the job
+    return os.path.splitext(batchFN)[0] + buildStamps.STAMPSUFFIX
+
+def jobIsUpToDate(batchFN):
+    #Returns True if the job's outputs are up to date with its inputs
+    return buildStamps.isUpToDate(jobOutputs(batchFN),jobInputs(batchFN),{},jobStampFilename(batchFN))
+
+def runJobs(jobs,maxJobs,totalThreads,totalMemoryMB=None,javaCmd="java",report=None,skipUpToDate=False):
+    #Runs the batch files' commands, up to maxJobs at a time, sharing the threads and
+    # memory among the running jobs. Each job's output goes to its log file. If given,
+    # report(text) is called as jobs start and finish. If skipUpToDate is true, jobs
+    # whose outputs are up to date are not run. Returns a list of (batch file, return
+    # code, run time in seconds) for each job run, in the order they finished. At least
+    # one job is run at a time.
+    maxJobs = max(maxJobs,1)
+    if skipUpToDate:
+        upToDate = [batchFN for batchFN in jobs if jobIsUpToDate(batchFN)]
+        for batchFN in upToDate:
+            if report: report("{} is up to date".format(batchFN))
+        jobs = [batchFN for batchFN in jobs if not batchFN in upToDate]
+    threads, memoryMB = allocateResources(len(jobs),maxJobs,totalThreads,totalMemoryMB)
+    waiting = list(jobs)
+    running = []
+    results = []
+    while waiting or running:
+        #Start jobs while there are free slots
+        while waiting and len(running) < maxJobs:
+            batchFN = waiting.pop(0)
+            cmd = setJobResources(readJobCommand(batchFN),threads,memoryMB,javaCmd)
+            logFile = open(logFilename(batchFN),'w')
+            logFile.write(cmd + "\n")
+            logFile.flush()
+            proc = subprocess.Popen(cmd,shell=True,stdout=logFile,stderr=subprocess.STDOUT)
+            running.append((batchFN,proc,logFile,time.time()))
+            if report: report("Started {} ({} threads)".format(batchFN,threads))
+        #Check for finished jobs
+        time.sleep(POLLINTERVAL)
+        for job in list(running):
+            batchFN, proc, logFile, startTime = job
+            returnCode = proc.poll()
+            if returnCode is None: continue
+            logFile.close()
+            running.remove(job)
+            results.append((batchFN,returnCode,time.time() - startTime))
+            if returnCode == 0 and not [outFN for outFN in jobOutputs(batchFN) if not os.path.exists(outFN)]:
+                buildStamps.writeStamp(jobOutputs(batchFN),jobInputs(batchFN),{},jobStampFilename(batchFN))
+            if report: report("Finished {} (return code {}, {:.0f} seconds)".format(batchFN,returnCode,results[-1][2]))
+    return results
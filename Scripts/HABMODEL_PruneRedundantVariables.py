@@ -0,0 +1,116 @@
+# HABMODEL_PruneRedundantVariables.py
+#
+# Description: Automated alternative to selecting redundant variables by hand in the
+#  HABMODEL_VisualizeCorrelations page. Treats the significant response variables as
+#  nodes of a graph, linked where their cross correlation is above the threshold used
+#  in HABMODEL_CalculateCrossCorrelations, and keeps the best variable in each cluster
+#  of correlated variables. All other variables are written to the same
+#  [species]_RedundantVars.html file the visualization page saves, so
+#  HABMODEL_CreateSWDFile can be run next without any user interaction.
+#
+# Variables are kept in order of their management ranking (the last digit of the
+#  MergedRank column in the ResponseVars.xls file; higher is better) and then of the
+#  strength of their correlation with species presence. A variable is dropped if it is
+#  correlated with a variable already kept (a greedy maximal independent set).
+#
+# The tool is skipped if the output is up to date with its inputs (see
+#  HABMODEL_BuildStamps).
+#
+# Fall 2026
+
+import sys, os, csv, arcpy
+import HABMODEL_CorrelationTools as corTools
+import HABMODEL_BuildStamps as buildStamps
+
+#Input variables
+shCorrelationsCSV = arcpy.GetParameterAsText(0)   # List of variable correlations with presence/absence
+rvCorrelationsCSV = arcpy.GetParameterAsText(1)   # List of variable correlations with each other
+envRankingsXLS = arcpy.GetParameterAsText(2)      # Table listing the rankings of each variable for selection [static]
+
+#Get the species name from the folder name
+sppFolder = os.path.dirname(shCorrelationsCSV)
+speciesName = os.path.basename(sppFolder)
+
+#Output
+redundantHTML = os.path.join(sppFolder,"{}_RedundantVars.html".format(speciesName))
+logFilename = redundantHTML[:-5] + "_metadata.txt"
+arcpy.SetParameterAsText(3,redundantHTML)         # Output list of redundant variables (read by HABMODEL_CreateSWDFile)
+
+## ---Functions---
+def msg(txt,type="message"):
+    print txt
+    if type == "message":
+        arcpy.AddMessage(txt)
+    elif type == "warning":
+        arcpy.AddWarning(txt)
+    elif type == "error":
+        arcpy.AddError(txt)
+
+def readCSV(csvFN):
+    #Returns the data rows (minus the header) of a CSV file, with values stripped
+    f = open(csvFN,'rt')
+    reader = csv.reader(f)
+    reader.next()
+    rows = [[item.strip() for item in row] for row in reader if len(row) > 1]
+    f.close()
+    return rows
+
+## ---Processes---
+#Skip the tool if the output is up to date
+stampInputs = [shCorrelationsCSV,rvCorrelationsCSV,envRankingsXLS]
+stampParams = {"tool":"PruneRedundantVariables"}
+if buildStamps.isUpToDate([redundantHTML],stampInputs,stampParams):
+    msg("{} is up to date".format(redundantHTML))
+    sys.exit(0)
+
+#Read the significant variables (nodes) and their correlation with presence/absence
+msg("...Reading significant response variables")
+varNames = []
+absCoefs = {}
+for row in readCSV(shCorrelationsCSV):
+    if not row[0] in absCoefs:
+        varNames.append(row[0])
+        absCoefs[row[0]] = float(row[2])
+msg("   {} variables found".format(len(varNames)))
+
+#Read the correlated variable pairs (edges)
+msg("...Reading correlated variable pairs")
+pairs = [(row[0],row[1]) for row in readCSV(rvCorrelationsCSV)]
+msg("   {} correlated pairs found".format(len(pairs)))
+
+#Read the variable rankings
+msg("...Reading in variable rankings from rankings file")
+rankDict = {}
+cur = arcpy.da.SearchCursor(envRankingsXLS,("variable","MergedRank"))
+for rec in cur:
+    if rec[1] is not None:
+        rankDict[rec[0]] = int(rec[1]) % 10    # The management ranking is the last digit
+del cur
+
+#Set each variable's priority: management ranking, then strength of correlation with presence
+priorities = {}
+for varName in varNames:
+    if not varName in rankDict:
+        msg("   No ranking found for <{}>; setting it to 0".format(varName),"warning")
+    priorities[varName] = (rankDict.get(varName,0),absCoefs[varName])
+
+#Select the redundant variables
+msg("Selecting redundant variables")
+redundantVars, droppedFor = corTools.pruneCorrelated(varNames,priorities,pairs)
+for varName in redundantVars:
+    msg("   Removing <{}> (correlated with {})".format(varName,", ".join(droppedFor[varName])))
+msg("{} of {} variables are redundant".format(len(redundantVars),len(varNames)))
+
+#Write the redundant variables in the format saved by the visualization page
+f = open(redundantHTML,'wt')
+f.write("<u>Reduntant Nodes</u>:<br>" + "".join(["{}<br>".format(varName) for varName in redundantVars]))
+f.close()
+
+#Write the log file
+f = open(logFilename,'wt')
+f.write("REDUNDANT VARIABLES SELECTED AUTOMATICALLY\n")
+f.write("Variable, MergedRank (last digit), abs_coef, kept variables it is correlated with\n")
+for varName in redundantVars:
+    f.write("{}, {}, {}, {}\n".format(varName,priorities[varName][0],absCoefs[varName]," ".join(droppedFor[varName])))
+f.close()
+buildStamps.writeStamp([redundantHTML],stampInputs,stampParams)
@@ -1,7 +1,9 @@
 # HABMODEL_RunBatches.py
 #
 # Description: Iterates through species folders in Habitat Stats folders and
-#  runs maxent batches sequentially.
+#  runs maxent batches, several at a time. The threads and memory given are split
+#  among the batches running at once, and each batch's output is written to a log
+#  file beside it (see HABMODEL_MaxentJobs).
 #
 # Inputs:
 #    The master list of variables (ResponseVars.xlsx in Data Folder)
@@ -16,12 +18,27 @@
 # July 2015
 # John.Fay@duke.edu
 
-import arcpy, sys, os
+import arcpy, sys, os, multiprocessing
+import HABMODEL_MaxentJobs as maxentJobs
 arcpy.env.overwriteOutput = 1
 
 # Input variables
 batchName = arcpy.GetParameterAsText(0)   #"RunMaxent.bat"
 statsFolder = arcpy.GetParameterAsText(1) #r'C:\WorkSpace\EEP_Tool\TarPamStats'
+maxJobs = arcpy.GetParameterAsText(2)     #Optional: number of batches to run at once (default 1)
+totalThreads = arcpy.GetParameterAsText(3) #Optional: threads to split among running batches (default: number of CPUs)
+totalMemory = arcpy.GetParameterAsText(4) #Optional: memory (MB) to split among running batches (default: as set in the batch files)
+javaCmd = arcpy.GetParameterAsText(5)     #Optional: command used in place of "java" (default: java)
+skipUpToDate = arcpy.GetParameterAsText(6) #Optional: whether to skip batches whose outputs are up to date (default: false)
+
+if maxJobs in ("","#"): maxJobs = 1
+else: maxJobs = int(maxJobs)
+if totalThreads in ("","#"): totalThreads = multiprocessing.cpu_count()
+else: totalThreads = int(totalThreads)
+if totalMemory in ("","#"): totalMemory = None
+else: totalMemory = int(totalMemory)
+if javaCmd in ("","#"): javaCmd = "java"
+skipUpToDate = skipUpToDate == "true"
 
 
 ## ---Functions---
@@ -35,8 +52,22 @@ def msg(txt,type="message"):
         arcpy.AddError(txt)
 
 ## ---Processes---
+if maxJobs < 1:
+    msg("The number of batches to run at once must be at least 1.\nExiting.","error")
+    sys.exit(1)
+
 # Walk through folders and find bat files
-for r,d,f in os.walk(statsFolder):
-    if batchName in f:
-        runCmd =  os.path.join(r,batchName)
-        os.system(runCmd)
\ No newline at end of file
+jobs = maxentJobs.findJobs(statsFolder,batchName)
+msg("{} batch files found".format(len(jobs)))
+threads, memory = maxentJobs.allocateResources(len(jobs),maxJobs,totalThreads,totalMemory)
+if memory is None:
+    msg("Running {} batches at a time with {} threads each".format(maxJobs,threads))
+else:
+    msg("Running {} batches at a time with {} threads and {} MB each".format(maxJobs,threads,memory))
+
+# Run the batches
+results = maxentJobs.runJobs(jobs,maxJobs,totalThreads,totalMemory,javaCmd,msg,skipUpToDate)
+for batchFN, returnCode, seconds in results:
+    if returnCode != 0:
+        msg("{} failed (return code {}); see {}".format(batchFN,returnCode,maxentJobs.logFilename(batchFN)),"warning")
+msg("Finished")
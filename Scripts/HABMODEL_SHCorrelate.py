@@ -9,6 +9,13 @@
 #  considered more noise than signal and is tagged for eliminated from the
 #  habitat modeling.
 #
+#  If a memory limit is given, the data file is read in chunks sized to fit the limit
+#  and the correlations are computed from running sums (see HABMODEL_CorrelationTools)
+#  so files larger than memory can be processed.
+#
+#  The tool is skipped if SH_Correlations.csv is up to date with the data file (see
+#  HABMODEL_BuildStamps).
+#
 #  *****************************************************************************
 #  ** This module requires the SciPy module to be installed. When installing, **
 #  ** be sure to get version 0.12.0 as that is the one that works with the    **
@@ -19,10 +26,14 @@
 # John.Fay@duke.edu
 
 import sys, os, arcpy, numpy, datetime
+import HABMODEL_CorrelationTools as corTools
+import HABMODEL_DataTools as dataTools
+import HABMODEL_BuildStamps as buildStamps
 arcpy.env.overwriteOutput = 1
 
 # Input variables
 speciesCSV = arcpy.GetParameterAsText(0) #Catchment table of species p/a with all other response variables
+memLimit = arcpy.GetParameterAsText(2)   #(Optional) Maximum memory (MB) to use; if given, data are read in chunks
 
 # Output variables
 statsFolder = os.path.dirname(speciesCSV)
@@ -41,13 +52,18 @@ def msg(txt,type="message"):
         arcpy.AddError(txt)
 
 ## ---Processes---
+#Skip the tool if the output is up to date
+stampParams = {"tool":"SHCorrelate"}
+if buildStamps.isUpToDate([correlationCSV],[speciesCSV],stampParams):
+    msg("{} is up to date".format(correlationCSV))
+    sys.exit(0)
+
 #Check to see whether a SciPy exists
 try:
     import scipy
-    from scipy import stats
-except:
+except ImportError:
     msg("The SciPy module is not installed.\nExiting.","error")
-    sys.exit()
+    sys.exit(1)
 
 #Initialize the log file
 now = datetime.datetime.now()
@@ -56,41 +72,47 @@ logFile.write("INFO ON SPECIES-HABITAT CORRELATIONS\n")
 logFile.write("File created at {}:{} on {}/{}/{}\n".format(now.hour,now.minute,now.month,now.day,now.year))
 
 #Read in the column headers
-f = open(speciesCSV,'rt')
-headerText = f.readline()
-headerText = headerText[:-1] #Strip the newline char
-headerItems = headerText.split(",")
-f.close()
+headerItems = dataTools.readColumnNames(speciesCSV)
+nCols = len(headerItems)
 
-#Read in the csv file as a numpy vector
-msg("...Reading in data")
-arrData = numpy.genfromtxt(speciesCSV,delimiter=",")
+#Get the env var columns, skipping GRIDCODE, FeatureID and REACHCODE
+envCols = [i for i in range(2,nCols) if not headerItems[i] in ("GRIDCODE","FeatureID","REACHCODE")]
 
-#Create variables from data array
-nCols = arrData.shape[1]
+if memLimit in ("","#"):
+    #Read in the data (memory-mapped from the CSV file's binary sidecar)
+    msg("...Reading in data")
+    header, arrData = dataTools.loadRecords(speciesCSV)
 
-#Create vectors
-msg("...Extracting occurrence records")
-sppVector = arrData[1:,0]
+    #Create vectors
+    msg("...Extracting occurrence records")
+    sppVector = arrData[:,0]
+
+    #Calculate the correlation of all env vars with presence/absence at once --THIS REQUIRES SCIPY--
+    msg("Calculating correlation coefficients")
+    arrCoef, arrP = corTools.speciesHabitatCorrelations(sppVector,arrData[:,envCols])
+else:
+    #Set the number of records to read at a time to stay within the memory limit
+    chunkRows, peakMB = corTools.streamingChunkSize(float(memLimit),nCols,len(envCols) + 1)
+    msg("...Reading data in chunks of {} records (estimated peak memory {:.1f} MB)".format(chunkRows,peakMB))
+    logFile.write("Memory limit: {} MB; records read in chunks of {}; estimated peak memory: {:.1f} MB\n".format(memLimit,chunkRows,peakMB))
+
+    #Accumulate the moments of the occurrence and env var columns over the chunks
+    msg("Calculating correlation coefficients")
+    chunks = dataTools.iterRecordChunks(speciesCSV,chunkRows,[0] + envCols)
+    moments = corTools.streamingMoments(chunks,len(envCols) + 1)
+    arrCoef = corTools.momentsCorrelation(moments)[0,1:]
+    arrP = corTools.pearsonPValues(arrCoef,moments["n"])
 
 #Intialize output file
 msg("...Creating output file")
 f = open(correlationCSV,'wt')
 f.write("variable, coef, abs_coef, p_value\n")
 
-#Loop through columns and calculate the variables correlation with presence/absence
-msg("Calculating correlation coefficients")
-for i in range(2,nCols):
-    # Get the variable name (from the list created above)
-    envName = headerItems[i]
-    # Skip if name is GRIDCODE or FeatureID
-    if envName in ("GRIDCODE","FeatureID","REACHCODE"): continue
-    # Get the env var column, as a vector
-    envVector = arrData[1:,i]
-    #Calculate correlation --THIS REQUIRES SCIPY--
-    pearson = stats.pearsonr(sppVector, envVector)
-    coeff = pearson[0]
-    pValue = pearson[1]
+#Write the significant variables to the CSV file
+for j in range(len(envCols)):
+    envName = headerItems[envCols[j]]
+    coeff = arrCoef[j]
+    pValue = arrP[j]
     #Print output to the CSV file
     if abs(pValue) <= 0.05:
         f.write("%s, %2.4f, %2.4f, %2.3f\n"%(envName,coeff,abs(coeff),pValue))
@@ -100,4 +122,6 @@ for i in range(2,nCols):
 
 #Wrap up
 logFile.close()
-f.close()          
\ No newline at end of file
+f.close()
+buildStamps.writeStamp([correlationCSV],[speciesCSV],stampParams)
+          
\ No newline at end of file
@@ -7,10 +7,17 @@
 #
 # See "http://visjs.org/docs/network/" for info on the methods for displaying this
 #
+# Nodes and edges are written as compact JSON, and the local copy of vis.js in this
+#  folder is embedded in the page so it works offline. All edges are shown by default;
+#  for large graphs, only the strongest edges of each node can be shown instead (an
+#  edge is kept if it is among the strongest of either of its nodes), and the layout
+#  is computed with a limited number of physics iterations after which physics is
+#  switched off.
+#
 # July 2015
 # John.Fay@duke.edu
 
-import sys, os, arcpy
+import sys, os, csv, json, arcpy
 
 #Input variables
 shCorrelationsCSV = arcpy.GetParameterAsText(0)   # List of variable correlations with presence/absence
@@ -25,6 +32,14 @@ speciesName = os.path.basename(sppFolder)
 visHTML = os.path.join(sppFolder,"{}_correlations.html".format(speciesName))
 arcpy.SetParameterAsText(3,visHTML)               # Output HTML file that will be displayed in a browser
 
+#Optional: maximum number of edges shown per node (0, the default, shows all edges)
+maxEdges = arcpy.GetParameterAsText(4)
+if maxEdges in ("","#"): maxEdges = 0
+else: maxEdges = int(maxEdges)
+
+#Local copy of the vis.js library
+visJS = os.path.join(os.path.dirname(sys.argv[0]),"vis.js")
+
 ## ---Functions---
 def msg(txt,type="message"):
     print txt
@@ -34,7 +49,20 @@ def msg(txt,type="message"):
         arcpy.AddWarning(txt)
     elif type == "error":
         arcpy.AddError(txt)
-        
+
+def strongestPairs(pairs,maxEdges):
+    #Returns the (from, to, value) pairs that are among the maxEdges highest-valued
+    # pairs of either of their nodes, in their original order
+    nodePairs = {}
+    for i in range(len(pairs)):
+        for nodeID in pairs[i][:2]:
+            nodePairs.setdefault(nodeID,[]).append(i)
+    keep = set()
+    for idxList in nodePairs.values():
+        idxList.sort(key=lambda i: pairs[i][2],reverse=True)
+        keep.update(idxList[:maxEdges])
+    return [pairs[i] for i in sorted(keep)]
+
 #------PROCESSES-------
 ## Create a ranking/color dictionary. This converts rankings to sequentially darker colors
 msg("...creating listing of ranking colors")
@@ -48,32 +76,30 @@ border1 = 'red'
 border2 = 'white'
 ##Dictionary
 colorDict = {}
-colorDict["10"] = "{background:'%s',border:'%s'}" %(col0,border1)
-colorDict["11"] = "{background:'%s',border:'%s'}" %(col1,border1)
-colorDict["12"] = "{background:'%s',border:'%s'}" %(col2,border1) 
-colorDict["13"] = "{background:'%s',border:'%s'}" %(col3,border1)
-colorDict["21"] = "{background:'%s',border:'%s'}" %(col1,border2) 
-colorDict["22"] = "{background:'%s',border:'%s'}" %(col2,border2)
-colorDict["23"] = "{background:'%s',border:'%s'}" %(col3,border2)
+colorDict["10"] = {"background":col0,"border":border1}
+colorDict["11"] = {"background":col1,"border":border1}
+colorDict["12"] = {"background":col2,"border":border1}
+colorDict["13"] = {"background":col3,"border":border1}
+colorDict["21"] = {"background":col1,"border":border2}
+colorDict["22"] = {"background":col2,"border":border2}
+colorDict["23"] = {"background":col3,"border":border2}
 
-##Create a dictionary from the fields listed in the species correlations CSV...
-## key-value pairs in this dictionary include the variable name and the correlation value
-## which is used for the size of the node (larger = more correlated with presence/absence
+##Create a list of nodes from the variables listed in the species correlations CSV...
+## the correlation value is used for the size of the node (larger = more correlated with
+## presence/absence). Node IDs run from 1 in the order the variables are listed.
 msg("...creating a list of significant response variables (nodes)")
-nodeDict = {}                       #Create a dictionary of field names/id values
-id = 1                              #Initialize the ID variable
-f = open(shCorrelationsCSV,'rt')    #Open the file
-headers = f.readline()              #Extract/skip the headers line in the CSV
-dataString = f.readline()[:-1]      #Convert the text to string (omitting the newline char at the end
-while dataString:                   #Loop through each line in the CSV
-    data = dataString.split(",")        #Convert text to a list of items
-    name = data[0].strip()              #Set the name to be the variable name (1st column)
-    coef = data[2].strip()              #Set the coef to be the variable name (3rd column)
-    if not name in nodeDict.keys():     #If name isn't in alread included: 
-        nodeDict[name] = (id,coef)          #Add the entry to the dictioary (key=name; val=(id, coef)
-        id += 1                             #Increase the id counter
-    dataString = f.readline()[:-1]      #Read in the next line in the CSV
-f.close()                           #Close the file
+nodeIDs = {}                        #Dictionary of variable name: node id
+nodes = []                          #List of nodes, in id order
+f = open(shCorrelationsCSV,'rt')
+reader = csv.reader(f)
+reader.next()                       #Skip the headers line in the CSV
+for row in reader:
+    if len(row) < 3: continue
+    name = row[0].strip()
+    if not name in nodeIDs:
+        nodeIDs[name] = len(nodes) + 1
+        nodes.append({"id":nodeIDs[name],"value":float(row[2]),"label":name})
+f.close()
 
 ##Create another dictionary of fields, this one with their ranking
 msg("...Reading in variable rankings from rankings file")
@@ -84,43 +110,44 @@ for rec in cur:
     varRank = str(int(rec[1]))    # The variable rank is the last column 
     rankDict[varName] = varRank   # Add the key:value to the dictionary
 del cur
-            
-##Create string from nodeList in the visjs format
-msg("Writing HTML code for variable nodes")
-#Start the string
-nodeString = "      nodes = [\n"
-#Loop through items in the dictionary - but sort them by value (not by variable name)
-for key, value in sorted(nodeDict.iteritems(), key=lambda (k,v): (v,k)):
-    #Get the coefficient from the species correlation dictionary
-    id = value[0]
-    coef = value[1]
-    #coef = nodeDict[key][1]#sppCorDict[key]
-    rank = rankDict[key]
-    color = colorDict[rank]
-    #Add a new line to the string containing its id, value, and label
-    nodeString += "        {0}id:{1},value:{2},label:'{3}',font:'20px Arial black',color:{4}{5},\n".format("{",id,coef,key,color,"}")
-#Finish the string
-nodeString += "      ];\n\n"    
 
-##Make edge string from file
-#Start the string
-msg("Writing HTML code for variable edges")
-edgeString = "      edges = [\n"
-f = open(rvCorrelationsCSV,'rt')    #Open the CSV file (again)
-headers = f.readline()              #Read/skip the header file
-dataString = f.readline()[:-1]      #Convert the text to string (omitting the newline char at the end
-while dataString:                   #Loop through each line in the CSV
-    data = dataString.split(",")        #Convert text to a list of items
-    fromNode = data[0].strip()          #Get the id of the From node
-    fromID = nodeDict[fromNode][0]     
-    toNode = data[1].strip()            #Get the id of the To node
-    toID = nodeDict[toNode][0] 
-    corVal = abs(float(data[2]))        #Get the value (correlation value)
-    #Write the value to the string
-    edgeString += "        {}from:{},to:{},color:'gray',value:{},title:'{}'{},\n".format("{",fromID,toID,corVal,corVal,"}")
-    dataString = f.readline()           #Read in the next line in the CSV
-f.close()                           #Close the file
-edgeString += "      ];\n\n"        #Finish the string
+##Color the nodes by rank
+for node in nodes:
+    rank = rankDict.get(node["label"])
+    if not rank in colorDict:
+        msg("   No ranking found for <{}>".format(node["label"]),"warning")
+        rank = "10"
+    node["color"] = colorDict[rank]
+msg("{} nodes".format(len(nodes)))
+
+##Make the list of edges from the cross correlation file
+msg("...creating a list of correlated variable pairs (edges)")
+pairs = []
+f = open(rvCorrelationsCSV,'rt')
+reader = csv.reader(f)
+reader.next()                       #Skip the headers line in the CSV
+for row in reader:
+    if len(row) < 3: continue
+    fromNode = row[0].strip()
+    toNode = row[1].strip()
+    if fromNode in nodeIDs and toNode in nodeIDs:
+        pairs.append((nodeIDs[fromNode],nodeIDs[toNode],abs(float(row[2]))))
+f.close()
+
+##Keep only each node's strongest edges, if a limit was given
+if maxEdges > 0:
+    keptPairs = strongestPairs(pairs,maxEdges)
+    msg("{} of {} edges kept (strongest {} per node)".format(len(keptPairs),len(pairs),maxEdges))
+    edgeNote = "Showing the strongest {} correlations of each variable ({} of {}).".format(maxEdges,len(keptPairs),len(pairs))
+    pairs = keptPairs
+else:
+    msg("{} edges".format(len(pairs)))
+    edgeNote = "Showing all {} correlations.".format(len(pairs))
+edges = [{"from":fromID,"to":toID,"value":corVal,"title":str(corVal)} for fromID, toID, corVal in pairs]
+
+##Convert the nodes and edges to compact JSON ("</" escaped so it can't close <script>)
+nodeString = "      nodes = {};\n".format(json.dumps(nodes,separators=(",",":")).replace("</","<\\/"))
+edgeString = "      edges = {};\n\n".format(json.dumps(edges,separators=(",",":")).replace("</","<\\/"))
 
 ##Create the output HTML
 #Open the file for writing
@@ -143,12 +170,12 @@ f.write('''
     #ranksDiv{
         line-height:30px;
         background-color:#eeeeee;
-        width:10%%;
+        width:10%;
         float:left;
         padding:5px;	
     }
     #mynetwork {
-            width:85%%;
+            width:85%;
             height: 750px;
             float:left;
             padding:10px;	
@@ -171,10 +198,17 @@ f.write('''
         top: 12px;
     }
   </style>
+''')
 
-  <script type="text/javascript" src="http://visjs.org/dist/vis.js"></script>
-  <link href="http://visjs.org/dist/vis.css" rel="stylesheet" type="text/css" />
+#Embed the local copy of the vis.js library
+f.write('  <script type="text/javascript">\n')
+jsFile = open(visJS,'rt')
+f.write(jsFile.read())
+jsFile.close()
+f.write('\n  </script>\n')
 
+#Continue writing boilerplate
+f.write('''
   <script type="text/javascript">
     var nodes = null;
     var edges = null;
@@ -207,10 +241,19 @@ f.write('''            // Instantiate our network object.
       var options = {
         nodes: {
           shape: 'dot',
+          font: '20px Arial black',
           color: {highlight:{background: 'yellow'}}
         },
+        edges: {
+          color: 'gray',
+          smooth: false
+        },
+        physics: {
+          stabilization: {iterations: 200, updateInterval: 50}
+        },
         interaction: {
-            navigationButtons: true,
+            navigationButtons: false,
+            hideEdgesOnDrag: true,
             zoomView: true,
             selectable: true,
             multiselect: true,
@@ -222,11 +265,16 @@ f.write('''            // Instantiate our network object.
             addEdge: false,
             deleteEdge: false
         },
-        layout: {randomSeed: 2},
+        layout: {randomSeed: 2, improvedLayout: false},
         width: '100%',
         height: '100%'
         };
       network = new vis.Network(container, data, options);
+
+      //Stop the physics simulation once the layout has stabilized
+      network.once("stabilizationIterationsDone", function () {
+        network.setOptions({physics: false});
+      });
       
       //Set network listeners 
       network.on("selectNode", function (params) {
@@ -262,14 +310,14 @@ f.write('''            // Instantiate our network object.
 # Write the species name and the GO! button (which is linked to the writeToFile function)#
 f.write('<h3>{}</h3>'.format(speciesName))
 f.write('''<p>Select nodes for deletion then hit the "Save" button to save redundant nodes to a file.<br>
-<i>Be sure the file is saved in the stats folder of the given species!</i></p>
+<i>Be sure the file is saved in the stats folder of the given species!</i><br>
+{}</p>
 <div id="ranksDiv">Ranks<br>
-''')
+'''.format(edgeNote))
 
 #Create the legend: Rank Colors        
 for i in range(4):
-    idx = str(10 + i); colorTxt = colorDict[str(idx)]
-    color = colorTxt[13:-15]
+    color = colorDict[str(10 + i)]["background"]
     writeString =  '    <div class="input-color">\n' 
     writeString += '        <input type="text" value="{}" />\n'.format(i) 
     writeString += '        <div class="color-box" style="background-color:{};"></div>\n'.format(color)
@@ -7,6 +7,7 @@
 # John.Fay@duke.edu
 
 import arcpy, sys, os, csv
+import MISC_HUCIndex as hucTools
 arcpy.env.overwriteOutput = 1
 
 # Input variables
@@ -92,7 +93,7 @@ catchLyr = arcpy.MakeFeatureLayer_management(SpeciesFC,"catchLyr","","",fldInfo)
 if HUCFilter in ("","#"):
     whereClause = ""
 else:
-    whereClause = "REACHCODE LIKE '{}%'".format(HUCFilter)
+    whereClause = hucTools.hucWhereClause([HUCFilter])
 
 #Make a copy of the feature layer
 msg("Selecting catchment features")
@@ -0,0 +1,161 @@
+# MAXENT_Lambdas.py
+#
+# Description: Reads a trained MaxEnt model (the [species].lambdas file MaxEnt writes
+#  to its output folder) and computes the model's predictions for a set of catchments,
+#  so a model can be projected onto scenario conditions without running MaxEnt again.
+#  This is a helper module imported by the scripts in this folder; it is not run as a
+#  tool itself.
+#
+# Each line of a lambdas file lists a feature, its weight (lambda) and the minimum and
+#  maximum values used to scale it. Features are written as:
+#   var           linear           (x - min) / (max - min)
+#   var^2         quadratic        (x^2 - min) / (max - min)
+#   var1*var2     product          (x1 * x2 - min) / (max - min)
+#   'var          forward hinge    (x - min) / (max - min) where x > min, else 0
+#   `var          reverse hinge    (max - x) / (max - min) where x < max, else 0
+#   (t<var)       threshold        1 where x > t, else 0
+#   (var=v)       categorical      1 where x == v, else 0
+#  followed by the linearPredictorNormalizer, densityNormalizer, numBackgroundPoints
+#  and entropy of the model. With S the sum of lambda * feature over all features:
+#   raw      = exp(S - linearPredictorNormalizer) / densityNormalizer
+#   logistic = c * raw / (1 + c * raw), where c = exp(entropy)
+#   cloglog  = 1 - exp(-c * raw)
+#
+# As MaxEnt does by default, features are clamped to the range they had in the training
+#  data (linear, quadratic and product features to [min, max]; hinges to [0, 1]).
+#  Records with a missing value (NaN or NODATA) in any of the model's variables are
+#  given the NODATA value.
+#
+# Tolerance: predictions match MaxEnt's own to within 1e-5 (logistic) or 1e-5 relative
+#  (raw), as Tests\test_MaxentLambdas.py checks against a maxent.jar (3.3.3k) run kept
+#  in Tests\Fixtures\MaxEnt. The lambdas file holds the weights at full precision, so
+#  differences come from MaxEnt rounding the values it writes to its output files.
+#  (MaxEnt 3.3.3k has no cloglog output, so cloglog predictions aren't checked.)
+#
+# Fall 2026
+
+import os, numpy
+
+# Value given to records with missing data, as in MaxEnt ASCII grids
+NODATA = -9999
+
+## ---Functions---
+def parseFeature(name):
+    #Returns the type, variables and threshold/category value of the feature name
+    if name.startswith("'"):
+        return "hinge", [name[1:]], None
+    if name.startswith("`"):
+        return "revhinge", [name[1:]], None
+    if name.startswith("(") and name.endswith(")"):
+        inner = name[1:-1]
+        if "<" in inner:
+            threshold, varName = inner.split("<",1)
+            return "threshold", [varName], float(threshold)
+        varName, category = inner.rsplit("=",1)
+        return "categorical", [varName], float(category)
+    if name.endswith("^2"):
+        return "quadratic", [name[:-2]], None
+    if "*" in name:
+        return "product", name.split("*",1), None
+    return "linear", [name], None
+
+def readLambdas(lambdasFN):
+    #Reads the lambdas file into a dictionary holding the list of features (each a
+    # dictionary of type, vars, lambda, min, max, and value) and the normalizers
+    model = {"features":[]}
+    f = open(lambdasFN,'rt')
+    for line in f:
+        items = [item.strip() for item in line.split(",")]
+        if len(items) == 4:
+            featureType, varNames, value = parseFeature(items[0])
+            model["features"].append({"name":items[0],
+                                      "type":featureType,
+                                      "vars":varNames,
+                                      "lambda":float(items[1]),
+                                      "min":float(items[2]),
+                                      "max":float(items[3]),
+                                      "value":value})
+        elif len(items) == 2:
+            model[items[0]] = float(items[1])
+    f.close()
+    for key in ("linearPredictorNormalizer","densityNormalizer","entropy"):
+        if not key in model:
+            raise ValueError("{} not found in {}".format(key,lambdasFN))
+    #Drop features with no weight; they don't affect the predictions
+    model["features"] = [feature for feature in model["features"] if feature["lambda"] != 0]
+    return model
+
+def modelVariables(model):
+    #Returns the sorted list of variables used by the model's features
+    varNames = set()
+    for feature in model["features"]:
+        varNames.update(feature["vars"])
+    return sorted(varNames)
+
+def featureValues(feature,data,clamp=True):
+    #Returns the feature's values for the records. data is a dictionary (or record
+    # array) of variable name: array of values.
+    x = numpy.asarray(data[feature["vars"][0]],dtype="float64")
+    fMin, fMax = feature["min"], feature["max"]
+    featureType = feature["type"]
+    if featureType == "threshold":
+        return (x > feature["value"]).astype("float64")
+    if featureType == "categorical":
+        return (x == feature["value"]).astype("float64")
+    if featureType in ("hinge","revhinge"):
+        if fMax == fMin: return numpy.zeros(x.shape)
+        if featureType == "hinge": values = numpy.where(x > fMin,(x - fMin) / (fMax - fMin),0.0)
+        else: values = numpy.where(x < fMax,(fMax - x) / (fMax - fMin),0.0)
+        if clamp: values = numpy.minimum(values,1.0)
+        return values
+    if featureType == "quadratic": values = x * x
+    elif featureType == "product": values = x * numpy.asarray(data[feature["vars"][1]],dtype="float64")
+    else: values = x
+    if clamp: values = numpy.clip(values,fMin,fMax)
+    if fMax == fMin: return numpy.zeros(x.shape)
+    return (values - fMin) / (fMax - fMin)
+
+def recordCount(data):
+    #Returns the number of records in data, a record array or a dictionary of arrays
+    if hasattr(data,"dtype"): return len(data)
+    return len(list(data.values())[0])
+
+def linearPredictor(model,data,clamp=True):
+    #Returns the sum of lambda * feature value over the model's features for each record
+    total = numpy.zeros(recordCount(data),dtype="float64")
+    for feature in model["features"]:
+        total += feature["lambda"] * featureValues(feature,data,clamp)
+    return total
+
+def missingRecords(model,data,nodata=NODATA):
+    #Returns a boolean array flagging records with a missing value in any model variable
+    isMissing = None
+    for varName in modelVariables(model):
+        x = numpy.asarray(data[varName],dtype="float64")
+        varMissing = numpy.isnan(x) | (x == nodata)
+        if isMissing is None: isMissing = varMissing
+        else: isMissing |= varMissing
+    return isMissing
+
+def predict(model,data,outputFormat="logistic",clamp=True,nodata=NODATA):
+    #Returns the model's predictions (raw, logistic or cloglog) for the records in data,
+    # a dictionary (or record array) of variable name: array of values. Records with
+    # missing values are given the nodata value.
+    with numpy.errstate(divide="ignore",invalid="ignore",over="ignore"):
+        raw = numpy.exp(linearPredictor(model,data,clamp) - model["linearPredictorNormalizer"]) / model["densityNormalizer"]
+        if outputFormat == "raw":
+            predictions = raw
+        elif outputFormat == "logistic":
+            predictions = 1.0 / (1.0 + 1.0 / (numpy.exp(model["entropy"]) * raw))
+        elif outputFormat == "cloglog":
+            predictions = 1.0 - numpy.exp(-numpy.exp(model["entropy"]) * raw)
+        else:
+            raise ValueError("Unknown output format: {}".format(outputFormat))
+    isMissing = missingRecords(model,data,nodata)
+    if isMissing is not None:
+        predictions[isMissing] = nodata
+    return predictions
+
+def lambdasFilename(outputFolder,speciesName):
+    #Returns the name of the species' lambdas file in a MaxEnt output folder
+    return os.path.join(outputFolder,"{}.lambdas".format(speciesName))
@@ -0,0 +1,87 @@
+# MAXENT_TrainModels.py
+#
+# Description: Trains MaxEnt models for one or more species without Java, using the
+#  Python trainer in MAXENT_Trainer. Each species' model is fit to its SWD file (from
+#  HABMODEL_CreateSWDFile) and its outputs are written to the species' Output folder,
+#  as RunMaxent.bat would write them:
+#  - [species].lambdas (the model, read by MAXENT_Lambdas and UPLIFT_ModelChanges)
+#  - [species].csv (predictions for all records in the SWD file)
+#  - maxentResults.csv and maxent.log (read by MAXENT_DisplayModelResults and
+#    MAXENT_SavePredictions)
+#
+# The trainer approximates maxent.jar (see MAXENT_Trainer), so maxentResults.csv and
+#  maxent.log record the trainer and its settings.
+#
+# Several species can be given (semicolon separated), in which case they are trained
+#  in parallel, each in its own process.
+#
+# Fall 2026
+
+import sys, os, arcpy
+import HABMODEL_DataTools as dataTools
+import MAXENT_Trainer as maxentTrainer
+
+## ---Functions---
+def msg(txt,type="message"):
+    print txt
+    if type == "message":
+        arcpy.AddMessage(txt)
+    elif type == "warning":
+        arcpy.AddWarning(txt)
+    elif type == "error":
+        arcpy.AddError(txt)
+
+def checkFile(fileName):
+    #Checks whether file exists. Sends error and exits if not.
+    if not os.path.exists(fileName):
+        msg("File {} does not exist.\nExiting.".format(fileName),"error")
+        sys.exit(1)
+    else:
+        return
+
+def reportModel(speciesName,results):
+    #Reports the training statistics returned by maxentTrainer.trainSpecies
+    msg("{}:".format(speciesName))
+    msg("   {} presences, {} background points; features: {}".format(results["#Training samples"],results["#Background points"],results["Feature classes"]))
+    msg("   {} features used; {} iterations".format(results["Number of features"],results["Iterations"]))
+    msg("   Training gain: {:.4f}; training AUC: {:.4f}".format(results["Regularized training gain"],results["Training AUC"]))
+
+#The processes are run only when the script is run as a tool, not when it is imported
+# by the worker processes
+if __name__ == "__main__":
+    # Input variables
+    speciesNames = arcpy.GetParameterAsText(0) # Name of species to model (semicolon separated for several)
+    statsFolder = arcpy.GetParameterAsText(1)  # Stats root folder name
+    outputFormat = arcpy.GetParameterAsText(2) # Optional: format of the predictions: logistic (default), cloglog or raw
+    processes = arcpy.GetParameterAsText(3)    # Optional: number of species to train at once (default: number of CPUs)
+
+    if outputFormat in ("","#"): outputFormat = "logistic"
+    if processes in ("","#"): processes = None
+    else: processes = int(processes)
+
+    ## ---SET SCRIPT VARIABLES---
+    sppNames = [sppName.strip().strip("'") for sppName in speciesNames.split(";") if sppName.strip()]
+    for sppName in sppNames:
+        checkFile(os.path.join(statsFolder,sppName,"{}_SWD.csv".format(sppName)))
+
+    # Output variable (derived)
+    arcpy.SetParameterAsText(4,";".join([os.path.join(statsFolder,sppName,"Output") for sppName in sppNames])) #Output folder(s)
+
+    ## ------------------------Processes-----------------------
+    try:
+        if len(sppNames) == 1:
+            msg("Training model")
+            reportModel(sppNames[0],maxentTrainer.trainSpecies(os.path.join(statsFolder,sppNames[0]),sppNames[0],outputFormat))
+        else:
+            msg("Training models for {} species".format(len(sppNames)))
+            pool = dataTools.processPool(processes)
+            results = [pool.apply_async(maxentTrainer.trainSpecies,(os.path.join(statsFolder,sppName),sppName,outputFormat)) for sppName in sppNames]
+            pool.close()
+            for sppName, result in zip(sppNames,results):
+                reportModel(sppName,result.get())
+            pool.join()
+    except ValueError as e:
+        msg("{}.\nExiting.".format(e),"error")
+        sys.exit(1)
+
+    msg("Finished")
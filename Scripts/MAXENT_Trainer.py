@@ -0,0 +1,319 @@
+# MAXENT_Trainer.py
+#
+# Description: Fits a maximum entropy (MaxEnt) habitat model to a species' SWD file in
+#  Python, as an alternative to running maxent.jar. This is a helper module imported
+#  by the scripts in this folder; it is not run as a tool itself (see
+#  MAXENT_TrainModels).
+#
+# Features are built as MaxEnt builds them, and written to a lambdas file that
+#  MAXENT_Lambdas (and MaxEnt itself) can read:
+#  - linear, quadratic, product, hinge and threshold features of the continuous
+#    variables, with the feature classes chosen from the number of presences as
+#    MaxEnt's "auto features" setting does (L < 10 <= LQ < 15 <= LQH < 80 <= LQPHT);
+#  - categorical (indicator) features of the categorical variables (StreamOrde and
+#    FCODE, which the batch files toggle to categorical).
+#  Hinge and threshold knots are placed at quantiles of each variable rather than at
+#  every distinct value, and at most MAXBACKGROUND background records (a fixed random
+#  sample) are used, to bound memory use.
+#
+# The model minimizes the negative log likelihood of the presences, relative to the
+#  background (with the presences added to the background, as MaxEnt does), plus an
+#  L1 penalty on each feature weight scaled by MaxEnt's default regularization
+#  multipliers. It is fit by accelerated proximal gradient descent (FISTA), in which
+#  each step is a pair of matrix products over the feature matrix.
+#
+# Outputs, written to the species' Output folder as MaxEnt writes them, are the
+#  lambdas file, the predictions for all records in the SWD file ([species].csv), a
+#  maxentResults.csv with the training statistics and the "balance" threshold read
+#  by MAXENT_DisplayModelResults and MAXENT_SavePredictions, and a maxent.log file.
+#  The training AUC is computed as MaxEnt computes it, against the background with the
+#  presences added.
+#
+# The trainer approximates maxent.jar rather than reproducing it (knots at quantiles, a
+#  sampled background, a different optimizer, and only the main columns of
+#  maxentResults.csv), so maxentResults.csv and maxent.log record the trainer and its
+#  settings (the "Trainer" column and those after it) to tell its outputs from
+#  maxent.jar's. On the maxent.jar fixture in Tests\Fixtures\MaxEnt the training AUC is
+#  within 0.01 and the regularized and unregularized training gains within 0.02 of
+#  maxent.jar's (see Tests\test_MaxentTrainer.py).
+#
+# Fall 2026
+
+import os, csv, time, numpy
+import MAXENT_Lambdas as maxentLambdas
+
+# Name recorded as the trainer in maxentResults.csv and maxent.log
+TRAINER = "MAXENT_Trainer"
+
+# Variables treated as categorical
+CATEGORICAL = ("StreamOrde","FCODE")
+
+# Number of hinge/threshold knots per variable
+KNOTS = 10
+
+# Maximum number of background records used to fit the model
+MAXBACKGROUND = 10000
+
+# Maximum iterations and convergence threshold (change in loss), as MaxEnt's defaults
+MAXITERATIONS = 500
+CONVERGENCE = 1e-5
+
+# Name of the threshold column read by the MAXENT_ tools
+BALANCEFIELD = "Balance training omission, predicted area and threshold value"
+
+## ---Functions---
+def readSWD(swdFN):
+    #Reads a SWD file. Returns the column names of the variables, a boolean array
+    # flagging the presences, the X and Y (GRIDCODE and REACHCODE) values as text,
+    # and the (records x variables) array of values.
+    f = open(swdFN,'rt')
+    reader = csv.reader(f)
+    header = [item.strip() for item in next(reader)]
+    labels, xValues, yValues, rows = [], [], [], []
+    for row in reader:
+        if not row: continue
+        labels.append(row[0])
+        xValues.append(row[1])
+        yValues.append(row[2])
+        rows.append(row[3:])
+    f.close()
+    isPresence = numpy.array([label != "Background" for label in labels],dtype="bool")
+    return header[3:], isPresence, xValues, yValues, numpy.array(rows,dtype="float64").reshape(-1,len(header) - 3)
+
+def featureClasses(nPresences):
+    #Returns the feature classes MaxEnt's "auto features" setting uses
+    if nPresences >= 80: return "lqpht"
+    if nPresences >= 15: return "lqh"
+    if nPresences >= 10: return "lq"
+    return "l"
+
+def betaMultipliers(nPresences,classes):
+    #Returns MaxEnt's default regularization multipliers for each feature type
+    if "p" in classes: betaLQP = numpy.interp(nPresences,[0,30,100],[2.6,1.6,0.9])
+    else: betaLQP = numpy.interp(nPresences,[10,30,100],[1.0,0.2,0.05])
+    return {"linear":betaLQP,
+            "quadratic":betaLQP,
+            "product":betaLQP,
+            "hinge":0.5,
+            "revhinge":0.5,
+            "threshold":numpy.interp(nPresences,[0,100],[2.0,1.0]),
+            "categorical":numpy.interp(nPresences,[0,10,17],[0.65,0.5,0.25])}
+
+def buildFeatures(varNames,arrData,classes):
+    #Returns the list of features (in the dictionary form used by MAXENT_Lambdas) of
+    # the given classes for the variables, scaled to the range of the data
+    features = []
+    def addFeature(name,featureType,vars,fMin,fMax,value=None):
+        if fMax > fMin:
+            features.append({"name":name,"type":featureType,"vars":vars,"lambda":0.0,
+                             "min":float(fMin),"max":float(fMax),"value":value})
+    contVars = [i for i in range(len(varNames)) if not varNames[i] in CATEGORICAL]
+    for i in range(len(varNames)):
+        x = arrData[:,i]
+        name = varNames[i]
+        if not i in contVars:
+            for category in numpy.unique(x):
+                addFeature("({}={})".format(name,repr(float(category))),"categorical",[name],0,1,float(category))
+            continue
+        addFeature(name,"linear",[name],x.min(),x.max())
+        if "q" in classes:
+            addFeature(name + "^2","quadratic",[name],(x * x).min(),(x * x).max())
+        if "h" in classes or "t" in classes:
+            knots = numpy.unique(numpy.percentile(x,numpy.linspace(0,100,KNOTS + 2)[1:-1]))
+            for knot in knots:
+                if "h" in classes:
+                    addFeature("'" + name,"hinge",[name],knot,x.max())
+                    addFeature("`" + name,"revhinge",[name],x.min(),knot)
+                if "t" in classes and x.min() < knot < x.max():
+                    addFeature("({}<{})".format(repr(float(knot)),name),"threshold",[name],0,1,float(knot))
+    if "p" in classes:
+        for j in range(len(contVars)):
+            for k in range(j + 1,len(contVars)):
+                product = arrData[:,contVars[j]] * arrData[:,contVars[k]]
+                addFeature("{}*{}".format(varNames[contVars[j]],varNames[contVars[k]]),"product",
+                           [varNames[contVars[j]],varNames[contVars[k]]],product.min(),product.max())
+    return features
+
+def featureMatrix(features,data):
+    #Returns the (records x features) matrix of feature values
+    arrF = numpy.empty((maxentLambdas.recordCount(data),len(features)),dtype="float64")
+    for j in range(len(features)):
+        arrF[:,j] = maxentLambdas.featureValues(features[j],data,clamp=False)
+    return arrF
+
+def logSumExp(s):
+    #Returns log(sum(exp(s))) without overflow
+    sMax = s.max()
+    return sMax + numpy.log(numpy.exp(s - sMax).sum())
+
+def fitWeights(arrFBkgd,presMeans,sigmas):
+    #Minimizes log(mean(exp(F.w))) - w.presMeans + sum(sigmas * |w|) over the feature
+    # weights w by accelerated proximal gradient descent with backtracking. Returns
+    # the weights, the number of iterations, and the final loss.
+    nFeat = arrFBkgd.shape[1]
+    logN = numpy.log(arrFBkgd.shape[0])
+    def smoothLoss(w):
+        s = numpy.dot(arrFBkgd,w)
+        logZ = logSumExp(s)
+        return logZ - logN - numpy.dot(w,presMeans), s, logZ
+    def gradient(s,logZ):
+        return numpy.dot(arrFBkgd.T,numpy.exp(s - logZ)) - presMeans
+    w = numpy.zeros(nFeat)
+    v = w.copy()
+    t = 1.0
+    stepSize = 1.0
+    loss = smoothLoss(w)[0]
+    for iteration in range(1,MAXITERATIONS + 1):
+        f, s, logZ = smoothLoss(v)
+        g = gradient(s,logZ)
+        #Backtrack until the quadratic upper bound holds
+        while True:
+            z = v - stepSize * g
+            wNew = numpy.sign(z) * numpy.maximum(numpy.abs(z) - stepSize * sigmas,0.0)
+            d = wNew - v
+            fNew = smoothLoss(wNew)[0]
+            if fNew <= f + numpy.dot(g,d) + numpy.dot(d,d) / (2.0 * stepSize) + 1e-12:
+                break
+            stepSize *= 0.5
+        newLoss = fNew + numpy.dot(sigmas,numpy.abs(wNew))
+        tNew = (1.0 + numpy.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        if newLoss > loss:
+            #Restart the momentum if the loss went up
+            v = w.copy()
+            t = 1.0
+            continue
+        v = wNew + ((t - 1.0) / tNew) * (wNew - w)
+        converged = loss - newLoss < CONVERGENCE
+        w, t, loss = wNew, tNew, newLoss
+        if converged: break
+    return w, iteration, loss
+
+def trainingAUC(presValues,bkgdValues):
+    #Returns the area under the ROC curve of presence vs. background values
+    values = numpy.concatenate([presValues,bkgdValues])
+    uniqValues, inverse = numpy.unique(values,return_inverse=True)
+    counts = numpy.bincount(inverse)
+    avgRanks = numpy.cumsum(counts) - (counts - 1) / 2.0   #Average rank of tied values
+    nPres, nBkgd = len(presValues), len(bkgdValues)
+    rankSum = avgRanks[inverse[:nPres]].sum()
+    return (rankSum - nPres * (nPres + 1) / 2.0) / (nPres * nBkgd)
+
+def balanceThreshold(presLogistic,bkgdLogistic,bkgdRaw):
+    #Returns MaxEnt's "balance training omission, predicted area and threshold value"
+    # threshold, which minimizes 6 * omission + 0.04 * cumulative threshold + 1.6 *
+    # fractional predicted area, as the (logistic, cumulative, area, omission) values
+    order = numpy.argsort(bkgdLogistic)
+    sortedBkgd = bkgdLogistic[order]
+    cumRaw = numpy.concatenate([[0.0],numpy.cumsum(bkgdRaw[order]) / bkgdRaw.sum()])
+    candidates = numpy.unique(presLogistic)
+    omission = numpy.searchsorted(numpy.sort(presLogistic),candidates,"left") / float(len(presLogistic))
+    nBelow = numpy.searchsorted(sortedBkgd,candidates,"left")
+    area = 1.0 - nBelow / float(len(sortedBkgd))
+    cumulative = 100.0 * cumRaw[nBelow]
+    best = numpy.argmin(6.0 * omission + 0.04 * cumulative + 1.6 * area)
+    return candidates[best], cumulative[best], area[best], omission[best]
+
+def writeLambdas(lambdasFN,features,normalizers):
+    #Writes the features and normalizers in MaxEnt's lambdas file format
+    f = open(lambdasFN,'w')
+    for feature in features:
+        f.write("{}, {}, {}, {}\n".format(feature["name"],repr(feature["lambda"]),repr(feature["min"]),repr(feature["max"])))
+    for key in ("linearPredictorNormalizer","densityNormalizer","numBackgroundPoints","entropy"):
+        f.write("{}, {}\n".format(key,repr(normalizers[key])))
+    f.close()
+
+def trainSpecies(sppFolder,speciesName,outputFormat="logistic"):
+    #Trains the species' model from its SWD file and writes the outputs to its Output
+    # folder. Returns the model's row of maxentResults.csv as a dictionary. Can be run
+    # in a worker process (see HABMODEL_DataTools.processPool).
+    startTime = time.time()
+    swdFN = os.path.join(sppFolder,"{}_SWD.csv".format(speciesName))
+    outDir = os.path.join(sppFolder,"Output")
+    if not os.path.exists(outDir): os.mkdir(outDir)
+    varNames, isPresence, xValues, yValues, arrData = readSWD(swdFN)
+    nPres = int(isPresence.sum())
+    if nPres == 0:
+        raise ValueError("No presences found in {}".format(swdFN))
+
+    #Set the background: a fixed sample of the background records, plus the presences
+    bkgdRows = numpy.nonzero(~isPresence)[0]
+    if len(bkgdRows) > MAXBACKGROUND:
+        bkgdRows = numpy.sort(numpy.random.RandomState(0).choice(bkgdRows,MAXBACKGROUND,replace=False))
+    bkgdRows = numpy.concatenate([bkgdRows,numpy.nonzero(isPresence)[0]])
+    bkgdData = dict([(varNames[i],arrData[bkgdRows,i]) for i in range(len(varNames))])
+
+    #Build the features and their regularization
+    classes = featureClasses(nPres)
+    features = buildFeatures(varNames,arrData[bkgdRows],classes)
+    arrFBkgd = featureMatrix(features,bkgdData)
+    arrFPres = arrFBkgd[-nPres:]
+    betas = betaMultipliers(nPres,classes)
+    presSD = numpy.maximum(arrFPres.std(axis=0),0.001)
+    sigmas = numpy.array([betas[feature["type"]] for feature in features]) * presSD / numpy.sqrt(nPres)
+
+    #Fit the weights
+    weights, iterations, loss = fitWeights(arrFBkgd,arrFPres.mean(axis=0),sigmas)
+    for j in range(len(features)):
+        features[j]["lambda"] = float(weights[j])
+
+    #Compute the normalizers: raw values sum to 1 over the background
+    s = numpy.dot(arrFBkgd,weights)
+    lpn = float(s.max())
+    densityNormalizer = float(numpy.exp(s - lpn).sum())
+    bkgdRaw = numpy.exp(s - lpn) / densityNormalizer
+    normalizers = {"linearPredictorNormalizer":lpn,
+                   "densityNormalizer":densityNormalizer,
+                   "numBackgroundPoints":len(bkgdRows),
+                   "entropy":float(-(bkgdRaw * numpy.log(bkgdRaw)).sum())}
+    writeLambdas(maxentLambdas.lambdasFilename(outDir,speciesName),[feature for feature in features if feature["lambda"] != 0],normalizers)
+    model = dict(normalizers)
+    model["features"] = [feature for feature in features if feature["lambda"] != 0]
+
+    #Compute the training statistics
+    bkgdLogistic = maxentLambdas.predict(model,bkgdData,"logistic")
+    presLogistic = bkgdLogistic[-nPres:]
+    unregGain = numpy.dot(sigmas,numpy.abs(weights)) - loss
+    threshold, cumulative, area, omission = balanceThreshold(presLogistic,bkgdLogistic,bkgdRaw)
+    results = [("Species",speciesName),
+               ("#Training samples",nPres),
+               ("Regularized training gain",-loss),
+               ("Unregularized training gain",unregGain),
+               ("Iterations",iterations),
+               ("Training AUC",trainingAUC(presLogistic,bkgdLogistic)),
+               ("#Background points",len(bkgdRows)),
+               ("Feature classes",classes),
+               ("Number of features",len(model["features"])),
+               (BALANCEFIELD + " cumulative threshold",cumulative),
+               (BALANCEFIELD + " logistic threshold",threshold),
+               (BALANCEFIELD + " area",area),
+               (BALANCEFIELD + " training omission",omission),
+               ("Entropy",normalizers["entropy"]),
+               ("Prevalence (average of logistic output over background sites)",float(bkgdLogistic.mean())),
+               ("Trainer",TRAINER),
+               ("Hinge and threshold knots",KNOTS),
+               ("Maximum background points",MAXBACKGROUND),
+               ("Maximum iterations",MAXITERATIONS),
+               ("Convergence threshold",CONVERGENCE)]
+    f = open(os.path.join(outDir,"maxentResults.csv"),'wb')
+    writer = csv.writer(f)
+    writer.writerow([key for key, value in results])
+    writer.writerow([value for key, value in results])
+    f.close()
+
+    #Write the predictions for all records of the SWD file
+    allData = dict([(varNames[i],arrData[:,i]) for i in range(len(varNames))])
+    predictions = maxentLambdas.predict(model,allData,outputFormat)
+    f = open(os.path.join(outDir,"{}.csv".format(speciesName)),'wb')
+    writer = csv.writer(f)
+    writer.writerow(["X","Y","{} {} values".format(speciesName,outputFormat)])
+    writer.writerows(zip(xValues,yValues,predictions.tolist()))
+    f.close()
+
+    #Write the log file
+    f = open(os.path.join(outDir,"maxent.log"),'w')
+    f.write("Model trained with {} (an approximation of MaxEnt; not maxent.jar) from {}\n".format(TRAINER,swdFN))
+    for key, value in results:
+        f.write("{}: {}\n".format(key,value))
+    f.write("Run time: {:.1f} seconds\n".format(time.time() - startTime))
+    f.close()
+    return dict(results)
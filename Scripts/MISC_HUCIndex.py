@@ -0,0 +1,168 @@
+# MISC_HUCIndex.py
+#
+# Description: Selects catchments by HUC (any HUC2 - HUC12 prefix of the REACHCODE) using
+#  range queries instead of chains of "REACHCODE LIKE 'xxx%' OR ..." clauses. This is a
+#  helper module imported by the scripts in this folder; it is not run as a tool itself.
+#
+# The HUC index is the table's REACHCODE values, sorted, along with the GRIDCODE of each
+#  catchment. All catchments sharing a HUC prefix form a contiguous block in the index,
+#  so a HUC lookup is a pair of binary searches. The index is saved (as a NumPy .npz
+#  file) in the project's Scratch folder along with the record count and modification
+#  time of the table's own files (e.g. a shapefile's files, or the files of a file
+#  geodatabase table, found through the geodatabase's catalog), and is rebuilt if either
+#  changes. Tables whose files can't be found (e.g. in_memory or SDE tables) are indexed
+#  again each time.
+#
+# Where clauses built from the index merge HUCs that are adjacent in the index (i.e., no
+#  other catchments fall between them) into a single range, so a list of neighboring
+#  HUC8s becomes a few "REACHCODE >= 'a' AND REACHCODE < 'b'" ranges. These ranges can
+#  use an attribute index on REACHCODE, which is added when the HUC index is built.
+#
+# Fall 2026
+
+import os, struct, hashlib, arcpy, numpy
+
+# Folder in which HUC index files are saved
+scratchFolder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),"Scratch")
+
+## ---Functions---
+def nextPrefix(huc):
+    #Returns the smallest string greater than all strings starting with huc
+    # (e.g. "03030002" -> "03030003")
+    return huc[:-1] + chr(ord(huc[-1]) + 1)
+
+def rangeClause(lowHUC,highHUC,fldName="REACHCODE"):
+    #Returns a where clause selecting all REACHCODEs starting with lowHUC through highHUC
+    return "({0} >= '{1}' AND {0} < '{2}')".format(fldName,lowHUC,nextPrefix(highHUC))
+
+def indexFilename(tbl):
+    #Returns the name of the file holding the HUC index for the table
+    tblName = os.path.basename(tbl).split(".")[0]
+    tblHash = hashlib.md5(os.path.abspath(tbl).lower()).hexdigest()[:8]
+    return os.path.join(scratchFolder,"HUCIndex_{}_{}.npz".format(tblName,tblHash))
+
+def gdbTableFiles(gdb,tblName):
+    #Returns the files of a table in a file geodatabase. Each table's files are named
+    # for its row in the geodatabase's system catalog (a00000001.gdbtable), e.g.
+    # a00000009.gdbtable, .gdbtablx and .gdbindexes for the ninth; the catalog's rows
+    # are found through its .gdbtablx file of row offsets and matched to the table's
+    # name (stored as a one byte length and UTF-8 characters). Returns None if the
+    # catalog can't be read (e.g. a newer format, or a sparse catalog) or has no
+    # such table.
+    try:
+        f = open(os.path.join(gdb,"a00000001.gdbtablx"),"rb")
+        magic, nBlocks, nRows, offsetSize = struct.unpack("<4i",f.read(16))
+        offsets = f.read(nRows * offsetSize)
+        f.close()
+        if magic != 3 or nBlocks != (nRows + 1023) // 1024 or len(offsets) != nRows * offsetSize:
+            return None
+        f = open(os.path.join(gdb,"a00000001.gdbtable"),"rb")
+        catalog = f.read()
+        f.close()
+    except (IOError,OSError,struct.error):
+        return None
+    name = bytearray(tblName.lower().encode("utf-8"))
+    for row in range(nRows):
+        offset = sum([bytearray(offsets[row * offsetSize:(row + 1) * offsetSize])[i] << (8 * i) for i in range(offsetSize)])
+        if offset == 0: continue   #Deleted row
+        rowBytes = bytearray(catalog[offset + 4:offset + 4 + len(name) + 2])
+        #The name follows the row's null flags (none or one byte)
+        for start in (0,1):
+            if rowBytes[start:start + 1] == bytearray([len(name)]) and rowBytes[start + 1:start + 1 + len(name)].lower() == name:
+                prefix = "a{:08x}.".format(row + 1)
+                return [os.path.join(gdb,fileName) for fileName in os.listdir(gdb) if fileName.lower().startswith(prefix)]
+    return None
+
+def tableStamp(tbl):
+    #Returns the latest modification time and total size of the table's own files: the
+    # files sharing its name (e.g. a shapefile's .shp, .dbf, ...) or, for a table in a
+    # file geodatabase, its files found through the geodatabase's catalog (see
+    # gdbTableFiles). Returns None if the table isn't held in files or its files can't
+    # be found.
+    path = os.path.abspath(tbl)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path: return None
+        path = parent
+    if os.path.isfile(path):
+        root = os.path.splitext(os.path.basename(path))[0]
+        folder = os.path.dirname(path)
+        fileNames = [os.path.join(folder,f) for f in os.listdir(folder) if os.path.splitext(f)[0] == root]
+    elif path.lower().endswith(".gdb"):
+        fileNames = gdbTableFiles(path,os.path.basename(tbl))
+    else:
+        return None
+    fileStats = [os.stat(f) for f in fileNames or [] if os.path.isfile(f)]
+    if not fileStats: return None
+    return "{!r}:{}".format(max([st.st_mtime for st in fileStats]),sum([st.st_size for st in fileStats]))
+
+def buildHUCIndex(tbl):
+    #Reads the REACHCODE and GRIDCODE values of the table and returns them sorted by REACHCODE
+    arrRecs = arcpy.da.TableToNumPyArray(tbl,["REACHCODE","GRIDCODE"],null_value={"REACHCODE":"","GRIDCODE":-9999})
+    order = numpy.argsort(arrRecs["REACHCODE"],kind="mergesort")
+    hucIndex = {"REACHCODE":arrRecs["REACHCODE"][order],
+                "GRIDCODE":arrRecs["GRIDCODE"][order]}
+    #Add an attribute index to the REACHCODE field so range queries can use it
+    try:
+        if not "REACHCODE_IDX" in [idx.name for idx in arcpy.ListIndexes(tbl)]:
+            arcpy.AddIndex_management(tbl,"REACHCODE","REACHCODE_IDX")
+    except (arcpy.ExecuteError,RuntimeError) as e:
+        #Not all workspaces (e.g. in_memory) support attribute indexes
+        arcpy.AddWarning("No attribute index added to {}: {}".format(tbl,e))
+    return hucIndex
+
+def getHUCIndex(tbl,rebuild=False):
+    #Returns the HUC index of the table, loading it from the Scratch folder if it has
+    # already been built for the table with the same number of records and files that
+    # haven't been modified since (see tableStamp)
+    indexFN = indexFilename(tbl)
+    recCount = int(arcpy.GetCount_management(tbl).getOutput(0))
+    stamp = tableStamp(tbl)
+    if os.path.exists(indexFN) and stamp and not rebuild:
+        arrFile = numpy.load(indexFN)
+        if len(arrFile["REACHCODE"]) == recCount and "STAMP" in arrFile.files and str(arrFile["STAMP"]) == stamp:
+            return {"REACHCODE":arrFile["REACHCODE"],"GRIDCODE":arrFile["GRIDCODE"]}
+    hucIndex = buildHUCIndex(tbl)
+    #Stamp the index after it is built, as adding the attribute index modifies the table's files
+    stamp = tableStamp(tbl)
+    if os.path.exists(scratchFolder) and stamp:
+        numpy.savez(indexFN,STAMP=numpy.array(stamp),**hucIndex)
+    return hucIndex
+
+def hucRange(hucIndex,huc):
+    #Returns the start and end position of the catchments in the HUC in the index
+    reachcodes = hucIndex["REACHCODE"]
+    start = numpy.searchsorted(reachcodes,huc,"left")
+    end = numpy.searchsorted(reachcodes,nextPrefix(huc),"left")
+    return int(start), int(end)
+
+def hucWhereClause(hucs,hucIndex=None,fldName="REACHCODE"):
+    #Returns a where clause selecting the catchments in the list of HUCs as REACHCODE
+    # ranges. If a HUC index is given, HUCs with no catchments are dropped and HUCs that
+    # are adjacent in the index are merged into one range. An empty HUC selects all
+    # catchments, as "REACHCODE LIKE '%'" did.
+    if [huc for huc in hucs if huc in ("","#")]:
+        return ""
+    hucs = sorted(set(hucs))
+    #Drop HUCs nested within another HUC in the list
+    outerHUCs = []
+    for huc in hucs:
+        if not (outerHUCs and huc.startswith(outerHUCs[-1])):
+            outerHUCs.append(huc)
+    #Build the list of [lowHUC, highHUC] ranges
+    ranges = []
+    lastEnd = None
+    for huc in outerHUCs:
+        if hucIndex is None:
+            ranges.append([huc,huc])
+            continue
+        start, end = hucRange(hucIndex,huc)
+        if start == end: continue         #No catchments in the HUC
+        if start == lastEnd:
+            ranges[-1][1] = huc           #Adjacent to the previous range; extend it
+        else:
+            ranges.append([huc,huc])
+        lastEnd = end
+    if len(ranges) == 0:
+        return "1 = 0"
+    return " OR ".join([rangeClause(low,high,fldName) for low,high in ranges])
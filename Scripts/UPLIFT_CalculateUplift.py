@@ -4,20 +4,25 @@
 #  scenarios and stored the output as a table for the species.
 #
 #  Prior to running this script,Maxent needs to be run for the current conditions with the output
-#   saved in the XX_Output sub-folder within the species stats folder. The current conditions run
-#   must use the same HUCFilter as the scenario run. 
+#   saved in the XX_Output sub-folder within the species stats folder. Current and scenario
+#   likelihoods are matched by GRIDCODE (the GRIDCODE layer in the XX_Output and scenario folders),
+#   so the current conditions run can cover a larger area (e.g. the whole state) than the scenario
+#   run. If the XX_Output folder has no GRIDCODE layer, the current conditions run must use the
+#   same HUCFilter as the scenario run.
 #
 # Pseudo-code:
 #  - Locates Maxent output files
-#  - Pulls GRIDCODE values from the GRIDCODE.asc file
-#  - Pulls the likelihood values from the current conditions projected ASC file
-#  - Pulls the likelihood values from the scenario conditions projected ASC file
-#  - Creates a CSV file of GRIDCODE, current likelihood, future likelihood, and uplift
+#  - Pulls GRIDCODE values from the GRIDCODE.asc (or .npy) files of the scenario and current runs
+#  - Pulls the likelihood values from the current conditions projected ASC (or .npy) file
+#  - Pulls the likelihood values from the scenario conditions projected ASC (or .npy) file
+#  - Matches the current likelihoods to the scenario's catchments by GRIDCODE
+#  - Creates a table of GRIDCODE, current likelihood, future likelihood, and uplift
 #
 # Sept 2015, John.Fay@duke.edu
 
 # Import arcpy module
-import sys, os, arcpy
+import sys, os, arcpy, numpy
+import UPLIFT_ProjectionTools as projTools
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -47,6 +52,15 @@ def checkFile(fileName):
         msg("{} not found.\nExiting.".format(fileName),"error")
         sys.exit(1)
     else: return
+
+def findLayer(getFilename,*args):
+    #Returns the layer file found by the UPLIFT_ProjectionTools function (layerFilename
+    # or projectionKeysFilename); exits if the layer is found in both formats
+    try:
+        return getFilename(*args)
+    except ValueError as e:
+        msg("{}.\nExiting.".format(e),"error")
+        sys.exit(1)
     
 ##---DERIVED INPUTS---
 #Get the species stats folder in the stats root folder
@@ -64,28 +78,32 @@ msg("...Locating the scenario folder")
 scenarioFolder = os.path.join(sppFolder,"{}_Output".format(scenarioName))
 checkFile(scenarioFolder)
 
-#Get the GRIDCODE.asc file (scenario folder); this is an ordered listing of gridcodes use to match output to catchments
-msg("...Locating GRIDCODE.asc file")
-gridcodeASC = os.path.join(scenarioFolder,"GRIDCODE.asc")
-checkFile(gridcodeASC)
+#Get the GRIDCODE layer (scenario folder); this is an ordered listing of gridcodes use to match output to catchments
+# Layers are binary (.npy) files if the model was projected in process, or ASCII (.asc) files if MaxEnt projected it
+msg("...Locating GRIDCODE layer")
+gridcodeASC = findLayer(projTools.layerFilename,os.path.join(scenarioFolder,"GRIDCODE"))
+checkFile(gridcodeASC or os.path.join(scenarioFolder,"GRIDCODE.asc"))
+currentGridcodeASC = findLayer(projTools.projectionKeysFilename,sppFolder,"XX_Output")
+if not currentGridcodeASC:
+    msg("No GRIDCODE layer found in the XX_Output folder; current conditions will be matched by position","warning")
 
 #Get the current conditions (scenario folder); this is the baseline from which uplift is calculated
 msg("...Locating the current conditions output for HUC {}".format(HUCFilter))
-currentASC = os.path.join(sppFolder,"XX_Output","{}_XX_Output.asc".format(speciesName))
+currentASC = findLayer(projTools.layerFilename,os.path.join(sppFolder,"XX_Output","{}_XX_Output".format(speciesName)))
 #If it's not there, check the main output folder
-if not os.path.exists(currentASC):
+if not currentASC:
     msg("Projected output not found in {}_XX_Output.asc. Searching the main folder.".format(speciesName))
-    currentASC = os.path.join(sppFolder,"Output","{}_XX_Output.asc".format(speciesName))
-    checkFile(currentASC)
+    currentASC = findLayer(projTools.layerFilename,os.path.join(sppFolder,"Output","{}_XX_Output".format(speciesName)))
+    checkFile(currentASC or os.path.join(sppFolder,"Output","{}_XX_Output.asc".format(speciesName)))
     msg("...Found it!")
 
 #Get the ASCII file containing the projected likelihood
 msg("...Locating the projected conditions output for HUC {}".format(HUCFilter))
-projectedASC = os.path.join(scenarioFolder,"{}_{}_Output.asc".format(speciesName,scenarioName))
-if not os.path.exists(projectedASC):
+projectedASC = findLayer(projTools.layerFilename,os.path.join(scenarioFolder,"{}_{}_Output".format(speciesName,scenarioName)))
+if not projectedASC:
     msg("Projected output not found in {}_XX_Output.asc. Searching the main folder.".format(speciesName))
-    projectedASC = os.path.join(sppFolder,"Output","{}_{}_Output.asc".format(speciesName,scenarioName))
-    checkFile(projectedASC)
+    projectedASC = findLayer(projTools.layerFilename,os.path.join(sppFolder,"Output","{}_{}_Output".format(speciesName,scenarioName)))
+    checkFile(projectedASC or os.path.join(sppFolder,"Output","{}_{}_Output.asc".format(speciesName,scenarioName)))
     msg("...Found it!")
 
 #Set output parameters
@@ -93,20 +111,18 @@ outTbl = os.path.join(outGDB,"{}_{}".format(speciesName,HUCFilter))
 arcpy.SetParameterAsText(5,outTbl)
 
 ##---PROCESSES----
-# Read in GRIDCODE values from the gridcode ASCII file
-file = open(gridcodeASC,'r')
-gridcodes = file.readlines()[6:] #skip the first 6 lines (header info)
-file.close()
+# Read in GRIDCODE values from the gridcode layers
+gridcodes = projTools.readLayer(gridcodeASC)
+if currentGridcodeASC:
+    currentGridcodes = projTools.readLayer(currentGridcodeASC)
+else:
+    currentGridcodes = gridcodes
 
 # Read in the current condition projections
-file = open(currentASC,'r')
-currentPredictions = file.readlines()[6:] #skip the first 6 lines (header info)
-file.close()
+currentPredictions = projTools.readLayer(currentASC)
 
 # Read in the modified condition projections
-file = open(projectedASC,'r')
-upliftPredictions = file.readlines()[6:] #skip the first 6 lines (header info)
-file.close()
+upliftPredictions = projTools.readLayer(projectedASC)
 
 # Abbreviate the species name to GSpecie
 genus,species = speciesName.split("_")
@@ -117,33 +133,42 @@ curFldName = sppName + "_cur"                   #Likelihood under current condit
 altFldName = sppName + "_" + scenarioName       #Likelihood under alternate conditions
 upliftFldName = sppName + "_up"               #Uplift (alternate - current)
 
-# Create the output table
-arcpy.CreateTable_management(outGDB,"{}_{}".format(speciesName,HUCFilter))
-arcpy.AddField_management(outTbl,"GRIDCODE","LONG")
-arcpy.AddField_management(outTbl,curFldName,"DOUBLE")
-arcpy.AddField_management(outTbl,altFldName,"DOUBLE")
-arcpy.AddField_management(outTbl,upliftFldName,"DOUBLE")
-
-# Create an insert cursor and add records
-cursor = arcpy.da.InsertCursor(outTbl,"*")
-for i in range(len(gridcodes)):
-    gridcode = int(gridcodes[i])
-    currentLikelihood = float(currentPredictions[i])
-    alternateLikelihood = float(upliftPredictions[i])
-    uplift = alternateLikelihood - currentLikelihood
-    cursor.insertRow((i,gridcode,currentLikelihood,alternateLikelihood,uplift))
-del cursor
-
-tblCount  = int(arcpy.GetCount_management(outTbl).getOutput(0))
-if not(tblCount == len(gridcodes)):
-    msg("counts don't match: {},{}".format(tblCount,len(gridcodes)),"error")
-
-## Clean up ASC files
-fileNames = os.listdir(scenarioFolder)
-for fName in fileNames:
-    fNameParts = fName.split(".")
-    name = fNameParts[0]
-    ext = fNameParts[-1]
-    if ext == 'asc':
-        if speciesName not in name and name not in ("GRIDCODE"):
-            os.remove(os.path.join(scenarioFolder,fName))
\ No newline at end of file
+# Check that the layers hold one value per catchment
+if not (gridcodes.shape == upliftPredictions.shape and currentGridcodes.shape == currentPredictions.shape):
+    msg("Layer shapes don't match: GRIDCODE {}, projected {}; current GRIDCODE {}, current {}.\nExiting.".format(gridcodes.shape,upliftPredictions.shape,currentGridcodes.shape,currentPredictions.shape),"error")
+    sys.exit(1)
+
+# Match the current likelihoods to the scenario catchments by GRIDCODE
+try:
+    scenarioRows, currentRows = projTools.joinByKey(gridcodes.astype("int64"),currentGridcodes.astype("int64"))
+except ValueError as e:
+    msg("{} in a GRIDCODE layer.\nExiting.".format(e),"error")
+    sys.exit(1)
+if len(scenarioRows) < len(gridcodes):
+    msg("{} of {} scenario catchments have no current conditions likelihood and are skipped".format(len(gridcodes) - len(scenarioRows),len(gridcodes)),"warning")
+
+# Compute the uplift for all catchments at once
+arrOut = numpy.empty(len(scenarioRows),dtype=[("GRIDCODE","int32"),(str(curFldName),"float64"),(str(altFldName),"float64"),(str(upliftFldName),"float64")])
+gridcodeFld, curFld, altFld, upliftFld = arrOut.dtype.names
+arrOut[gridcodeFld] = gridcodes[scenarioRows]
+arrOut[curFld] = currentPredictions[currentRows]
+arrOut[altFld] = upliftPredictions[scenarioRows]
+arrOut[upliftFld] = arrOut[altFld] - arrOut[curFld]
+
+# Write the output table in one call
+if arcpy.Exists(outTbl):
+    arcpy.Delete_management(outTbl)
+arcpy.da.NumPyArrayToTable(arrOut,outTbl)
+msg("{} records written to {}".format(arrOut.shape[0],outTbl))
+
+## Clean up ASC files: remove the layers linked from the shared layer store (and the store, if no other
+## species uses it), or if the layers were written to the scenario folder itself, all but the outputs
+if not projTools.removeLinkedLayers(scenarioFolder,("GRIDCODE.asc",),msg):
+    fileNames = os.listdir(scenarioFolder)
+    for fName in fileNames:
+        fNameParts = fName.split(".")
+        name = fNameParts[0]
+        ext = fNameParts[-1]
+        if ext == 'asc':
+            if speciesName not in name and name not in ("GRIDCODE"):
+                os.remove(os.path.join(scenarioFolder,fName))
\ No newline at end of file
@@ -0,0 +1,390 @@
+# UPLIFT_MergeTools.py
+#
+# Description: Functions used by UPLIFT_MergeUpliftResults to merge the species uplift
+#  tables (from UPLIFT_CalculateUplift) of a scenario into one feature class. This is
+#  a helper module imported by the scripts in this folder; it is not run as a tool
+#  itself.
+#
+# Each species table is read once into arrays and matched to the catchments by
+#  GRIDCODE (see UPLIFT_ProjectionTools.joinByKey), giving (catchments x species)
+#  arrays of current likelihood and uplift in which catchments missing from a
+#  species' table (or missing either value) are NaN. Means are taken over the species
+#  with values for each catchment, and all columns are written in a single pass of an
+#  update cursor, with NaNs written as nulls.
+#
+# The merged feature class keeps running totals for each catchment: the sums of the
+#  species' current likelihoods and uplifts and the number of species with values.
+#  A species can then be added or removed (see UPLIFT_UpdateMergedSpecies) by adding
+#  its values to, or subtracting them from, the totals, without re-reading the other
+#  species; the means and ranks are recomputed from the totals.
+#
+# Several HUCs can be merged at once, each HUC's species tables (named
+#  [species]_[HUC]) being read in a worker process (mergeHUC), and the results
+#  combined into one set of arrays (combineHUCs). Catchments can then be ranked within
+#  their HUC, or across all the HUCs (e.g. an ecoregion).
+#
+# Catchments are ranked into quantile classes (deciles by default) by sorting their
+#  values once: a catchment at sorted position p (1 to n, over the n catchments with
+#  values) is in class 1 + the number of breaks (fractions of n) below p / n, so with
+#  deciles (breaks 0.1, 0.2, ... 0.9) class k holds positions up to k * n / 10, as the
+#  row by row ranking did. Tied values are given the same position: their lowest
+#  ("min", the default), their highest ("max"), or their order in the table
+#  ("ordinal"). Catchments without a value (NaN) get rank 0.
+#
+# Catchments of several HUCs can instead be ranked statewide without sorting them all:
+#  each HUC's worker process returns only quantile sketches of its catchments' mean
+#  current likelihood and mean uplift (hucSketches; see UPLIFT_QuantileSketch), the
+#  HUCs' sketches are merged and the class breaks read from the merged sketches. The
+#  catchments are then ranked by the breaks' values, tied values being given their
+#  lowest position ("min"), one HUC at a time.
+#
+# The ranking settings (scheme, ties and level) and the merged species (each species'
+#  name and the fields its values were written to) are kept in two tables next to the
+#  merged feature class (writeMergeInfo), and each catchment's HUC in its HUC field, so
+#  species can be added or removed later with the same settings.
+#
+# Fall 2026
+
+import os, arcpy, numpy
+import MISC_HUCIndex as hucTools
+import UPLIFT_ProjectionTools as projTools
+import UPLIFT_QuantileSketch as sketchTools
+
+# Fields of the merged feature class
+MEANLIKELIHOOD = "MeanLikelihood"
+CURRENTRANK = "CurrentRank"
+MEANUPLIFT = "MeanUplift"
+UPLIFTRANK = "UpliftRank"
+SUMLIKELIHOOD = "SumLikelihood"
+SUMUPLIFT = "SumUplift"
+SPPCOUNT = "SppCount"
+HUCFIELD = "HUC"
+
+# Suffixes of the tables holding the ranking settings and the merged species of a merged
+#  feature class
+SETTINGSSUFFIX = "_MergeSettings"
+SPECIESSUFFIX = "_MergeSpecies"
+
+# Number of classes of the named ranking schemes
+RANKSCHEMES = {"deciles":10,"quintiles":5,"quartiles":4,"percentiles":100}
+
+# Levels at which catchments are ranked: within their HUC, across all the HUCs, or across
+#  all the HUCs from merged HUC sketches
+RANKLEVELS = ("HUC","ALL","SKETCH")
+
+## ---Functions---
+def speciesFields(sppTbl):
+    #Returns the current likelihood and uplift fields of a species uplift table (the
+    # field with "cur" in its name, and the last field)
+    curFld = arcpy.ListFields(sppTbl,"*cur*")[0].name
+    upliftFld = arcpy.ListFields(sppTbl)[-1].name
+    return curFld, upliftFld
+
+def uniqueFieldName(fldName,existingNames):
+    #Returns the field name, with a suffix (_1, _2, ...) if it is already in the list
+    # of existing field names, as JoinField names joined fields
+    existingNames = [name.upper() for name in existingNames]
+    newName = fldName
+    suffix = 1
+    while newName.upper() in existingNames:
+        newName = "{}_{}".format(fldName,suffix)
+        suffix += 1
+    return newName
+
+def readKeyedValues(tbl,flds):
+    #Returns the GRIDCODEs and the (records x fields) float array of the fields' values
+    # in the table (e.g. a species uplift table). Nulls are read as NaN.
+    nullValues = dict([(fld,numpy.nan) for fld in flds])
+    arrRecs = arcpy.da.TableToNumPyArray(tbl,["GRIDCODE"] + list(flds),null_value=nullValues)
+    arrValues = numpy.empty((arrRecs.shape[0],len(flds)),dtype="float64")
+    for i in range(len(flds)):
+        arrValues[:,i] = arrRecs[flds[i]]
+    return arrRecs["GRIDCODE"].astype("int64"), arrValues
+
+def readHUCs(fc,keys):
+    #Returns the HUC (from the HUC field of a merged feature class) of each of the keys
+    # (GRIDCODEs), or "" for keys not found or without a HUC
+    arrRecs = arcpy.da.TableToNumPyArray(fc,["GRIDCODE",HUCFIELD],null_value={HUCFIELD:""})
+    hucs = numpy.empty(len(keys),dtype="object")
+    hucs.fill("")
+    keyRows, tblRows = projTools.joinByKey(numpy.asarray(keys,dtype="int64"),arrRecs["GRIDCODE"].astype("int64"))
+    hucs[keyRows] = arrRecs[HUCFIELD][tblRows]
+    return hucs
+
+def alignTables(keys,sppTbls,report=None):
+    #Reads the current likelihood and uplift fields of each species table and matches
+    # them to the keys (GRIDCODEs). Returns the list of (current, uplift) field names
+    # and the (keys x species) arrays of current likelihoods and uplifts, with NaN
+    # for catchments missing from a table.
+    keys = numpy.asarray(keys,dtype="int64")
+    arrCur = numpy.empty((len(keys),len(sppTbls)),dtype="float64")
+    arrUplift = numpy.empty((len(keys),len(sppTbls)),dtype="float64")
+    arrCur.fill(numpy.nan)
+    arrUplift.fill(numpy.nan)
+    sppFlds = []
+    for j in range(len(sppTbls)):
+        curFld, upliftFld = speciesFields(sppTbls[j])
+        sppFlds.append((curFld,upliftFld))
+        tblKeys, arrValues = readKeyedValues(sppTbls[j],[curFld,upliftFld])
+        keyRows, tblRows = projTools.joinByKey(keys,tblKeys)
+        arrCur[keyRows,j] = arrValues[tblRows,0]
+        arrUplift[keyRows,j] = arrValues[tblRows,1]
+        isMissing = numpy.isnan(arrCur[:,j]) | numpy.isnan(arrUplift[:,j])
+        arrCur[isMissing,j] = numpy.nan
+        arrUplift[isMissing,j] = numpy.nan
+        if report: report("...{}: {} of {} catchments matched".format(sppTbls[j],len(keyRows),len(keys)))
+    return sppFlds, arrCur, arrUplift
+
+def hucTables(upliftGDB,hucFilters):
+    #Returns a list of (HUC, species tables) for the HUC filters. A filter ending with
+    # "*" is a prefix, matching each HUC with tables whose HUC starts with it; other
+    # filters match the tables whose names end with the HUC. Tables not named for a HUC
+    # (e.g. the merge tables; see writeMergeInfo) are skipped.
+    arcpy.env.workspace = upliftGDB
+    allTbls = [tbl for tbl in arcpy.ListTables() or [] if tbl.rsplit("_",1)[-1].isdigit()]
+    hucs = []
+    for hucFilter in hucFilters:
+        if hucFilter.endswith("*"):
+            tblHUCs = [(tbl.rsplit("_",1)[-1],tbl) for tbl in allTbls if "_" in tbl]
+            for huc in sorted(set([tblHUC for tblHUC, tbl in tblHUCs if tblHUC.startswith(hucFilter[:-1])])):
+                hucs.append((huc,[tbl for tblHUC, tbl in tblHUCs if tblHUC == huc]))
+        else:
+            hucs.append((hucFilter,[tbl for tbl in allTbls if tbl.endswith(hucFilter)]))
+    return hucs
+
+def mergeHUC(catchmentFC,huc,sppTbls):
+    #Reads the species tables (full paths) of the HUC and matches them to the HUC's
+    # catchments. Returns the catchments' GRIDCODEs, the species names, their (current,
+    # uplift) field names and the (catchments x species) arrays of current likelihoods
+    # and uplifts. Can be run in a worker process (see HABMODEL_DataTools.processPool).
+    whereClause = hucTools.hucWhereClause([huc])
+    gridcodes = arcpy.da.TableToNumPyArray(catchmentFC,"GRIDCODE",whereClause)["GRIDCODE"].astype("int64")
+    sppFlds, arrCur, arrUplift = alignTables(gridcodes,sppTbls)
+    sppNames = [os.path.basename(sppTbl).rsplit("_",1)[0] for sppTbl in sppTbls]
+    return gridcodes, sppNames, sppFlds, arrCur, arrUplift
+
+def hucSketches(catchmentFC,huc,sppTbls,k=sketchTools.SKETCHSIZE):
+    #Merges the species tables of the HUC (see mergeHUC) and returns only what ranking
+    # the HUCs together needs: a dictionary of the HUC, its number of catchments, its
+    # species' (name, (current, uplift) field names) and the quantile sketches of its
+    # catchments' mean current likelihood and mean uplift. Can be run in a worker process.
+    gridcodes, sppNames, sppFlds, arrCur, arrUplift = mergeHUC(catchmentFC,huc,sppTbls)
+    meanCur, meanUplift = meanValues(*speciesTotals(arrCur,arrUplift))
+    return {"huc":huc,"catchments":len(gridcodes),"species":list(zip(sppNames,sppFlds)),
+            "sketches":meanSketches(meanCur,meanUplift,k)}
+
+def combineHUCs(results):
+    #Combines the mergeHUC results of several HUCs into one set of arrays over the
+    # species of all the HUCs (NaN for species missing from a HUC). Catchments in more
+    # than one HUC are kept once. Returns the GRIDCODEs, the index of each catchment's
+    # HUC in results, the species' names and (current, uplift) field names and the
+    # arrays of current likelihoods and uplifts.
+    sppNames, sppFlds = [], []
+    for gridcodes, hucSppNames, hucSppFlds, arrCur, arrUplift in results:
+        for sppName, flds in zip(hucSppNames,hucSppFlds):
+            if not sppName in sppNames:
+                sppNames.append(sppName)
+                sppFlds.append(flds)
+    nRows = sum([len(result[0]) for result in results])
+    allCur = numpy.empty((nRows,len(sppNames)),dtype="float64")
+    allUplift = numpy.empty((nRows,len(sppNames)),dtype="float64")
+    allCur.fill(numpy.nan)
+    allUplift.fill(numpy.nan)
+    hucIndex = numpy.empty(nRows,dtype="int32")
+    start = 0
+    for i in range(len(results)):
+        gridcodes, hucSppNames, hucSppFlds, arrCur, arrUplift = results[i]
+        end = start + len(gridcodes)
+        cols = [sppNames.index(sppName) for sppName in hucSppNames]
+        if cols:
+            allCur[start:end,cols] = arrCur
+            allUplift[start:end,cols] = arrUplift
+        hucIndex[start:end] = i
+        start = end
+    allGridcodes = numpy.concatenate([result[0] for result in results])
+    firstRows = numpy.sort(numpy.unique(allGridcodes,return_index=True)[1])
+    return allGridcodes[firstRows], hucIndex[firstRows], sppNames, sppFlds, allCur[firstRows], allUplift[firstRows]
+
+def firstSpeciesValues(arrCur,arrUplift):
+    #Combines the (catchments x tables) arrays of one species' tables (e.g. of different
+    # HUCs) into one column each, keeping each catchment's first value, as combineHUCs does
+    sppCur = numpy.empty(arrCur.shape[0],dtype="float64")
+    sppUplift = numpy.empty(arrCur.shape[0],dtype="float64")
+    sppCur.fill(numpy.nan)
+    sppUplift.fill(numpy.nan)
+    for j in range(arrCur.shape[1]):
+        isFirst = numpy.isnan(sppCur) & ~numpy.isnan(arrCur[:,j])
+        sppCur[isFirst] = arrCur[isFirst,j]
+        sppUplift[isFirst] = arrUplift[isFirst,j]
+    return sppCur, sppUplift
+
+def speciesTotals(arrCur,arrUplift):
+    #Returns the sums of the current likelihoods and uplifts in each row of the
+    # (catchments x species) arrays, and the number of species with values
+    hasValue = ~(numpy.isnan(arrCur) | numpy.isnan(arrUplift))
+    sumCur = numpy.where(hasValue,arrCur,0.0).sum(axis=1)
+    sumUplift = numpy.where(hasValue,arrUplift,0.0).sum(axis=1)
+    return sumCur, sumUplift, hasValue.sum(axis=1).astype("int32")
+
+def meanValues(sumCur,sumUplift,counts):
+    #Returns the mean current likelihoods and uplifts from the totals (NaN for
+    # catchments with no species)
+    with numpy.errstate(divide="ignore",invalid="ignore"):
+        meanCur = numpy.where(counts > 0,sumCur / counts,numpy.nan)
+        meanUplift = numpy.where(counts > 0,sumUplift / counts,numpy.nan)
+    return meanCur, meanUplift
+
+def mergedColumns(sumCur,sumUplift,counts,breaks,ties="min",groups=None,breakValues=None):
+    #Returns the columns (field name, values) of the totals, means and ranks of the
+    # merged feature class. If groups (an array giving each catchment's group, e.g. its
+    # HUC) is given, catchments are ranked within their group. If breakValues (a
+    # dictionary of the break values of each rank field, e.g. from sketchBreakValues) is
+    # given, catchments are ranked by those values instead.
+    meanCur, meanUplift = meanValues(sumCur,sumUplift,counts)
+    def rankValues(values,fld):
+        if breakValues is None:
+            return groupQuantileRanks(values,breaks,ties,groups)
+        return sketchTools.breakRanks(values,breakValues[fld])
+    return [(MEANLIKELIHOOD,meanCur),
+            (CURRENTRANK,rankValues(meanCur,CURRENTRANK)),
+            (MEANUPLIFT,meanUplift),
+            (UPLIFTRANK,rankValues(meanUplift,UPLIFTRANK)),
+            (SUMLIKELIHOOD,sumCur),
+            (SUMUPLIFT,sumUplift),
+            (SPPCOUNT,counts)]
+
+def writeColumns(fc,keys,columns,keyFld="GRIDCODE",whereClause=""):
+    #Writes the columns, a list of (field name, array of values matched to the keys)
+    # pairs, to the feature class (or the features selected by the where clause) in one
+    # pass of an update cursor. NaN values and features whose key is not in keys are set
+    # to null.
+    keys = numpy.asarray(keys,dtype="int64")
+    flds = [fld for fld, values in columns]
+    arrValues = numpy.empty((len(keys),len(columns)),dtype="object")
+    for i in range(len(columns)):
+        values = numpy.asarray(columns[i][1])
+        if values.dtype.kind == "f":
+            arrValues[:,i] = numpy.where(numpy.isnan(values),None,values.astype("object"))
+        else:
+            arrValues[:,i] = values.astype("object")
+    rowLookup = dict(zip(keys.tolist(),range(len(keys))))
+    nullRow = [None] * len(flds)
+    cursor = arcpy.da.UpdateCursor(fc,[keyFld] + flds,whereClause)
+    for row in cursor:
+        i = rowLookup.get(row[0])
+        if i is None: cursor.updateRow([row[0]] + nullRow)
+        else: cursor.updateRow([row[0]] + arrValues[i].tolist())
+    del cursor
+
+def rankBreaks(scheme="deciles"):
+    #Returns the class breaks (fractions of the catchments, in increasing order) of a
+    # named ranking scheme, or of a semicolon separated list of fractions (e.g.
+    # "0.5;0.9;0.99"). Raises a ValueError if the scheme isn't valid.
+    scheme = scheme.strip().lower()
+    if scheme in RANKSCHEMES:
+        nClasses = RANKSCHEMES[scheme]
+        return numpy.arange(1,nClasses) / float(nClasses)
+    try:
+        breaks = numpy.array(sorted(set([float(item) for item in scheme.split(";") if item.strip()])))
+    except ValueError:
+        raise ValueError("Unknown ranking scheme: {}".format(scheme))
+    if len(breaks) == 0 or breaks[0] <= 0 or breaks[-1] >= 1:
+        raise ValueError("Rank breaks must be between 0 and 1: {}".format(scheme))
+    return breaks
+
+def quantileRanks(values,breaks,ties="min"):
+    #Returns the quantile class (1 to len(breaks) + 1) of each value, or 0 for NaN
+    # values. Ties are resolved as "min", "max" or "ordinal" (see above).
+    values = numpy.asarray(values,dtype="float64")
+    ranks = numpy.zeros(values.shape,dtype="int32")
+    hasValue = ~numpy.isnan(values)
+    validValues = values[hasValue]
+    n = len(validValues)
+    if n == 0:
+        return ranks
+    order = numpy.argsort(validValues,kind="mergesort")
+    sortedValues = validValues[order]
+    if ties == "ordinal":
+        positions = numpy.empty(n,dtype="int64")
+        positions[order] = numpy.arange(1,n + 1)
+    elif ties == "min":
+        positions = numpy.searchsorted(sortedValues,validValues,"left") + 1
+    elif ties == "max":
+        positions = numpy.searchsorted(sortedValues,validValues,"right")
+    else:
+        raise ValueError("Unknown tie handling: {}".format(ties))
+    ranks[hasValue] = 1 + numpy.searchsorted(numpy.asarray(breaks,dtype="float64"),positions / float(n),"left")
+    return ranks
+
+def groupQuantileRanks(values,breaks,ties="min",groups=None):
+    #Returns the quantile classes of the values, ranked within each group if an array
+    # of groups is given, otherwise all together
+    if groups is None:
+        return quantileRanks(values,breaks,ties)
+    values = numpy.asarray(values,dtype="float64")
+    ranks = numpy.zeros(values.shape,dtype="int32")
+    for group in numpy.unique(groups):
+        isGroup = groups == group
+        ranks[isGroup] = quantileRanks(values[isGroup],breaks,ties)
+    return ranks
+
+def meanSketches(meanCur,meanUplift,k=sketchTools.SKETCHSIZE):
+    #Returns the quantile sketches of the mean current likelihoods and mean uplifts
+    return (sketchTools.updateSketch(sketchTools.newSketch(k),meanCur),
+            sketchTools.updateSketch(sketchTools.newSketch(k),meanUplift))
+
+def groupSketches(meanCur,meanUplift,groups,k=sketchTools.SKETCHSIZE):
+    #Returns the (current, uplift) sketches of the means of each group (e.g. HUC), as
+    # hucSketches returns them for the HUCs read in worker processes
+    return [meanSketches(meanCur[groups == group],meanUplift[groups == group],k) for group in numpy.unique(groups)]
+
+def sketchBreakValues(sketchPairs,breaks):
+    #Merges the (current, uplift) sketches of the groups (e.g. HUCs) and returns the
+    # break values read from them and the merged sketches, each a dictionary keyed by
+    # the rank field
+    sketches = {CURRENTRANK:sketchTools.mergeSketches([curSketch for curSketch, upliftSketch in sketchPairs]),
+                UPLIFTRANK:sketchTools.mergeSketches([upliftSketch for curSketch, upliftSketch in sketchPairs])}
+    breakValues = dict([(fld,sketchTools.sketchQuantiles(sketches[fld],breaks)) for fld in sketches])
+    return breakValues, sketches
+
+def mergeInfoTables(fc):
+    #Returns the tables of the merged feature class's ranking settings and species
+    return fc + SETTINGSSUFFIX, fc + SPECIESSUFFIX
+
+def writeMergeInfo(fc,settings,species):
+    #Writes the ranking settings (a dictionary of setting names and values, e.g.
+    # RankScheme, Ties and RankLevel) and the merged species (a list of (species name,
+    # current field, uplift field)) to the merge tables of the feature class
+    settingsTbl, speciesTbl = mergeInfoTables(fc)
+    for tbl, flds in ((settingsTbl,("NAME","VALUE")),(speciesTbl,("SPECIES","CURFLD","UPLIFTFLD"))):
+        if arcpy.Exists(tbl):
+            arcpy.Delete_management(tbl)
+        arcpy.CreateTable_management(os.path.dirname(tbl),os.path.basename(tbl))
+        for fld in flds:
+            arcpy.AddField_management(tbl,fld,"TEXT",field_length=255)
+    cursor = arcpy.da.InsertCursor(settingsTbl,["NAME","VALUE"])
+    for name in sorted(settings):
+        cursor.insertRow([name,str(settings[name])])
+    del cursor
+    cursor = arcpy.da.InsertCursor(speciesTbl,["SPECIES","CURFLD","UPLIFTFLD"])
+    for sppName, curFld, upliftFld in species:
+        cursor.insertRow([sppName,curFld,upliftFld])
+    del cursor
+
+def readMergeInfo(fc):
+    #Returns the ranking settings and merged species written by writeMergeInfo, or None
+    # and None if the feature class has no merge tables
+    settingsTbl, speciesTbl = mergeInfoTables(fc)
+    if not (arcpy.Exists(settingsTbl) and arcpy.Exists(speciesTbl)):
+        return None, None
+    settings = {}
+    cursor = arcpy.da.SearchCursor(settingsTbl,["NAME","VALUE"])
+    for row in cursor:
+        settings[row[0]] = row[1]
+    del cursor
+    species = []
+    cursor = arcpy.da.SearchCursor(speciesTbl,["SPECIES","CURFLD","UPLIFTFLD"])
+    for row in cursor:
+        species.append(tuple(row))
+    del cursor
+    return settings, species
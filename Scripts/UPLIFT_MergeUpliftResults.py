@@ -10,20 +10,41 @@
 #  likelihood, scenario prediction, and computed uplift.
 #
 #  Uplift scores across all species are conveyed to the output feature class and a
-#  mean score across all scpecies is calculated.
+#  mean score across all scpecies is calculated. The species tables are read into
+#  arrays matched by GRIDCODE, and the species and mean values are written to the
+#  output feature class in a single pass (see UPLIFT_MergeTools). Means are taken over
+#  the species with a value for each catchment.
+#
+#  Catchments are then ranked on their mean current likelihood and mean uplift into
+#  deciles (or another set of quantile classes) with the ranks written in the same pass.
+#  The sums of the species' values and the species count are kept for each catchment,
+#  so species can be added or removed later with UPLIFT_UpdateMergedSpecies.
+#
+#  Several HUCs (semicolon separated, or a prefix ending with "*", e.g. "0303*" for
+#  all the HUCs starting with 0303) can be merged into one output, each HUC's tables
+#  being read in its own process. Catchments are ranked within their HUC, or across
+#  all the HUCs (e.g. a whole ecoregion or the state), either exactly ("All") or with
+#  class breaks from quantile sketches built for each HUC and merged ("Sketch"). In
+#  Sketch mode each HUC's process returns only its sketches, which hold a bounded
+#  number of values, and the HUCs are then read again and written a few at a time, so
+#  the catchments of all the HUCs are never held at once. The sketches' error bound is
+#  reported; optionally, the ranks are also checked against the exact ranks (which
+#  sorts all the catchments' values).
+#
+#  The ranking settings and the merged species are kept with the output feature class
+#  (see UPLIFT_MergeTools.writeMergeInfo), along with each catchment's HUC, and reused
+#  by UPLIFT_UpdateMergedSpecies.
 #
 # Fall 2015
 # John.Fay@duke.edu
 
-import sys, os, arcpy, csv, tempfile
+import sys, os, arcpy, csv, tempfile, multiprocessing, numpy
+import MISC_HUCIndex as hucTools
+import HABMODEL_DataTools as dataTools
+import UPLIFT_MergeTools as mergeTools
+import UPLIFT_QuantileSketch as sketchTools
 arcpy.env.overwriteOutput = 1
 
-# Input variables
-scenarioName = arcpy.GetParameterAsText(0)  #Prefix used to represent scenarion (e.g. BU for buffer)
-statsRootFldr = arcpy.GetParameterAsText(1) #Folder containing all species stats results
-catchmentFC = arcpy.GetParameterAsText(2)   #Catchment features, used to add uplift values to
-HUCFilter = arcpy.GetParameterAsText(3)     #HUC Filter used to find tables and select appropriate catchment from the FC
-
 ## ---Functions---
 def msg(txt,type="message"):
     print txt
@@ -33,154 +54,204 @@ def msg(txt,type="message"):
         arcpy.AddWarning(txt)
     elif type == "error":
         arcpy.AddError(txt)
-        
+
 def checkFile(fileName):
     if not os.path.exists(fileName):
         msg("{} not found.\nExiting.".format(fileName),"error")
         sys.exit(1)
     else: return
-    
-## ---Set derived variables---
-msg("Locating scenario geodatabase")
-upliftGDB = os.path.join(statsRootFldr,"{}_Uplift.gdb".format(scenarioName))
-checkFile(upliftGDB)
-
-#Set the output table
-outFC = os.path.join(upliftGDB,"{}_Uplift{}".format(scenarioName,HUCFilter))
-arcpy.SetParameterAsText(4,outFC)
-
-## ---Processes---
-#Get a list of species uplift tables in the uplift GDB corresponding to the uplift filter
-msg("Getting list of species tables")
-arcpy.env.workspace = upliftGDB
-sppTbls = arcpy.ListTables("*{}".format(HUCFilter))   #Get all the species tables (they have two underscores in them...)
-#Exit if no tables were found. 
-if len(sppTbls) == 0:
-    msg("No results for HUC {}.\nExiting".format(HUCFilter),"error")
-    sys.exit(1)
-
-#Select catchments into the output feature class
-msg("Initializing output feature class")
-msg("...Selecting features in HUC {}".format(HUCFilter))
-whereClause = "REACHCODE LIKE '{}%'".format(HUCFilter)
-arcpy.Select_analysis(catchmentFC,outFC,whereClause)
-
-#Remove fields (the last three in the sppTbl)
-msg("...removing extra fields")
-killFlds = []
-for fld in arcpy.ListFields(outFC):
-    if not fld.name.upper() in ("OBJECTID","SHAPE","GRIDCODE","REACHCODE","SHAPE_AREA","SHAPE_LENGTH"):
-        killFlds.append(fld.name)
-arcpy.DeleteField_management(outFC,killFlds)
-
-#Add average current likelihood, current rank, averge uplift field, and uplift rank fields
-msg("...adding mean current likelihood field")          
-curFldName = "MeanLikelihood"
-arcpy.AddField_management(outFC,curFldName,"DOUBLE")
-msg("...adding current likelihood rank field")
-curRankFld = "CurrentRank"
-arcpy.AddField_management(outFC,curRankFld,"SHORT")
-msg("...adding average uplift fld")
-avgFldName = "MeanUplift"
-arcpy.AddField_management(outFC,avgFldName,"DOUBLE")
-msg("...adding decile rank fld")
-rankFldName = "UpliftRank"
-arcpy.AddField_management(outFC,rankFldName,"SHORT")
-
-#Initialize a list of current and uplift fields so we can average them later
-curFlds = []
-upliftFlds = []
-
-#Loop through the species folders and append the uplift columns to a master FC
-msg("Merging species tables")
-for sppTbl in sppTbls:
-    #Get the current condition field (the 3rd field) and add it to the curFlds list
-    curFld = arcpy.ListFields(sppTbl,"*cur*")[0].name
-    curFlds.append(curFld)
-    #Get the uplift field (the last field in the table) and add it to the list
-    upliftFld = arcpy.ListFields(sppTbl)[-1].name
-    upliftFlds.append(upliftFld)
-
-    #Join the fields to the outFC
-    arcpy.JoinField_management(outFC,"GRIDCODE",sppTbl,"GRIDCODE",(curFld,upliftFld))
-
-##Compute average habitat likelihood across species
-#Make a calculate string from the habitat fields
-msg("Calculating average current likelihood")
-msg("...constructing the equation")
-calcString = "("
-for curFld in curFlds:
-    calcString += "[{}] + ".format(curFld)
-
-#Modify the string to calculate averages
-calcString = calcString[:-3] + ") / {}".format(len(curFlds))
-
-#Apply the calcString
-msg("...calculating average likelihood")
-arcpy.CalculateField_management(outFC,curFldName,calcString)
-
-##Compute averge uplift across species
-#Make a calculate string from the upliftFlds
-msg("Calculating average uplift")
-msg("...constructing the equation")
-calcString = "("
-for upliftFld in upliftFlds:
-    calcString += "[{}] + ".format(upliftFld)
-
-#Modify the string to calculate averages
-calcString = calcString[:-3] + ") / {}".format(len(upliftFlds))
-
-#Apply the calcString
-msg("...calculating average uplift")
-arcpy.CalculateField_management(outFC,avgFldName,calcString)
-
-##Compute deciles on current condition values
-msg("Computing current condition deciles")
-#Get the number of records and determine the quantile size
-numRecs = int(arcpy.GetCount_management(outFC).getOutput(0))
-decileSize = numRecs / 10.0
-#Set the counter variables
-decile = 1              #Index of decile's upper limit
-ceiling = decileSize    #Initial decile value
-counter = 1             #Counter that increases with each record
-
-#Create the update cursor, sorted on average uplift
-records = arcpy.UpdateCursor(outFC,"","","{}; {}".format(curFldName,curRankFld),"{} A".format(curFldName))
-rec = records.next()
-while rec:
-    #Check to see if we've entered a new decile, if so, increase the index
-    if counter > ceiling:       #If the current rec passes the ceiling
-        ceiling += decileSize   #...raise the ceiling
-        decile += 1           #...up the decile value
-    #Assign the quantile to the rank field
-    rec.setValue(curRankFld,decile)
-    records.updateRow(rec)
-    #Move to the next record
-    counter += 1
-    rec = records.next()
-        
-##Compute deciles on uplift values
-msg("Computing uplift deciles")
-#Get the number of records and determine the quantile size
-numRecs = int(arcpy.GetCount_management(outFC).getOutput(0))
-decileSize = numRecs / 10.0
-#Set the counter variables
-decile = 1              #Index of decile's upper limit
-ceiling = decileSize    #Initial decile value
-counter = 1             #Counter that increases with each record
-
-#Create the update cursor, sorted on average uplift
-records = arcpy.UpdateCursor(outFC,whereClause,"","{}; {}".format(avgFldName,rankFldName),"{} A".format(avgFldName))
-rec = records.next()
-while rec:
-    #Check to see if we've entered a new decile, if so, increase the index
-    if counter > ceiling:       #If the current rec passes the ceiling
-        ceiling += decileSize   #...raise the ceiling
-        decile += 1           #...up the decile value
-    #Assign the quantile to the rank field
-    rec.setValue(rankFldName,decile)
-    records.updateRow(rec)
-    #Move to the next record
-    counter += 1
-    rec = records.next()
-        
\ No newline at end of file
+
+def addSpeciesFields(outFC,sppNames,sppFlds):
+    #Adds the current likelihood and uplift fields of each species to the output feature
+    # class (renamed if already used) and returns the list of (species name, current
+    # field, uplift field)
+    species = []
+    for sppName, flds in zip(sppNames,sppFlds):
+        outFlds = []
+        for fld in flds:
+            outFld = mergeTools.uniqueFieldName(fld,[f.name for f in arcpy.ListFields(outFC)])
+            arcpy.AddField_management(outFC,outFld,"DOUBLE")
+            outFlds.append(outFld)
+        species.append((sppName,outFlds[0],outFlds[1]))
+    return species
+
+def speciesColumns(species,sppNames,arrCur,arrUplift):
+    #Returns the columns of the species' values, written to their fields in species
+    outFlds = dict([(sppName,(curFld,upliftFld)) for sppName, curFld, upliftFld in species])
+    columns = []
+    for j in range(len(sppNames)):
+        columns.append((outFlds[sppNames[j]][0],arrCur[:,j]))
+        columns.append((outFlds[sppNames[j]][1],arrUplift[:,j]))
+    return columns
+
+#The processes are run only when the script is run as a tool, not when it is imported
+# by the worker processes
+if __name__ == "__main__":
+    # Input variables
+    scenarioName = arcpy.GetParameterAsText(0)  #Prefix used to represent scenarion (e.g. BU for buffer)
+    statsRootFldr = arcpy.GetParameterAsText(1) #Folder containing all species stats results
+    catchmentFC = arcpy.GetParameterAsText(2)   #Catchment features, used to add uplift values to
+    HUCFilter = arcpy.GetParameterAsText(3)     #HUC Filter used to find tables and select appropriate catchment from the FC (semicolon separated for several; "*" at the end for a prefix)
+    rankScheme = arcpy.GetParameterAsText(5)    #Optional: deciles (default), quintiles, quartiles, percentiles, or semicolon separated breaks (e.g. 0.5;0.9)
+    ties = arcpy.GetParameterAsText(6)          #Optional: rank given to tied values: min (default), max or ordinal
+    rankLevel = arcpy.GetParameterAsText(7)     #Optional: rank catchments within each HUC ("HUC", default) or across all HUCs, exactly ("All") or from merged HUC sketches ("Sketch")
+    processes = arcpy.GetParameterAsText(8)     #Optional: number of HUCs to merge at once (default: number of CPUs)
+    checkRanks = arcpy.GetParameterAsText(9)    #Optional: with "Sketch", also compare the ranks with the exact ranks ("true"; sorts all the catchments' values)
+
+    if rankScheme in ("","#"): rankScheme = "deciles"
+    if ties in ("","#"): ties = "min"
+    rankLevel = rankLevel.upper()
+    if not rankLevel in mergeTools.RANKLEVELS: rankLevel = "HUC"
+    if rankLevel == "SKETCH": ties = "min"
+    if processes in ("","#"): processes = None
+    else: processes = int(processes)
+    checkRanks = checkRanks.lower() == "true"
+    hucFilters = [huc.strip().strip("'") for huc in HUCFilter.split(";") if huc.strip()]
+
+    ## ---Set derived variables---
+    msg("Locating scenario geodatabase")
+    upliftGDB = os.path.join(statsRootFldr,"{}_Uplift.gdb".format(scenarioName))
+    checkFile(upliftGDB)
+
+    #Set the output table
+    outFC = os.path.join(upliftGDB,"{}_Uplift{}".format(scenarioName,"_".join([huc.rstrip("*") for huc in hucFilters])))
+    arcpy.SetParameterAsText(4,outFC)
+
+    ## ---Processes---
+    #Get a list of species uplift tables in the uplift GDB corresponding to each HUC filter
+    msg("Getting list of species tables")
+    hucs = [(huc,sppTbls) for huc, sppTbls in mergeTools.hucTables(upliftGDB,hucFilters) if sppTbls]
+    #Exit if no tables were found.
+    if len(hucs) == 0:
+        msg("No results for HUC {}.\nExiting".format(HUCFilter),"error")
+        sys.exit(1)
+    msg("{} HUCs to merge".format(len(hucs)))
+    try:
+        breaks = mergeTools.rankBreaks(rankScheme)
+    except ValueError as e:
+        msg("{}.\nExiting.".format(e),"error")
+        sys.exit(1)
+    if not ties in ("min","max","ordinal"):
+        msg("Unknown tie handling: {}.\nExiting.".format(ties),"error")
+        sys.exit(1)
+
+    #Select catchments into the output feature class
+    msg("Initializing output feature class")
+    msg("...Selecting features in HUC {}".format(", ".join([huc for huc, sppTbls in hucs])))
+    whereClause = hucTools.hucWhereClause([huc for huc, sppTbls in hucs])
+    arcpy.Select_analysis(catchmentFC,outFC,whereClause)
+
+    #Remove fields (the last three in the sppTbl)
+    msg("...removing extra fields")
+    killFlds = []
+    for fld in arcpy.ListFields(outFC):
+        if not fld.name.upper() in ("OBJECTID","SHAPE","GRIDCODE","REACHCODE","SHAPE_AREA","SHAPE_LENGTH"):
+            killFlds.append(fld.name)
+    arcpy.DeleteField_management(outFC,killFlds)
+
+    #Add average current likelihood, current rank, averge uplift field, and uplift rank fields
+    msg("...adding mean current likelihood field")
+    arcpy.AddField_management(outFC,mergeTools.MEANLIKELIHOOD,"DOUBLE")
+    msg("...adding current likelihood rank field")
+    arcpy.AddField_management(outFC,mergeTools.CURRENTRANK,"SHORT")
+    msg("...adding average uplift fld")
+    arcpy.AddField_management(outFC,mergeTools.MEANUPLIFT,"DOUBLE")
+    msg("...adding decile rank fld")
+    arcpy.AddField_management(outFC,mergeTools.UPLIFTRANK,"SHORT")
+
+    #Add the running total fields, used to add or remove species later (see UPLIFT_UpdateMergedSpecies)
+    msg("...adding running total fields")
+    arcpy.AddField_management(outFC,mergeTools.SUMLIKELIHOOD,"DOUBLE")
+    arcpy.AddField_management(outFC,mergeTools.SUMUPLIFT,"DOUBLE")
+    arcpy.AddField_management(outFC,mergeTools.SPPCOUNT,"SHORT")
+    arcpy.AddField_management(outFC,mergeTools.HUCFIELD,"TEXT",field_length=16)
+
+    #Read each HUC's species tables, matched to its catchments by GRIDCODE
+    hucArgs = [(catchmentFC,huc,[os.path.join(upliftGDB,sppTbl) for sppTbl in sppTbls]) for huc, sppTbls in hucs]
+    if len(hucs) > 1:
+        pool = dataTools.processPool(processes)
+    msg("Calculating average current likelihood and uplift, and ranks ({}, {})".format(rankScheme,{"HUC":"by HUC","ALL":"across all HUCs","SKETCH":"across all HUCs, from HUC sketches"}[rankLevel]))
+    if rankLevel != "SKETCH":
+        msg("Merging species tables")
+        if len(hucs) == 1:
+            results = [mergeTools.mergeHUC(*hucArgs[0])]
+        else:
+            asyncResults = [pool.apply_async(mergeTools.mergeHUC,args) for args in hucArgs]
+            results = [result.get() for result in asyncResults]
+        for (huc, sppTbls), result in zip(hucs,results):
+            msg("...HUC {}: {} species, {} catchments".format(huc,len(sppTbls),len(result[0])))
+        gridcodes, hucIndex, sppNames, sppFlds, arrCur, arrUplift = mergeTools.combineHUCs(results)
+
+        #Compute the totals and average habitat likelihood and average uplift across species, and rank them
+        sumCur, sumUplift, counts = mergeTools.speciesTotals(arrCur,arrUplift)
+        noData = (counts == 0).sum()
+        columns = mergeTools.mergedColumns(sumCur,sumUplift,counts,breaks,ties,hucIndex if rankLevel == "HUC" else None)
+        columns.append((mergeTools.HUCFIELD,numpy.array([huc for huc, sppTbls in hucs],dtype="object")[hucIndex]))
+
+        #Add the species fields and write all the values to the output feature class
+        msg("Writing merged values")
+        species = addSpeciesFields(outFC,sppNames,sppFlds)
+        mergeTools.writeColumns(outFC,gridcodes,columns + speciesColumns(species,sppNames,arrCur,arrUplift))
+    else:
+        #Sketch each HUC's means in its own process, and read the class breaks from the merged sketches
+        msg("Sketching each HUC's means")
+        if len(hucs) == 1:
+            hucResults = [mergeTools.hucSketches(*hucArgs[0])]
+        else:
+            asyncResults = [pool.apply_async(mergeTools.hucSketches,args) for args in hucArgs]
+            hucResults = [result.get() for result in asyncResults]
+        sppNames, sppFlds = [], []
+        for hucResult in hucResults:
+            msg("...HUC {}: {} species, {} catchments".format(hucResult["huc"],len(hucResult["species"]),hucResult["catchments"]))
+            for sppName, flds in hucResult["species"]:
+                if not sppName in sppNames:
+                    sppNames.append(sppName)
+                    sppFlds.append(flds)
+        breakValues, sketches = mergeTools.sketchBreakValues([hucResult["sketches"] for hucResult in hucResults],breaks)
+        for fld in (mergeTools.CURRENTRANK,mergeTools.UPLIFTRANK):
+            msg("...{}: {} values in {} HUC sketches ({} values kept); break error bound {:.3%}".format(
+                fld,sketches[fld]["n"],len(hucResults),sketchTools.sketchValueCount(sketches[fld]),sketchTools.sketchErrorBound(sketches[fld])))
+
+        #Read the HUCs again, a batch at a time, and write their values ranked by the break values
+        msg("Writing merged values")
+        species = addSpeciesFields(outFC,sppNames,sppFlds)
+        batchSize = processes or multiprocessing.cpu_count()
+        noData = 0
+        checkValues = {mergeTools.CURRENTRANK:[],mergeTools.UPLIFTRANK:[]}
+        for start in range(0,len(hucArgs),batchSize):
+            batchArgs = hucArgs[start:start + batchSize]
+            if len(hucs) == 1:
+                results = [mergeTools.mergeHUC(*batchArgs[0])]
+            else:
+                asyncResults = [pool.apply_async(mergeTools.mergeHUC,args) for args in batchArgs]
+                results = [result.get() for result in asyncResults]
+            for (hucFC, huc, sppTbls), (gridcodes, hucSppNames, hucSppFlds, arrCur, arrUplift) in zip(batchArgs,results):
+                sumCur, sumUplift, counts = mergeTools.speciesTotals(arrCur,arrUplift)
+                noData += (counts == 0).sum()
+                columns = mergeTools.mergedColumns(sumCur,sumUplift,counts,breaks,ties,breakValues=breakValues)
+                columns.append((mergeTools.HUCFIELD,numpy.array([huc] * len(gridcodes),dtype="object")))
+                if checkRanks:
+                    columnValues = dict(columns)
+                    for fld, meanFld in ((mergeTools.CURRENTRANK,mergeTools.MEANLIKELIHOOD),(mergeTools.UPLIFTRANK,mergeTools.MEANUPLIFT)):
+                        checkValues[fld].append((columnValues[meanFld],columnValues[fld]))
+                mergeTools.writeColumns(outFC,gridcodes,columns + speciesColumns(species,hucSppNames,arrCur,arrUplift),whereClause=hucTools.hucWhereClause([huc]))
+
+        #Optionally, compare the ranks with the exact ranks
+        if checkRanks:
+            msg("Checking the ranks against the exact ranks")
+            for fld in (mergeTools.CURRENTRANK,mergeTools.UPLIFTRANK):
+                values = numpy.concatenate([fldValues for fldValues, fldRanks in checkValues[fld]])
+                ranks = numpy.concatenate([fldRanks for fldValues, fldRanks in checkValues[fld]])
+                nChanged = (ranks != mergeTools.quantileRanks(values,breaks,"min")).sum()
+                msg("...{}: break error {:.3%} (bound {:.3%}); {} of {} ranks differ from the exact ranks".format(
+                    fld,sketchTools.breakError(values,breaks,breakValues[fld]),sketchTools.sketchErrorBound(sketches[fld]),nChanged,(~numpy.isnan(values)).sum()))
+    if len(hucs) > 1:
+        pool.close()
+        pool.join()
+    if noData:
+        msg("{} catchments have no species values".format(noData),"warning")
+
+    #Keep the ranking settings and the merged species for UPLIFT_UpdateMergedSpecies
+    settings = {"RankScheme":rankScheme,"Ties":ties,"RankLevel":rankLevel}
+    if rankLevel == "SKETCH": settings["SketchSize"] = sketchTools.SKETCHSIZE
+    mergeTools.writeMergeInfo(outFC,settings,species)
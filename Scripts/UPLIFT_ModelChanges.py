@@ -1,9 +1,24 @@
 # UPLIFT_ModelChanges.py
 #
 # Description: Runs a second iteration of Maxent with a modified ResponseVars table
+#
+# If in-process scoring is chosen, the species' trained model (the lambdas file in its
+#  Output folder) is applied to the modified records directly (see MAXENT_Lambdas) and
+#  the projection and GRIDCODEs are written to the scenario folder as binary layers
+#  (see UPLIFT_ProjectionTools), so no scenario batch file or ASCII files are written
+#  (any left from an earlier MaxEnt run are removed).
+#
+# Otherwise the scenario's ASCII layers are written once to the shared layer store of
+#  the scenario and HUC (see UPLIFT_ProjectionTools), and linked into the species'
+#  scenario folder for MaxEnt to project onto, any earlier projection is removed, and
+#  the scenario batch file ({scenario}_RunMaxent.bat) is written.
 
 # Import arcpy module
 import sys, os, arcpy
+import MISC_HUCIndex as hucTools
+import HABMODEL_DataTools as dataTools
+import MAXENT_Lambdas as maxentLambdas
+import UPLIFT_ProjectionTools as projTools
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -14,6 +29,7 @@ respvarsFC = arcpy.GetParameterAsText(1)    #Modified Response Vars Table
 statsFolder = arcpy.GetParameterAsText(2)   #Stats root folder containing all species models
 scenarioName = arcpy.GetParameterAsText(3)  #Prefix used to identify outputs
 HUCFilter = arcpy.GetParameterAsText(4)
+scoreInProcess = arcpy.GetParameterAsText(7) == "true"   #Optional: project the trained model without running MaxEnt
 
 #Set environments
 arcpy.env.overwriteOutput = True
@@ -69,24 +85,17 @@ else:
 #Set output parameters
 arcpy.SetParameterAsText(5,scenarioFolder)
 newBatchFN = os.path.join(sppFolder,"{}_RunMaxent.bat".format(scenarioName))
-arcpy.SetParameterAsText(6,newBatchFN)
 
 ##---PROCESSES----
 #Extract records for catchments in the selected HUC
 msg("...Extracting records within HUC {}".format(HUCFilter))
-whereClause = "REACHCODE LIKE '{}%'".format(HUCFilter)
+whereClause = hucTools.hucWhereClause([HUCFilter])
 tmpRVTable = arcpy.MakeTableView_management(respvarsFC,"tmpRVtable",whereClause)
 #tmpRVTable = arcpy.TableSelect_analysis(respvarsFC,"in_memory/tmpTable",whereClause)
 #Get the number of records extracted and tell the user
 recordCount = arcpy.GetCount_management(tmpRVTable).getOutput(0)
 msg("{} catchment records extracted".format(recordCount),'warning')
 
-##Start creating the output ASCII files
-#Create the ASCII header
-msg("...Creating the header lines for the output pseudo ASCII files")
-#  Create the header string, incorporating the number of rows determined above
-asciiHeader = 'ncols\t1\nnrows\t{0}\nxllcorner\t0\nxyllcorner\t0\ncellsize\t1\nNODATA_value\t-9999\n'.format(recordCount)
-
 #Generate a list of fields to include (from the SWD file)
 msg("...Generating a list of fields to include")
 file = open(swdFile,'r')
@@ -95,55 +104,83 @@ file.close()
 lineItems = line.split(",")[3:] #Omit the 1st item (Species,X,Y)
 lineItems.append("GRIDCODE") #Add GRIDCODE (to match ASCII results back to CSV later
 
-#Create a cursor to access data in the rv table
-msg("Starting to extract data")
-cursor = arcpy.da.SearchCursor(respvarsFC,lineItems,whereClause)
-fldNames = cursor.fields
-total = len(fldNames)
-for fld in fldNames:
-    fldIndex = cursor.fields.index(fld)
-    #msg("   Converting {} [{} of {}]".format(fld,fldIndex+1,total))
-    #Initialize output file
-    outFile = open(os.path.join(scenarioFolder,"{}.asc".format(fld)),'w')
-    outFile.write(asciiHeader)
-    for rec in cursor:
-        val  = rec[fldIndex]
-        outFile.write("{}\n".format(val))
-    outFile.close()
-    #reset the cursor
-    cursor.reset()
-del cursor
-        
-#Create a new batch file to run MaxEnt
-# Open the original for reading
-origFile = open(origBatchFile,'r')
-lineString = origFile.readline()
-origFile.close()
-
-#Make a dictioary of key/values from data in the line string
-lineObjects = lineString.split()
-
-#Create dictionary of modify values
-changeDict = {}
-changeDict['outputdirectory'] = scenarioFolder
-changeDict['responsecurves'] = 'false'
-changeDict['pictures'] = 'false'
-changeDict['jackknife'] = 'false'
-
-#Initialize the output file
-outFile = open(newBatchFN,'w')
-
-#Modify key objects and write to output
-for lineObj in lineObjects:
-    lineString = lineObj
-    for key,val in changeDict.items():
-        if key in lineString:
-            lineString = "{}={} ".format(key,val)
-            break
-    outFile.write("{} ".format(lineString))
-    
-#Add pointer to projection folder
-outFile.write('projectionlayers={}'.format(scenarioFolder))
+if scoreInProcess:
+    #Read the trained model
+    msg("...Reading the trained model")
+    lambdasFN = maxentLambdas.lambdasFilename(os.path.join(sppFolder,"Output"),speciesName)
+    checkFile(lambdasFN)
+    model = maxentLambdas.readLambdas(lambdasFN)
+    modelVars = maxentLambdas.modelVariables(model)
+    missingVars = [varName for varName in modelVars if not varName in lineItems]
+    if missingVars:
+        msg("Model variables {} are not in the SWD file.\nExiting.".format(missingVars),"error")
+        sys.exit(1)
 
-outFile.close()
+    #Use the output format of the original run (MaxEnt's default is logistic)
+    outputFormat = "logistic"
+    origFile = open(origBatchFile,'r')
+    for lineObj in origFile.readline().split():
+        if lineObj.startswith("outputformat="):
+            outputFormat = lineObj.split("=")[1].lower()
+    origFile.close()
+
+    #Read the model variables and compute the projected likelihoods
+    msg("Projecting the model onto the modified records ({} output)".format(outputFormat))
+    arrRecs = dataTools.readRecords(respvarsFC,["GRIDCODE"] + modelVars,whereClause)
+    predictions = maxentLambdas.predict(model,arrRecs,outputFormat)
+
+    #Write the GRIDCODEs and projection as binary layers
+    projTools.writeBinaryLayer(os.path.join(scenarioFolder,"GRIDCODE.npy"),arrRecs["GRIDCODE"])
+    projectedNPY = os.path.join(scenarioFolder,"{}_{}.npy".format(speciesName,os.path.basename(scenarioFolder)))
+    projTools.writeBinaryLayer(projectedNPY,predictions)
+    msg("Projected likelihoods written to {}".format(projectedNPY))
+
+    #Remove any batch file left from an earlier MaxEnt run, as there is none to run
+    if os.path.exists(newBatchFN):
+        os.remove(newBatchFN)
+else:
+    #Write the ASCII layers missing from the shared layer store, and link them into the scenario folder
+    msg("Starting to extract data")
+    #Remove any earlier projection, so CalculateUplift reads the one MaxEnt writes
+    projTools.removeLayer(os.path.join(scenarioFolder,"{}_{}".format(speciesName,os.path.basename(scenarioFolder))))
+    storeFolder = projTools.layerStoreFolder(statsFolder,scenarioName,HUCFilter)
+    try:
+        projTools.updateLayerStore(respvarsFC,lineItems,storeFolder,recordCount,whereClause,msg)
+    except ValueError as e:
+        msg("{}.\nExiting.".format(e),"error")
+        sys.exit(1)
+    projTools.linkLayers(storeFolder,lineItems,scenarioFolder,msg)
+
+    #Create a new batch file to run MaxEnt
+    # Open the original for reading
+    origFile = open(origBatchFile,'r')
+    lineString = origFile.readline()
+    origFile.close()
+
+    #Make a dictioary of key/values from data in the line string
+    lineObjects = lineString.split()
+
+    #Create dictionary of modify values
+    changeDict = {}
+    changeDict['outputdirectory'] = scenarioFolder
+    changeDict['responsecurves'] = 'false'
+    changeDict['pictures'] = 'false'
+    changeDict['jackknife'] = 'false'
+
+    #Initialize the output file
+    outFile = open(newBatchFN,'w')
+
+    #Modify key objects and write to output
+    for lineObj in lineObjects:
+        lineString = lineObj
+        for key,val in changeDict.items():
+            if key in lineString:
+                lineString = "{}={} ".format(key,val)
+                break
+        outFile.write("{} ".format(lineString))
+    
+    #Add pointer to projection folder
+    outFile.write('projectionlayers={}'.format(scenarioFolder))
 
+    outFile.close()
+    arcpy.SetParameterAsText(6,newBatchFN)
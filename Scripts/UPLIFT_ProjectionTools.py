@@ -0,0 +1,268 @@
+# UPLIFT_ProjectionTools.py
+#
+# Description: Functions shared by the UPLIFT tools for writing the "pseudo raster"
+#  ASCII layers MaxEnt projects models onto: one file per environment variable, each
+#  one column wide with one row per NHD catchment. This is a helper module imported
+#  by the scripts in this folder; it is not run as a tool itself.
+#
+# All layers are written in a single pass through the table: each chunk of records
+#  read from the cursor is split into its columns, and each column is written to its
+#  layer file in one call through a buffered file.
+#
+# The layers of a scenario are the same for all species (they differ only in which
+#  variables each species' SWD file uses), so they are written once to a shared layer
+#  store, {stats folder}\{scenario}_Layers\{HUC}, and linked into each species'
+#  {scenario}_Output folder with hard links (or copied, if hard links can't be made,
+#  e.g. across drives). The store's manifest (layers.json) lists the table, where
+#  clause, record count and fields of its layers, and the species folders linked to
+#  it; the store is rebuilt if the table, where clause or record count changes, or if
+#  the table's own files have been modified since (see MISC_HUCIndex.tableStamp;
+#  tables whose files can't be found are written again each time), and only the
+#  fields it lacks are added for a new species. Each species folder gets a
+#  manifest (SharedLayers.json) listing its linked layers, used to remove them once
+#  the uplift is calculated. The store itself is removed when no species folder
+#  links to it anymore. Delete the store folder to force the layers to be rewritten.
+#
+# Layers that MaxEnt doesn't need to read (e.g. the projections and GRIDCODEs written
+#  when a model is projected in process, see MAXENT_Lambdas) are written in a binary
+#  format instead: a NumPy .npy file (a short header giving the type and shape, then
+#  the values) holding float32 values, or int32 values for integer layers such as
+#  GRIDCODE, which float32 can't hold exactly. These are read with memory mapping,
+#  without parsing. A layer is kept in one format only: writing or linking a layer in
+#  one format removes its file in the other (MaxEnt's own projections are cleared
+#  before it is run, see UPLIFT_ModelChanges), and readers use whichever file exists.
+#
+# Each projection is keyed by the GRIDCODE layer of the folder of layers it was
+#  projected from ({species}_{folder}.asc/.npy by {folder}\GRIDCODE.asc/.npy), so
+#  projections made over different extents (e.g. a statewide current conditions run and
+#  a single HUC scenario) can be matched catchment by catchment with joinByKey.
+#
+# Fall 2026
+
+import os, sys, time, json, shutil, arcpy, numpy
+import MISC_HUCIndex as hucTools
+
+# Names of the manifest files of the layer store and of the species' projection folders
+STOREMANIFEST = "layers.json"
+LINKMANIFEST = "SharedLayers.json"
+
+# Value written for nulls
+NODATA = -9999
+
+# Number of records written to the layer files at a time, and each file's buffer size (bytes)
+CHUNKSIZE = 10000
+BUFFERSIZE = 1024 * 1024
+
+## ---Functions---
+def asciiHeader(rowCount,nodata=NODATA):
+    #Returns the header lines of a single column pseudo ASCII grid with rowCount rows
+    return 'ncols\t1\nnrows\t{0}\nxllcorner\t0\nxyllcorner\t0\ncellsize\t1\nNODATA_value\t{1}\n'.format(rowCount,nodata)
+
+def exportAsciiLayers(tbl,flds,outFolder,rowCount,whereClause="",report=None,nodata=NODATA):
+    #Writes each field of the table's records matching the where clause to its own
+    # ASCII layer file ([field].asc) in the output folder, reading the table once.
+    # Nulls are written as the nodata value. rowCount, the number of records matching
+    # the where clause, is written in the headers; a ValueError is raised if a different
+    # number of records is read. If given, report(text) is called with the throughput.
+    # Returns the number of records written and the time taken (seconds).
+    startTime = time.time()
+    header = asciiHeader(rowCount,nodata)
+    nodataText = str(nodata)
+    def writeChunk(rows):
+        for outFile, values in zip(outFiles,zip(*rows)):
+            outFile.write("".join([nodataText + "\n" if val is None else "{}\n".format(val) for val in values]))
+    outFiles = []
+    for fld in flds:
+        removeLayer(os.path.join(outFolder,fld),(".npy",))
+        outFiles.append(open(os.path.join(outFolder,"{}.asc".format(fld)),'w',BUFFERSIZE))
+        outFiles[-1].write(header)
+    nRows = 0
+    rows = []
+    cursor = arcpy.da.SearchCursor(tbl,flds,whereClause)
+    for rec in cursor:
+        rows.append(rec)
+        if len(rows) == CHUNKSIZE:
+            writeChunk(rows)
+            nRows += len(rows)
+            rows = []
+    del cursor
+    if rows:
+        writeChunk(rows)
+        nRows += len(rows)
+    for outFile in outFiles:
+        outFile.close()
+    seconds = time.time() - startTime
+    if nRows != int(rowCount):
+        raise ValueError("{} records were read, but {} were expected".format(nRows,rowCount))
+    if report:
+        report("{} records written to {} layers in {:.1f} seconds ({:.0f} rows/sec)".format(nRows,len(flds),seconds,nRows / max(seconds,1e-6)))
+    return nRows, seconds
+
+def removeLayer(baseFN,exts=(".npy",".asc")):
+    #Removes the layer's (baseFN without the extension) files with the given extensions
+    for ext in exts:
+        if os.path.exists(baseFN + ext): os.remove(baseFN + ext)
+
+def writeBinaryLayer(npyFN,values):
+    #Writes the values as a binary layer: float32, or int32 for integer values. Removes
+    # the layer's ASCII file, if any.
+    removeLayer(os.path.splitext(npyFN)[0],(".asc",))
+    values = numpy.asarray(values)
+    if values.dtype.kind in "iu": dtype = "int32"
+    else: dtype = "float32"
+    numpy.save(npyFN,values.astype(dtype))
+
+def layerFilename(baseFN):
+    #Returns the binary (.npy) or ASCII (.asc) file of the layer (baseFN without the
+    # extension), or None if neither exists. Raises a ValueError if both exist, as
+    # one of them is left from an earlier run.
+    layerFNs = [baseFN + ext for ext in (".npy",".asc") if os.path.exists(baseFN + ext)]
+    if len(layerFNs) > 1:
+        raise ValueError("Both {} and {} exist; remove the one that is out of date".format(*layerFNs))
+    if not layerFNs:
+        return None
+    return layerFNs[0]
+
+def readLayer(layerFN):
+    #Returns the values of a binary layer (memory mapped) or an ASCII layer
+    if layerFN.endswith(".npy"):
+        return numpy.load(layerFN,mmap_mode="r")
+    f = open(layerFN,'rb')
+    for i in range(6): f.readline() #skip the header lines
+    values = numpy.fromfile(f,dtype="float64",sep=" ")
+    f.close()
+    return values
+
+def projectionKeysFilename(sppFolder,folderName):
+    #Returns the GRIDCODE layer keying the projections made from the species' folder
+    # of layers (e.g. "XX_Output"), or None if it doesn't exist
+    return layerFilename(os.path.join(sppFolder,folderName,"GRIDCODE"))
+
+def joinByKey(leftKeys,rightKeys):
+    #Matches two arrays of unique keys with a sorted merge. Returns the row indices of
+    # the keys found in both arrays, in the order of the left keys, as (left rows,
+    # right rows). Raises a ValueError if either array holds a key more than once.
+    leftKeys = numpy.asarray(leftKeys)
+    rightKeys = numpy.asarray(rightKeys)
+    for keys in (leftKeys,rightKeys):
+        sortedKeys = numpy.sort(keys)
+        if (sortedKeys[1:] == sortedKeys[:-1]).any():
+            raise ValueError("Key {} is repeated".format(sortedKeys[1:][sortedKeys[1:] == sortedKeys[:-1]][0]))
+    if len(leftKeys) == 0 or len(rightKeys) == 0:
+        return numpy.zeros(0,dtype="int64"), numpy.zeros(0,dtype="int64")
+    rightOrder = numpy.argsort(rightKeys,kind="mergesort")
+    sortedRight = rightKeys[rightOrder]
+    positions = numpy.minimum(numpy.searchsorted(sortedRight,leftKeys),len(sortedRight) - 1)
+    isMatch = sortedRight[positions] == leftKeys
+    return numpy.nonzero(isMatch)[0], rightOrder[positions[isMatch]]
+
+def layerStoreFolder(statsFolder,scenarioName,hucFilter):
+    #Returns the folder of the shared layer store of the scenario and HUC
+    return os.path.join(statsFolder,"{}_Layers".format(scenarioName),str(hucFilter))
+
+def readManifest(manifestFN):
+    #Returns the contents of a manifest file, or None if it doesn't exist
+    if not os.path.exists(manifestFN):
+        return None
+    f = open(manifestFN,'r')
+    manifest = json.load(f)
+    f.close()
+    return manifest
+
+def writeManifest(manifestFN,manifest):
+    #Writes the manifest file
+    f = open(manifestFN,'w')
+    json.dump(manifest,f,indent=1,sort_keys=True)
+    f.close()
+
+def updateLayerStore(tbl,flds,storeFolder,rowCount,whereClause="",report=None):
+    #Writes the fields' layers to the layer store, unless they are already there.
+    # The store is emptied first if it was written from a different table, where
+    # clause or record count, or from the table before its own files were last modified.
+    # Returns the store's manifest.
+    manifestFN = os.path.join(storeFolder,STOREMANIFEST)
+    manifest = readManifest(manifestFN)
+    source = {"table":tbl,"whereClause":whereClause,"rowCount":int(rowCount),"tableStamp":hucTools.tableStamp(tbl)}
+    if manifest and (source["tableStamp"] is None or dict([(key,manifest.get(key)) for key in source]) != source):
+        if report: report("Layer store {} is out of date; rewriting it".format(storeFolder))
+        shutil.rmtree(storeFolder)
+        manifest = None
+    if manifest is None:
+        if not os.path.exists(storeFolder): os.makedirs(storeFolder)
+        manifest = dict(source)
+        manifest["fields"] = []
+        manifest["links"] = []
+    newFlds = [fld for fld in flds if not (fld in manifest["fields"] and os.path.exists(os.path.join(storeFolder,"{}.asc".format(fld))))]
+    if newFlds:
+        exportAsciiLayers(tbl,newFlds,storeFolder,rowCount,whereClause,report)
+        manifest["fields"] = sorted(set(manifest["fields"] + newFlds))
+        writeManifest(manifestFN,manifest)
+    elif report:
+        report("All {} layers found in layer store {}".format(len(flds),storeFolder))
+    return manifest
+
+def linkFile(srcFN,dstFN):
+    #Makes dstFN a hard link to srcFN, replacing any existing file, or a copy of it if
+    # a hard link can't be made. Returns True if a link was made.
+    if os.path.exists(dstFN): os.remove(dstFN)
+    try:
+        if hasattr(os,"link"):
+            os.link(srcFN,dstFN)
+            return True
+        if sys.platform == "win32":
+            import ctypes
+            if ctypes.windll.kernel32.CreateHardLinkW(unicode(dstFN),unicode(srcFN),None):
+                return True
+    except OSError:
+        pass
+    shutil.copyfile(srcFN,dstFN)
+    return False
+
+def linkLayers(storeFolder,flds,outFolder,report=None):
+    #Links the fields' layers in the layer store into the output folder, and records
+    # them in the output folder's manifest and the output folder in the store's
+    manifestFN = os.path.join(storeFolder,STOREMANIFEST)
+    manifest = readManifest(manifestFN)
+    nLinked = 0
+    for fld in flds:
+        fileName = "{}.asc".format(fld)
+        removeLayer(os.path.join(outFolder,fld),(".npy",))
+        if linkFile(os.path.join(storeFolder,fileName),os.path.join(outFolder,fileName)):
+            nLinked += 1
+    writeManifest(os.path.join(outFolder,LINKMANIFEST),{"store":storeFolder,"files":["{}.asc".format(fld) for fld in flds]})
+    outFolder = os.path.abspath(outFolder)
+    if not outFolder in manifest["links"]:
+        manifest["links"].append(outFolder)
+        writeManifest(manifestFN,manifest)
+    if report:
+        report("{} layers linked and {} copied from layer store {}".format(nLinked,len(flds) - nLinked,storeFolder))
+
+def removeLinkedLayers(outFolder,keep=(),report=None):
+    #Removes the layers linked into the output folder (except those in keep) and its
+    # manifest, and removes the layer store once no output folder links to it. Returns
+    # False if the output folder has no manifest (its layers weren't linked).
+    linkManifestFN = os.path.join(outFolder,LINKMANIFEST)
+    linkManifest = readManifest(linkManifestFN)
+    if linkManifest is None:
+        return False
+    for fileName in linkManifest["files"]:
+        if fileName in keep: continue
+        if os.path.exists(os.path.join(outFolder,fileName)):
+            os.remove(os.path.join(outFolder,fileName))
+    os.remove(linkManifestFN)
+    storeFolder = linkManifest["store"]
+    manifestFN = os.path.join(storeFolder,STOREMANIFEST)
+    manifest = readManifest(manifestFN)
+    if manifest is None:
+        return True
+    outFolder = os.path.abspath(outFolder)
+    if outFolder in manifest["links"]:
+        manifest["links"].remove(outFolder)
+    if manifest["links"]:
+        writeManifest(manifestFN,manifest)
+    else:
+        if report: report("Removing layer store {}".format(storeFolder))
+        shutil.rmtree(storeFolder)
+        scenarioStore = os.path.dirname(storeFolder)
+        if not os.listdir(scenarioStore): os.rmdir(scenarioStore)
+    return True
@@ -0,0 +1,141 @@
+# UPLIFT_QuantileSketch.py
+#
+# Description: Quantile sketches used by UPLIFT_MergeTools to rank the catchments of
+#  several HUCs statewide without sorting them all. This is a helper module imported
+#  by the scripts in this folder; it is not run as a tool itself, and it needs only
+#  numpy (not arcpy).
+#
+# Values are streamed, k at a time, into a sketch (a KLL style stack of compactors).
+#  Level h of a sketch holds up to k values, each standing for 2^h values; a full level
+#  is sorted and every other value (starting with the first and second value in turn)
+#  is moved up a level, which changes the estimated position of any value by at most
+#  2^h. The sketch keeps the sum of these changes, so its error is bounded
+#  deterministically: the exact position of each value read from the sketch (the range
+#  of positions of its ties) is within that sum of the position asked for. As a
+#  fraction of the n values this is at most about log2(n / k) / k (e.g. under 0.5% for
+#  k = 2000 and a million values), and the sketch holds at most k values on each of its
+#  about log2(n / k) levels. Sketches of different sets of values (e.g. of each HUC)
+#  can be merged, the merged sketch keeping the sum of their errors; a sketch of fewer
+#  than k values is exact.
+#
+# A sketch is a dictionary holding k, the number of values (n), the error sum, the
+#  values of each level and the number of times each level was compacted, so it can be
+#  returned from a worker process.
+#
+# Fall 2026
+
+import numpy
+
+# Number of values held by each level of a quantile sketch
+SKETCHSIZE = 2000
+
+## ---Functions---
+def newSketch(k=SKETCHSIZE):
+    #Returns an empty quantile sketch holding up to k values per level
+    return {"k":k,"n":0,"error":0,"levels":[],"compactions":[]}
+
+def compactSketch(sketch):
+    #Moves every other value of each full level up a level, until no level is full
+    k = sketch["k"]
+    h = 0
+    while h < len(sketch["levels"]):
+        level = sketch["levels"][h]
+        if len(level) >= k:
+            if h + 1 == len(sketch["levels"]):
+                sketch["levels"].append(numpy.zeros(0,dtype="float64"))
+                sketch["compactions"].append(0)
+            level = numpy.sort(level)
+            #Hold back the largest value of an odd number of values
+            nCompacted = len(level) - len(level) % 2
+            offset = sketch["compactions"][h] % 2
+            sketch["levels"][h + 1] = numpy.concatenate((sketch["levels"][h + 1],level[offset:nCompacted:2]))
+            sketch["levels"][h] = level[nCompacted:]
+            sketch["compactions"][h] += 1
+            sketch["error"] += 2 ** h
+        h += 1
+    return sketch
+
+def updateSketch(sketch,values):
+    #Adds the values (skipping NaNs) to the sketch, k at a time
+    values = numpy.asarray(values,dtype="float64")
+    values = values[~numpy.isnan(values)]
+    k = sketch["k"]
+    if not sketch["levels"]:
+        sketch["levels"].append(numpy.zeros(0,dtype="float64"))
+        sketch["compactions"].append(0)
+    for start in range(0,len(values),k):
+        sketch["levels"][0] = numpy.concatenate((sketch["levels"][0],values[start:start + k]))
+        compactSketch(sketch)
+    sketch["n"] += len(values)
+    return sketch
+
+def mergeSketches(sketches):
+    #Returns the sketch of the values of all the sketches (which must have the same k)
+    merged = newSketch(sketches[0]["k"])
+    for sketch in sketches:
+        if sketch["k"] != merged["k"]:
+            raise ValueError("Sketches of different sizes ({} and {}) can't be merged".format(merged["k"],sketch["k"]))
+        for h in range(len(sketch["levels"])):
+            if h == len(merged["levels"]):
+                merged["levels"].append(numpy.zeros(0,dtype="float64"))
+                merged["compactions"].append(0)
+            merged["levels"][h] = numpy.concatenate((merged["levels"][h],sketch["levels"][h]))
+            merged["compactions"][h] += sketch["compactions"][h]
+        merged["n"] += sketch["n"]
+        merged["error"] += sketch["error"]
+    return compactSketch(merged)
+
+def sketchValueCount(sketch):
+    #Returns the number of values held by the sketch
+    return sum([len(level) for level in sketch["levels"]])
+
+def sketchErrorBound(sketch):
+    #Returns the bound on the error of the sketch's quantiles, as a fraction of its values
+    if sketch["n"] == 0:
+        return 0.0
+    return sketch["error"] / float(sketch["n"])
+
+def sketchPositions(n,fractions):
+    #Returns the positions (1 to n) of the fractions of n values: the last position p
+    # with p / n at most the fraction, as UPLIFT_MergeTools.quantileRanks compares them
+    # (fraction * n may be rounded below or above a whole position, e.g. 0.29 * 400)
+    fractions = numpy.asarray(fractions,dtype="float64")
+    positions = numpy.floor(fractions * n)
+    positions = numpy.where(positions / float(n) > fractions,positions - 1,positions)
+    positions = numpy.where((positions + 1) / float(n) <= fractions,positions + 1,positions)
+    return numpy.maximum(positions,1)
+
+def sketchQuantiles(sketch,fractions):
+    #Returns the value at each fraction (0 to 1) of the sketch's values: the smallest
+    # value whose estimated position is at least the fraction of n (and at least 1)
+    values = numpy.concatenate(sketch["levels"])
+    weights = numpy.concatenate([numpy.repeat(2 ** h,len(sketch["levels"][h])) for h in range(len(sketch["levels"]))])
+    order = numpy.argsort(values,kind="mergesort")
+    values = values[order]
+    positions = numpy.cumsum(weights[order])
+    targets = sketchPositions(sketch["n"],fractions)
+    return values[numpy.minimum(numpy.searchsorted(positions,targets,"left"),len(values) - 1)]
+
+def breakRanks(values,breakValues):
+    #Returns the class (1 to len(breakValues) + 1) of each value, or 0 for NaN values:
+    # 1 + the number of break values below it, so tied values share their lowest class
+    values = numpy.asarray(values,dtype="float64")
+    ranks = numpy.zeros(values.shape,dtype="int32")
+    hasValue = ~numpy.isnan(values)
+    ranks[hasValue] = 1 + numpy.searchsorted(breakValues,values[hasValue],"left")
+    return ranks
+
+def breakError(values,fractions,breakValues):
+    #Returns the largest distance, as a fraction of the values (skipping NaNs), between
+    # the exact positions of the break values (the range of positions of their ties) and
+    # the positions of the fractions they were read for. Sorts all the values, so it is
+    # only used to check a sketch.
+    sortedValues = numpy.sort(numpy.asarray(values,dtype="float64"))
+    sortedValues = sortedValues[~numpy.isnan(sortedValues)]
+    n = len(sortedValues)
+    if n == 0:
+        return 0.0
+    targets = sketchPositions(n,fractions)
+    lowPositions = numpy.searchsorted(sortedValues,breakValues,"left") + 1
+    highPositions = numpy.searchsorted(sortedValues,breakValues,"right")
+    return numpy.maximum(numpy.maximum(lowPositions - targets,targets - highPositions),0).max() / float(n)
@@ -11,6 +11,7 @@
 # John.Fay@duke.edu
 
 import sys, os, arcpy, csv
+import UPLIFT_ProjectionTools as projTools
 arcpy.env.overwriteOutput = True
 
 # Input variables
@@ -35,12 +36,8 @@ if not(os.path.exists(prjFolder)):
 else:
     msg("Using existing projection output folder...")
 
-#Create the ASCII header
-msg("Creating the header lines for the output pseudo ASCII files")
-##Get the number of lines in the file to determine how many rows to set in the ASCII header
+##Get the number of lines in the file to determine how many rows to set in the ASCII headers
 rowCount = arcpy.GetCount_management(respvarTbl).getOutput(0)
-##Create the header string, incorporating the number of rows determined above
-asciiHeader = 'ncols\t1\nnrows\t{0}\nxllcorner\t0\nxyllcorner\t0\ncellsize\t1\nNODATA_value\t-9999\n'.format(rowCount)
 
 #Get a list if fields
 fldList = []
@@ -52,22 +49,8 @@ envVarsCount = len(fldList)
 #Start creating the files
 msg("{} ASCII layers will be created".format(envVarsCount))
 
-##loop through each environmetal variable 
-for fld in fldList:
-    msg("...Processing variable {}".format(fld))
-    ##Create the output file
-    outFN = os.path.join(prjFolder,fld + ".asc")
-    file = open(outFN,'w')
-    ##Write the ASCII header lines
-    file.write(asciiHeader)
-    ##Read the CSV lines and write out the selected column
-    records = arcpy.da.SearchCursor(respvarTbl,fld)
-    for rec in records:
-        outVal = rec[0]
-        if outVal is None: outVal = -9999
-        file.write("{}\n".format(outVal))
-    ##Close the file
-    file.close()
+##Write all the layers in a single pass through the table
+projTools.exportAsciiLayers(respvarTbl,fldList,prjFolder,rowCount,report=msg)
 
 msg("ASCII projection creation complete!")
 
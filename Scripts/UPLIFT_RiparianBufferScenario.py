@@ -9,6 +9,7 @@
 
 # Import arcpy module
 import sys, os, arcpy
+import MISC_HUCIndex as hucTools
 
 #User variables
 origRVTbl = arcpy.GetParameterAsText(0)
@@ -31,7 +32,7 @@ def msg(txt,type="message"):
 ## PROCESSES 
 #Make a copy of the responseVariableTable
 msg("Copying original data to {}".format(upliftTbl))
-whereClause = "REACHCODE LIKE '{}%'".format(HUCFilter)
+whereClause = hucTools.hucWhereClause([HUCFilter])
 arcpy.Select_analysis(origRVTbl,upliftTbl,whereClause)
 #upliftTbl = arcpy.arcpy.CopyFeatures_management(origRVTbl,upliftTbl)
 
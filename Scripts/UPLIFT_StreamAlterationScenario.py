@@ -7,6 +7,7 @@
 
 # Import arcpy module
 import sys, os, arcpy
+import MISC_HUCIndex as hucTools
 
 #User variables
 origRVTbl = arcpy.GetParameterAsText(0)
@@ -33,7 +34,7 @@ if HUCFilter in ("","#"):
     whereClause = ""
 else:
     msg("...subsetting features that match HUC {}".format(HUCFilter))
-    whereClause = "REACHCODE LIKE '{}%'".format(HUCFilter)
+    whereClause = hucTools.hucWhereClause([HUCFilter])
 upliftTbl = arcpy.TableSelect_analysis(origRVTbl,upliftTbl,whereClause)
 
 #Reduce values of V0001E to 90% of current values. 
@@ -0,0 +1,163 @@
+# UPLIFT_UpdateMergedSpecies.py
+#
+# Description:
+#  Adds species to, or removes species from, the merged uplift feature class created by
+#  UPLIFT_MergeUpliftResults, without merging all the species again.
+#
+# Overview:
+#  The merged feature class keeps the sums of the species' current likelihoods and
+#  uplifts, and the number of species, for each catchment. Adding a species adds its
+#  values (from its uplift table, matched by GRIDCODE) to the sums and its fields to
+#  the feature class; removing a species subtracts its values (from its fields in the
+#  feature class) and deletes its fields. The mean likelihood and uplift are then
+#  recomputed from the sums, the catchments re-ranked, and all values written in a
+#  single pass (see UPLIFT_MergeTools).
+#
+#  The catchments are re-ranked with the settings kept with the merged feature class
+#  (ranking scheme, ties and level: within each HUC, across all HUCs, or across all
+#  HUCs from merged HUC sketches), unless another scheme or tie handling is given.
+#  Species are matched by the species names kept with the merge (the table name
+#  without its HUC, e.g. "Species" for "Species_03030002"), so all the HUC tables of a
+#  species given at once are added as one species, and removing a species deletes the
+#  fields its values were written to.
+#
+# Fall 2026
+
+import sys, os, arcpy, numpy
+import UPLIFT_MergeTools as mergeTools
+import UPLIFT_QuantileSketch as sketchTools
+arcpy.env.overwriteOutput = 1
+
+# Input variables
+mergedFC = arcpy.GetParameterAsText(0)      #Merged uplift feature class (from UPLIFT_MergeUpliftResults)
+sppTables = arcpy.GetParameterAsText(1)     #Species uplift tables to add or remove (semicolon separated)
+action = arcpy.GetParameterAsText(2)        #"Add" or "Remove"
+rankScheme = arcpy.GetParameterAsText(3)    #Optional: deciles, quintiles, quartiles, percentiles, or semicolon separated breaks (e.g. 0.5;0.9); default: the merge's scheme
+ties = arcpy.GetParameterAsText(4)          #Optional: rank given to tied values: min, max or ordinal; default: the merge's tie handling
+
+action = action.lower()
+
+## ---Functions---
+def msg(txt,type="message"):
+    print txt
+    if type == "message":
+        arcpy.AddMessage(txt)
+    elif type == "warning":
+        arcpy.AddWarning(txt)
+    elif type == "error":
+        arcpy.AddError(txt)
+
+## ---Set derived variables---
+sppTbls = [sppTbl.strip().strip("'") for sppTbl in sppTables.split(";") if sppTbl.strip()]
+arcpy.SetParameterAsText(5,mergedFC)
+
+fcFlds = [fld.name for fld in arcpy.ListFields(mergedFC)]
+for fld in (mergeTools.SUMLIKELIHOOD,mergeTools.SUMUPLIFT,mergeTools.SPPCOUNT,mergeTools.HUCFIELD):
+    if not fld in fcFlds:
+        msg("{} has no {} field; merge the species again with UPLIFT_MergeUpliftResults.\nExiting.".format(mergedFC,fld),"error")
+        sys.exit(1)
+settings, species = mergeTools.readMergeInfo(mergedFC)
+if settings is None:
+    msg("{} has no merge tables; merge the species again with UPLIFT_MergeUpliftResults.\nExiting.".format(mergedFC),"error")
+    sys.exit(1)
+if not action in ("add","remove"):
+    msg("Unknown action: {}.\nExiting.".format(action),"error")
+    sys.exit(1)
+
+#Rank with the merge's settings, unless others are given
+if rankScheme in ("","#"): rankScheme = settings["RankScheme"]
+if ties in ("","#"): ties = settings["Ties"]
+rankLevel = settings["RankLevel"]
+if rankLevel == "SKETCH": ties = "min"
+try:
+    breaks = mergeTools.rankBreaks(rankScheme)
+except ValueError as e:
+    msg("{}.\nExiting.".format(e),"error")
+    sys.exit(1)
+if not ties in ("min","max","ordinal"):
+    msg("Unknown tie handling: {}.\nExiting.".format(ties),"error")
+    sys.exit(1)
+
+#Group the tables by species name (the table name without its HUC)
+sppNames = []
+sppNameTbls = {}
+for sppTbl in sppTbls:
+    sppName = os.path.basename(sppTbl).rsplit("_",1)[0]
+    if not sppName in sppNameTbls:
+        sppNames.append(sppName)
+        sppNameTbls[sppName] = []
+    sppNameTbls[sppName].append(sppTbl)
+
+## ---Processes---
+#Read the running totals and each catchment's HUC
+msg("Reading running totals")
+gridcodes, arrTotals = mergeTools.readKeyedValues(mergedFC,[mergeTools.SUMLIKELIHOOD,mergeTools.SUMUPLIFT,mergeTools.SPPCOUNT])
+arrTotals = numpy.where(numpy.isnan(arrTotals),0.0,arrTotals)
+sumCur, sumUplift, counts = arrTotals[:,0], arrTotals[:,1], arrTotals[:,2].astype("int32")
+hucs = mergeTools.readHUCs(mergedFC,gridcodes)
+
+#Add or subtract each species' values
+mergedFlds = dict([(sppName,(curFld,upliftFld)) for sppName, curFld, upliftFld in species])
+speciesColumns = []
+removedFlds = []
+for sppName in sppNames:
+    isMerged = sppName in mergedFlds
+    if action == "add":
+        if isMerged:
+            msg("{} is already merged; skipping".format(sppName),"warning")
+            continue
+        msg("Adding {}".format(sppName))
+        sppFlds, arrCur, arrUplift = mergeTools.alignTables(gridcodes,sppNameTbls[sppName],msg)
+        sppCur, sppUplift = mergeTools.firstSpeciesValues(arrCur,arrUplift)
+        sppSumCur, sppSumUplift, sppCounts = mergeTools.speciesTotals(sppCur[:,None],sppUplift[:,None])
+        sumCur += sppSumCur
+        sumUplift += sppSumUplift
+        counts += sppCounts
+        outFlds = []
+        for fld, arrValues in zip(sppFlds[0],(sppCur,sppUplift)):
+            outFld = mergeTools.uniqueFieldName(fld,fcFlds)
+            arcpy.AddField_management(mergedFC,outFld,"DOUBLE")
+            fcFlds.append(outFld)
+            outFlds.append(outFld)
+            speciesColumns.append((outFld,arrValues))
+        species.append((sppName,outFlds[0],outFlds[1]))
+    else:
+        if not isMerged:
+            msg("{} is not merged; skipping".format(sppName),"warning")
+            continue
+        msg("Removing {}".format(sppName))
+        curFld, upliftFld = mergedFlds[sppName]
+        fcKeys, arrValues = mergeTools.readKeyedValues(mergedFC,[curFld,upliftFld])
+        sppSumCur, sppSumUplift, sppCounts = mergeTools.speciesTotals(arrValues[:,:1],arrValues[:,1:])
+        sumCur -= sppSumCur
+        sumUplift -= sppSumUplift
+        counts -= sppCounts
+        removedFlds += [curFld,upliftFld]
+        fcFlds = [fld for fld in fcFlds if not fld in (curFld,upliftFld)]
+        species = [spp for spp in species if spp[0] != sppName]
+
+#Reset the sums of catchments left without species (removing rounding error)
+sumCur[counts <= 0] = 0.0
+sumUplift[counts <= 0] = 0.0
+counts[counts < 0] = 0
+
+#Recompute the means and ranks and write them, along with any added species' values
+msg("Updating means and ranks ({}, {})".format(rankScheme,{"HUC":"by HUC","ALL":"across all HUCs","SKETCH":"across all HUCs, from HUC sketches"}[rankLevel]))
+if rankLevel == "SKETCH":
+    meanCur, meanUplift = mergeTools.meanValues(sumCur,sumUplift,counts)
+    sketchSize = int(settings.get("SketchSize",sketchTools.SKETCHSIZE))
+    breakValues, sketches = mergeTools.sketchBreakValues(mergeTools.groupSketches(meanCur,meanUplift,hucs,sketchSize),breaks)
+    for fld in (mergeTools.CURRENTRANK,mergeTools.UPLIFTRANK):
+        msg("...{}: break error bound {:.3%}".format(fld,sketchTools.sketchErrorBound(sketches[fld])))
+    columns = mergeTools.mergedColumns(sumCur,sumUplift,counts,breaks,ties,breakValues=breakValues)
+else:
+    columns = mergeTools.mergedColumns(sumCur,sumUplift,counts,breaks,ties,hucs if rankLevel == "HUC" else None)
+mergeTools.writeColumns(mergedFC,gridcodes,columns + speciesColumns)
+if removedFlds:
+    arcpy.DeleteField_management(mergedFC,removedFlds)
+
+#Keep the settings used and the merged species with the feature class
+settings["RankScheme"] = rankScheme
+settings["Ties"] = ties
+mergeTools.writeMergeInfo(mergedFC,settings,species)
+msg("{} catchments have values from at least one species".format((counts > 0).sum()))
@@ -11,6 +11,7 @@
 #
 # Import arcpy module
 import sys, os, arcpy
+import MISC_HUCIndex as hucTools
 
 # Input variables
 responseVarsFC = arcpy.GetParameterAsText(0) # Response variables feature class
@@ -37,7 +38,7 @@ def msg(txt,type="message"):
 ##--PROCESSES--
 # Filter the catchment FC
 msg("Extracting catchments within HUC {}".format(HUCFilter))
-whereClause = "REACHCODE LIKE '{}%'".format(HUCFilter)
+whereClause = hucTools.hucWhereClause([HUCFilter])
 catchFC = arcpy.Select_analysis(responseVarsFC,outRespVarsFC,whereClause)
 
 # Set the extent variable
@@ -0,0 +1,36 @@
+# fakeMaxent.py
+#
+# Description: Stands in for "java ... -jar maxent.jar ..." so the job scheduler
+#  (HABMODEL_MaxentJobs) can be tested without Java. Run as the java command, e.g.
+#  "python fakeMaxent.py -Xmx2000m -jar maxent.jar samplesfile=... threads=4 ...".
+#
+# It prints the memory and thread settings it was given (written to the job's log),
+#  sleeps for a moment (so jobs overlap), and writes the times it started and finished
+#  and a maxentResults.csv to the output directory, as MaxEnt would. It exits with 1,
+#  writing no results, if the samples file does not exist.
+#
+# Fall 2026
+
+import os, sys, time
+
+# Seconds each fake job runs
+RUNTIME = 0.5
+
+settings = dict([arg.split("=",1) for arg in sys.argv[1:] if "=" in arg])
+memory = [arg for arg in sys.argv[1:] if arg.startswith("-mx") or arg.startswith("-Xmx")]
+print("memory={} threads={}".format(",".join(memory),settings.get("threads")))
+sys.stdout.flush()
+
+startTime = time.time()
+time.sleep(RUNTIME)
+if not os.path.exists(settings.get("samplesfile","")):
+    print("samples file not found")
+    sys.exit(1)
+outDir = settings["outputdirectory"]
+if not os.path.exists(outDir): os.makedirs(outDir)
+f = open(os.path.join(outDir,"fakeMaxent.txt"),'w')
+f.write("{!r},{!r}\n".format(startTime,time.time()))
+f.close()
+f = open(os.path.join(outDir,"maxentResults.csv"),'w')
+f.write("Species,Training AUC\nFake,0.5\n")
+f.close()
@@ -0,0 +1,115 @@
+# test_CreateDataFile.py
+#
+# Description: Runs HABMODEL_CreateDataFile and HABMODEL_CreateDataFileBatch on the same
+#  made-up species and environment tables (in a scratch file geodatabase) and checks
+#  that they write identical AllHUC8Records.csv files, so running one tool after the
+#  other doesn't make the build stamps of the files downstream stale. Run from the
+#  project folder with "python -m unittest discover Tests" in ArcGIS' Python.
+#
+# Fall 2026
+
+import os, sys, csv, runpy, shutil, tempfile, unittest
+import numpy
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+scriptsFolder = os.path.join(os.path.dirname(testsFolder),"Scripts")
+sys.path.insert(0,scriptsFolder)
+try:
+    import arcpy
+    import HABMODEL_DataTools as dataTools
+    import MISC_HUCIndex as hucTools
+except ImportError:
+    arcpy = None
+
+# HUC8s of the made-up catchments, and the HUC8s in which each species is found
+HUC8S = ("03030002","03030003","03040001")
+SPECIESHUC8S = {"SppA":("03030002","03040001"),"SppB":("03030003",)}
+
+## ---Functions---
+def makeTables(gdb):
+    #Writes the species and environment tables (20 catchments in each HUC8, in shuffled
+    # table order) to the geodatabase and returns their paths. Canopy has a missing
+    # value in the last HUC8, so it is dropped for species found there. As the tools
+    # skip the first two numeric fields of the environment table, it has a FEATUREID
+    # field after GRIDCODE.
+    random = numpy.random.RandomState(7)
+    n = 20 * len(HUC8S)
+    reachcodes = numpy.array(["{}{:06d}".format(HUC8S[i // 20],i) for i in range(n)])
+    order = random.permutation(n)
+    arrEnv = numpy.zeros(n,dtype=[("GRIDCODE","i4"),("FEATUREID","i4"),("REACHCODE","U14"),("Elev","f8"),("Slope","f8"),("StreamOrde","i4"),("Canopy","f8")])
+    arrEnv["GRIDCODE"] = numpy.arange(1,n + 1)[order]
+    arrEnv["FEATUREID"] = arrEnv["GRIDCODE"] + 1000
+    arrEnv["REACHCODE"] = reachcodes[order]
+    arrEnv["Elev"] = numpy.round(random.uniform(100,900,n),3)
+    arrEnv["Slope"] = random.uniform(0,30,n)
+    arrEnv["StreamOrde"] = random.randint(1,6,n)
+    arrEnv["Canopy"] = numpy.where(arrEnv["GRIDCODE"] == n,-9999,random.uniform(0,100,n))
+    arrSpp = numpy.zeros(n,dtype=[("GRIDCODE","i4"),("REACHCODE","U14"),("SppA","i4"),("SppB","i4")])
+    arrSpp["GRIDCODE"] = arrEnv["GRIDCODE"]
+    arrSpp["REACHCODE"] = arrEnv["REACHCODE"]
+    for sppName, hucs in SPECIESHUC8S.items():
+        inHUCs = numpy.array([reachcode[:8] in hucs for reachcode in arrSpp["REACHCODE"]])
+        arrSpp[sppName] = inHUCs & (random.uniform(0,1,n) < 0.4)
+    envTbl = os.path.join(gdb,"EnvVars")
+    sppTbl = os.path.join(gdb,"Species")
+    arcpy.da.NumPyArrayToTable(arrEnv,envTbl)
+    arcpy.da.NumPyArrayToTable(arrSpp,sppTbl)
+    return sppTbl, envTbl
+
+def runTool(scriptName,args):
+    #Runs the tool's script with the parameters as its command line arguments
+    argv = sys.argv
+    sys.argv = [os.path.join(scriptsFolder,scriptName)] + list(args)
+    try:
+        runpy.run_path(sys.argv[0],run_name="__main__")
+    finally:
+        sys.argv = argv
+
+def readRows(csvFN):
+    f = open(csvFN,'r')
+    rows = list(csv.reader(f))
+    f.close()
+    return rows
+
+#The tools are run with ArcGIS' Python 2
+@unittest.skipIf(arcpy is None or sys.version_info[0] > 2,"needs arcpy and ArcGIS' Python 2")
+class CreateDataFileTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tempFolder = tempfile.mkdtemp()
+        cls.scratchFolder = hucTools.scratchFolder
+        hucTools.scratchFolder = cls.tempFolder
+        arcpy.CreateFileGDB_management(cls.tempFolder,"Test.gdb")
+        sppTbl, envTbl = makeTables(os.path.join(cls.tempFolder,"Test.gdb"))
+        cls.singleFolder = os.path.join(cls.tempFolder,"Single")
+        cls.batchFolder = os.path.join(cls.tempFolder,"Batch")
+        os.mkdir(cls.singleFolder)
+        os.mkdir(cls.batchFolder)
+        for sppName in sorted(SPECIESHUC8S):
+            runTool("HABMODEL_CreateDataFile.py",[sppTbl,sppName,envTbl,cls.singleFolder])
+        runTool("HABMODEL_CreateDataFileBatch.py",[sppTbl,";".join(sorted(SPECIESHUC8S)),envTbl,cls.batchFolder])
+
+    @classmethod
+    def tearDownClass(cls):
+        hucTools.scratchFolder = cls.scratchFolder
+        shutil.rmtree(cls.tempFolder)
+
+    def testSameFiles(self):
+        for sppName in sorted(SPECIESHUC8S):
+            singleCSV = os.path.join(self.singleFolder,sppName,"AllHUC8Records.csv")
+            batchCSV = os.path.join(self.batchFolder,sppName,"AllHUC8Records.csv")
+            self.assertEqual(dataTools.fileHash(singleCSV),dataTools.fileHash(batchCSV),"{} files differ".format(sppName))
+
+    def testRecords(self):
+        #The records of the species' HUC8s, in table order, with fields holding missing values dropped
+        rows = readRows(os.path.join(self.batchFolder,"SppA","AllHUC8Records.csv"))
+        self.assertEqual(rows[0],["Species","GRIDCODE","REACHCODE","Elev","Slope","StreamOrde"])
+        self.assertEqual(len(rows) - 1,40)
+        self.assertTrue(set([row[2][:8] for row in rows[1:]]) == set(SPECIESHUC8S["SppA"]))
+        species = [row[0] for row in rows[1:]]
+        self.assertNotEqual(species,sorted(species,reverse=True))
+        rows = readRows(os.path.join(self.batchFolder,"SppB","AllHUC8Records.csv"))
+        self.assertTrue("Canopy" in rows[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# test_DataTools.py
+#
+# Description: Checks the binary sidecar of a species CSV file (HABMODEL_DataTools) on a
+#  made-up file: columns holding only whole numbers are flagged as integers and written
+#  to the SWD file as integers, while a column of whole numbers with a missing value is
+#  not, so the missing value is written as nan rather than cast to an integer. Run from
+#  the project folder with "python -m unittest discover Tests" in ArcGIS' Python.
+#
+# Fall 2026
+
+import os, sys, csv, shutil, tempfile, unittest
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(os.path.dirname(testsFolder),"Scripts"))
+try:
+    import arcpy
+    import HABMODEL_DataTools as dataTools
+except ImportError:
+    arcpy = None
+
+# Made-up species CSV file: StreamOrde has a missing value in the third record
+CSVLINES = ["Species,GRIDCODE,REACHCODE,StreamOrde,Elev",
+            "1,101,3030002000001,2,120.5",
+            "0,102,3030002000002,3,98.25",
+            "0,103,3030002000003,,110.0",
+            "1,104,3030002000004,1,87.75"]
+
+#The SWD file is written with ArcGIS' Python 2 csv module
+@unittest.skipIf(arcpy is None or sys.version_info[0] > 2,"needs arcpy and ArcGIS' Python 2")
+class SidecarTest(unittest.TestCase):
+    def setUp(self):
+        self.tempFolder = tempfile.mkdtemp()
+        self.csvFN = os.path.join(self.tempFolder,"AllHUC8Records.csv")
+        f = open(self.csvFN,'w')
+        f.write("\n".join(CSVLINES) + "\n")
+        f.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempFolder)
+
+    def testIntegerColumns(self):
+        header, arrData = dataTools.loadRecords(self.csvFN)
+        self.assertEqual(header["integerColumns"],["Species","GRIDCODE","REACHCODE"])
+        self.assertEqual(arrData.shape,(4,5))
+
+    def testSWDFile(self):
+        swdFN = os.path.join(self.tempFolder,"Spp_SWD.csv")
+        counts = dataTools.writeSWDFile(self.csvFN,swdFN,"Spp",["SPECIES","GRIDCODE","REACHCODE","StreamOrde","Elev"])
+        self.assertEqual(counts,(2,2))
+        f = open(swdFN,'r')
+        rows = list(csv.reader(f))
+        f.close()
+        self.assertEqual(rows[0],["SPECIES","X","Y","StreamOrde","Elev"])
+        self.assertEqual(rows[1][:3],["Spp","101","3030002000001"])
+        self.assertEqual([row[3] for row in rows[1:]],["2.0","3.0","nan","1.0"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# test_HUCIndex.py
+#
+# Description: Checks that MISC_HUCIndex.tableStamp stamps only a table's own files: the
+#  files of a shapefile, or of a file geodatabase table (found through a made-up
+#  geodatabase catalog), so modifying another table in the same geodatabase doesn't
+#  make the table's HUC index or layer store stale. Run from the project folder with
+#  "python -m unittest discover Tests" in ArcGIS' Python.
+#
+# Fall 2026
+
+import os, sys, struct, shutil, tempfile, unittest
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(os.path.dirname(testsFolder),"Scripts"))
+try:
+    import arcpy
+    import MISC_HUCIndex as hucTools
+except ImportError:
+    arcpy = None
+
+# Tables of the made-up geodatabase's catalog, in row order (the fourth row deleted)
+CATALOG = ["GDB_SystemCatalog","GDB_DBTune","GDB_SpatialRefs",None,"EnvVars","Catchments"]
+
+## ---Functions---
+def writeCatalog(gdb):
+    #Writes the catalog's .gdbtable (a 40 byte header, then each row's size, null
+    # flags, name and file format) and .gdbtablx (a 16 byte header, then 5 byte row
+    # offsets), and a few files for each table
+    os.mkdir(gdb)
+    rows = b""
+    offsets = b""
+    for i in range(len(CATALOG)):
+        if CATALOG[i] is None:
+            offsets += struct.pack("<q",0)[:5]
+            continue
+        name = CATALOG[i].encode("utf-8")
+        row = struct.pack("<B",0) + struct.pack("<B",len(name)) + name + struct.pack("<i",0)
+        offsets += struct.pack("<q",40 + len(rows))[:5]
+        rows += struct.pack("<i",len(row)) + row
+        for ext in ("gdbtable","gdbtablx","gdbindexes"):
+            writeFile(os.path.join(gdb,"a{:08x}.{}".format(i + 1,ext)),ext)
+    writeFile(os.path.join(gdb,"a00000001.gdbtable"),struct.pack("<i",3) + b"\0" * 36 + rows)
+    writeFile(os.path.join(gdb,"a00000001.gdbtablx"),struct.pack("<4i",3,1,len(CATALOG),5) + offsets)
+
+def writeFile(fileName,contents):
+    if not isinstance(contents,bytes): contents = contents.encode("utf-8")
+    f = open(fileName,"wb")
+    f.write(contents)
+    f.close()
+
+def touchFile(fileName,secondsLater):
+    #Moves the file's modification time forward
+    st = os.stat(fileName)
+    os.utime(fileName,(st.st_atime,st.st_mtime + secondsLater))
+
+@unittest.skipIf(arcpy is None,"arcpy is not available")
+class TableStampTest(unittest.TestCase):
+    def setUp(self):
+        self.tempFolder = tempfile.mkdtemp()
+        self.gdb = os.path.join(self.tempFolder,"Test.gdb")
+        writeCatalog(self.gdb)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempFolder)
+
+    def testGDBTableFiles(self):
+        self.assertEqual(sorted(hucTools.gdbTableFiles(self.gdb,"catchments")),
+                         [os.path.join(self.gdb,"a00000006.{}".format(ext)) for ext in ("gdbindexes","gdbtable","gdbtablx")])
+        self.assertEqual(len(hucTools.gdbTableFiles(self.gdb,"EnvVars")),3)
+        self.assertEqual(hucTools.gdbTableFiles(self.gdb,"Flowlines"),None)
+        self.assertEqual(hucTools.gdbTableFiles(self.tempFolder,"Catchments"),None)
+
+    def testGDBTableStamp(self):
+        tbl = os.path.join(self.gdb,"Catchments")
+        stamp = hucTools.tableStamp(tbl)
+        self.assertNotEqual(stamp,None)
+        #Other tables' files and the geodatabase's other files don't change the stamp
+        touchFile(os.path.join(self.gdb,"a00000005.gdbtable"),10)
+        writeFile(os.path.join(self.gdb,"timestamps"),"changed")
+        self.assertEqual(hucTools.tableStamp(tbl),stamp)
+        #The table's own files do
+        touchFile(os.path.join(self.gdb,"a00000006.gdbindexes"),10)
+        self.assertNotEqual(hucTools.tableStamp(tbl),stamp)
+        self.assertEqual(hucTools.tableStamp(os.path.join(self.gdb,"Flowlines")),None)
+
+    def testShapefileStamp(self):
+        for ext in ("shp","shx","dbf"):
+            writeFile(os.path.join(self.tempFolder,"Catchments.{}".format(ext)),ext)
+        writeFile(os.path.join(self.tempFolder,"Flowlines.dbf"),"dbf")
+        tbl = os.path.join(self.tempFolder,"Catchments.shp")
+        stamp = hucTools.tableStamp(tbl)
+        touchFile(os.path.join(self.tempFolder,"Flowlines.dbf"),10)
+        self.assertEqual(hucTools.tableStamp(tbl),stamp)
+        touchFile(os.path.join(self.tempFolder,"Catchments.dbf"),10)
+        self.assertNotEqual(hucTools.tableStamp(tbl),stamp)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# test_MaxentJobs.py
+#
+# Description: Runs MaxEnt batch files through the job scheduler of HABMODEL_MaxentJobs
+#  with a fake MaxEnt (Fixtures\FakeMaxent\fakeMaxent.py) in place of Java, and checks
+#  the thread and memory split, the rewritten commands, the per-job log files, the
+#  number of jobs run at once and the stamps of finished jobs. Run from the project
+#  folder with "python -m unittest discover Tests" in ArcGIS' Python (the scheduler's
+#  stamps import HABMODEL_DataTools, which needs arcpy).
+#
+# Fall 2026
+
+import os, sys, shutil, tempfile, unittest
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(os.path.dirname(testsFolder),"Scripts"))
+try:
+    import HABMODEL_MaxentJobs as maxentJobs
+except ImportError:
+    maxentJobs = None
+
+fakeMaxent = os.path.join(testsFolder,"Fixtures","FakeMaxent","fakeMaxent.py")
+
+## ---Functions---
+def writeJob(sppFolder,samplesFN):
+    #Writes a samples file (unless None) and a RunMaxent.bat laid out as
+    # HABMODEL_CreateMaxentBatchFile writes it, and returns the batch file
+    os.makedirs(sppFolder)
+    samplesPath = os.path.join(sppFolder,"missing_SWD.csv")
+    if samplesFN:
+        samplesPath = os.path.join(sppFolder,samplesFN)
+        f = open(samplesPath,'w')
+        f.write("Species,X,Y,Elev\n")
+        f.close()
+    batchFN = os.path.join(sppFolder,"RunMaxent.bat")
+    f = open(batchFN,'w')
+    f.write("java -mx2048m -jar maxent.jar samplesfile={0} environmentallayers={0} outputdirectory={1} threads=1 autorun=false\n".format(
+        samplesPath,os.path.join(sppFolder,"Output")))
+    f.close()
+    return batchFN
+
+def readLog(batchFN):
+    f = open(maxentJobs.logFilename(batchFN),'r')
+    log = f.read()
+    f.close()
+    return log
+
+@unittest.skipIf(maxentJobs is None,"arcpy is not available")
+class ResourcesTest(unittest.TestCase):
+    def testAllocateResources(self):
+        self.assertEqual(maxentJobs.allocateResources(4,2,8,4000),(4,2000))
+        self.assertEqual(maxentJobs.allocateResources(1,4,8,4000),(8,4000))
+        self.assertEqual(maxentJobs.allocateResources(10,3,2),(1,None))
+        self.assertEqual(maxentJobs.allocateResources(3,0,8,None),(8,None))
+
+    def testSetJobResources(self):
+        cmd = maxentJobs.setJobResources("java -mx512m -jar maxent.jar threads=1 autorun=false",4,2000)
+        self.assertEqual(cmd,"java -Xmx2000m -jar maxent.jar threads=4 autorun=true")
+        cmd = maxentJobs.setJobResources("java -jar maxent.jar",2,1000,"fake")
+        self.assertEqual(cmd,"fake -Xmx1000m -jar maxent.jar threads=2 autorun=true")
+        cmd = maxentJobs.setJobResources("java -Xmx512m -jar maxent.jar",2)
+        self.assertEqual(cmd,"java -Xmx512m -jar maxent.jar threads=2 autorun=true")
+
+@unittest.skipIf(maxentJobs is None,"arcpy is not available")
+class RunJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.tempFolder = tempfile.mkdtemp()
+        self.pollInterval = maxentJobs.POLLINTERVAL
+        maxentJobs.POLLINTERVAL = 0.1
+        self.javaCmd = '"{}" "{}"'.format(sys.executable,fakeMaxent)
+
+    def tearDown(self):
+        maxentJobs.POLLINTERVAL = self.pollInterval
+        shutil.rmtree(self.tempFolder)
+
+    def testRunJobs(self):
+        jobs = [writeJob(os.path.join(self.tempFolder,"Spp{}".format(i)),"Spp{}_SWD.csv".format(i)) for i in range(4)]
+        self.assertEqual(maxentJobs.findJobs(self.tempFolder),jobs)
+        results = maxentJobs.runJobs(jobs,2,8,4000,self.javaCmd)
+        self.assertEqual(sorted([batchFN for batchFN, returnCode, runTime in results]),jobs)
+        self.assertEqual([returnCode for batchFN, returnCode, runTime in results],[0] * 4)
+        times = []
+        for batchFN in jobs:
+            #The log holds the rewritten command and the job's output
+            log = readLog(batchFN)
+            self.assertTrue(" -Xmx2000m " in log.splitlines()[0])
+            self.assertTrue(" threads=4 " in log.splitlines()[0])
+            self.assertTrue("autorun=true" in log.splitlines()[0])
+            self.assertTrue("memory=-Xmx2000m threads=4" in log)
+            outDir = os.path.join(os.path.dirname(batchFN),"Output")
+            self.assertTrue(os.path.exists(os.path.join(outDir,"maxentResults.csv")))
+            f = open(os.path.join(outDir,"fakeMaxent.txt"),'r')
+            times.append([float(value) for value in f.read().split(",")])
+            f.close()
+        #No more than two jobs ran at once
+        for startTime, endTime in times:
+            self.assertTrue(len([1 for start, end in times if start < endTime and end > startTime]) <= 2)
+        #Finished jobs are stamped and skipped when up to date
+        self.assertEqual(maxentJobs.runJobs(jobs,2,8,4000,self.javaCmd,skipUpToDate=True),[])
+
+    def testFailedJob(self):
+        batchFN = writeJob(os.path.join(self.tempFolder,"Failed"),None)
+        results = maxentJobs.runJobs([batchFN],0,2,None,self.javaCmd)
+        self.assertEqual(results[0][1],1)
+        self.assertTrue("samples file not found" in readLog(batchFN))
+        self.assertFalse(os.path.exists(maxentJobs.jobStampFilename(batchFN)))
+        self.assertFalse(maxentJobs.jobIsUpToDate(batchFN))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+# test_MaxentLambdas.py
+#
+# Description: Checks the predictions of MAXENT_Lambdas against those maxent.jar made
+#  for the same model (see Fixtures\MaxEnt\README.txt). Run from the project folder
+#  with "python -m unittest discover Tests".
+#
+# Fall 2026
+
+import os, sys, csv, unittest
+import numpy
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(os.path.dirname(testsFolder),"Scripts"))
+import MAXENT_Lambdas as maxentLambdas
+
+fixtureFolder = os.path.join(testsFolder,"Fixtures","MaxEnt")
+
+## ---Functions---
+def readCSV(csvFN):
+    #Returns the header and rows of the CSV file
+    f = open(csvFN,'r')
+    rows = list(csv.reader(f))
+    f.close()
+    return rows[0], rows[1:]
+
+def readFixtureData():
+    #Returns the SWD file's labels, X values (GRIDCODEs) and a dictionary of its variables' values
+    header, rows = readCSV(os.path.join(fixtureFolder,"Fixture_SWD.csv"))
+    arrData = numpy.array([row[3:] for row in rows],dtype="float64")
+    data = dict([(header[i + 3],arrData[:,i]) for i in range(len(header) - 3)])
+    return [row[0] for row in rows], [float(row[1]) for row in rows], data
+
+class LambdasTest(unittest.TestCase):
+    def setUp(self):
+        self.model = maxentLambdas.readLambdas(os.path.join(fixtureFolder,"Output","Fixture.lambdas"))
+        self.labels, self.xValues, self.data = readFixtureData()
+
+    def testPresencePredictions(self):
+        #Raw and logistic predictions of the presences, which MaxEnt writes at full precision
+        header, rows = readCSV(os.path.join(fixtureFolder,"Output","Fixture_samplePredictions.csv"))
+        isPresence = numpy.array([label == "Fixture" for label in self.labels])
+        raw = maxentLambdas.predict(self.model,self.data,"raw")[isPresence]
+        logistic = maxentLambdas.predict(self.model,self.data,"logistic")[isPresence]
+        maxentRaw = numpy.array([float(row[3]) for row in rows])
+        maxentLogistic = numpy.array([float(row[5]) for row in rows])
+        self.assertEqual(len(raw),len(maxentRaw))
+        self.assertTrue(numpy.abs(raw / maxentRaw - 1).max() < 1e-5)
+        self.assertTrue(numpy.abs(logistic - maxentLogistic).max() < 1e-5)
+
+    def testAllPredictions(self):
+        #Logistic predictions of all records, matched by X (GRIDCODE)
+        header, rows = readCSV(os.path.join(fixtureFolder,"Output","Fixture.csv"))
+        logistic = dict(zip(self.xValues,maxentLambdas.predict(self.model,self.data,"logistic")))
+        self.assertEqual(len(rows),len(self.labels))
+        diffs = [abs(logistic[float(row[0])] - float(row[2])) for row in rows]
+        self.assertTrue(max(diffs) < 1e-5)
+
+    def testMissingValues(self):
+        #Records missing a model variable are given the NODATA value
+        data = dict([(name,values[:3].copy()) for name, values in self.data.items()])
+        data["Elev"][1] = numpy.nan
+        predictions = maxentLambdas.predict(self.model,data,"logistic")
+        self.assertEqual(predictions[1],maxentLambdas.NODATA)
+        self.assertNotEqual(predictions[0],maxentLambdas.NODATA)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# test_MaxentTrainer.py
+#
+# Description: Trains a model with MAXENT_Trainer on the SWD file of the maxent.jar
+#  fixture (see Fixtures\MaxEnt\README.txt) and compares its training statistics with
+#  those of maxent.jar. Run from the project folder with "python -m unittest discover
+#  Tests".
+#
+# Margins: the trainer approximates maxent.jar (see MAXENT_Trainer), so its training
+#  AUC must be within 0.01 and its regularized and unregularized training gains within
+#  0.02 of maxent.jar's.
+#
+# Fall 2026
+
+import os, sys, csv, shutil, tempfile, unittest
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(os.path.dirname(testsFolder),"Scripts"))
+import MAXENT_Trainer as maxentTrainer
+
+fixtureFolder = os.path.join(testsFolder,"Fixtures","MaxEnt")
+
+# Margins of the trainer's statistics from maxent.jar's
+AUCMARGIN = 0.01
+GAINMARGIN = 0.02
+
+## ---Functions---
+def readResults(resultsFN):
+    #Returns the values of maxentResults.csv as a dictionary
+    f = open(resultsFN,'r')
+    reader = csv.reader(f)
+    header = next(reader)
+    values = next(reader)
+    f.close()
+    return dict(zip(header,values))
+
+#The trainer writes its CSV files as Python 2 (ArcGIS) writes them
+@unittest.skipIf(sys.version_info[0] > 2,"MAXENT_Trainer is run with ArcGIS' Python 2")
+class TrainerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tempFolder = tempfile.mkdtemp()
+        sppFolder = os.path.join(cls.tempFolder,"Fixture")
+        os.mkdir(sppFolder)
+        shutil.copyfile(os.path.join(fixtureFolder,"Fixture_SWD.csv"),os.path.join(sppFolder,"Fixture_SWD.csv"))
+        maxentTrainer.trainSpecies(sppFolder,"Fixture")
+        cls.outFolder = os.path.join(sppFolder,"Output")
+        cls.results = readResults(os.path.join(cls.outFolder,"maxentResults.csv"))
+        cls.maxentResults = readResults(os.path.join(fixtureFolder,"Output","maxentResults.csv"))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tempFolder)
+
+    def testTrainingAUC(self):
+        diff = abs(float(self.results["Training AUC"]) - float(self.maxentResults["Training AUC"]))
+        self.assertTrue(diff <= AUCMARGIN,"Training AUC differs from maxent.jar's by {}".format(diff))
+
+    def testTrainingGain(self):
+        for field in ("Regularized training gain","Unregularized training gain"):
+            diff = abs(float(self.results[field]) - float(self.maxentResults[field]))
+            self.assertTrue(diff <= GAINMARGIN,"{} differs from maxent.jar's by {}".format(field,diff))
+
+    def testTrainerRecorded(self):
+        #The outputs record the trainer and its settings
+        self.assertEqual(self.results["Trainer"],maxentTrainer.TRAINER)
+        self.assertEqual(int(self.results["Hinge and threshold knots"]),maxentTrainer.KNOTS)
+        self.assertEqual(int(self.results["Maximum background points"]),maxentTrainer.MAXBACKGROUND)
+        f = open(os.path.join(self.outFolder,"maxent.log"),'r')
+        log = f.read()
+        f.close()
+        self.assertTrue(maxentTrainer.TRAINER in log.splitlines()[0])
+        self.assertTrue("Trainer: {}".format(maxentTrainer.TRAINER) in log)
+
+    def testThresholdField(self):
+        #The threshold read by MAXENT_DisplayModelResults and MAXENT_SavePredictions
+        threshold = float(self.results[maxentTrainer.BALANCEFIELD + " logistic threshold"])
+        self.assertTrue(0 < threshold < 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+# test_MergeTools.py
+#
+# Description: Checks the functions of UPLIFT_MergeTools used by UPLIFT_MergeUpliftResults
+#  and UPLIFT_UpdateMergedSpecies on made-up values: the quantile ranks (tie handling,
+#  and deciles matching the row by row "ceiling" ranking they replaced), the ranking
+#  schemes, the species totals and means, the combining of HUCs, and adding then
+#  removing a species of a merged table. Run from the project folder with
+#  "python -m unittest discover Tests" in ArcGIS' Python.
+#
+# Two changes from the row by row merge are checked as intended: means are taken over
+#  the species with values for a catchment (rather than being null if any species has
+#  none), and catchments without a value get rank 0.
+#
+# Fall 2026
+
+import os, sys, runpy, shutil, tempfile, unittest
+import numpy
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+scriptsFolder = os.path.join(os.path.dirname(testsFolder),"Scripts")
+sys.path.insert(0,scriptsFolder)
+try:
+    import arcpy
+    import UPLIFT_MergeTools as mergeTools
+except ImportError:
+    arcpy = None
+
+# Made-up HUCs and the species found in each
+HUCS = ("03030002","03030003")
+SPECIESHUCS = {"SppA":HUCS,"SppB":("03030002",),"SppC":HUCS}
+
+## ---Functions---
+def ceilingRanks(values):
+    #Returns the decile of each value as the row by row ranking gave them: walking the
+    # values in increasing order, moving to the next decile once the count passes its
+    # ceiling (a running sum of n / 10)
+    decileSize = len(values) / 10.0
+    decile = 1
+    ceiling = decileSize
+    ranks = numpy.zeros(len(values),dtype="int32")
+    counter = 1
+    for i in numpy.argsort(values,kind="mergesort"):
+        if counter > ceiling:
+            ceiling += decileSize
+            decile += 1
+        ranks[i] = decile
+        counter += 1
+    return ranks
+
+def makeSpeciesTables(gdb,random):
+    #Writes the uplift table of each species in each of its HUCs (20 catchments per HUC,
+    # GRIDCODEs 1-20 and 21-40, a few missing from each table) and returns a dictionary
+    # of the tables of each species
+    sppTbls = {}
+    for sppName in sorted(SPECIESHUCS):
+        sppTbls[sppName] = []
+        for huc in SPECIESHUCS[sppName]:
+            start = 1 + 20 * HUCS.index(huc)
+            gridcodes = numpy.arange(start,start + 20)
+            gridcodes = gridcodes[random.uniform(0,1,20) < 0.8]
+            arrSpp = numpy.zeros(len(gridcodes),dtype=[("GRIDCODE","i4"),(sppName + "_cur","f8"),(sppName + "_BU","f8"),(sppName + "_uplift","f8")])
+            arrSpp["GRIDCODE"] = gridcodes
+            arrSpp[sppName + "_cur"] = random.uniform(0,1,len(gridcodes))
+            arrSpp[sppName + "_BU"] = random.uniform(0,1,len(gridcodes))
+            arrSpp[sppName + "_uplift"] = arrSpp[sppName + "_BU"] - arrSpp[sppName + "_cur"]
+            sppTbl = os.path.join(gdb,"{}_{}".format(sppName,huc))
+            arcpy.da.NumPyArrayToTable(arrSpp,sppTbl)
+            sppTbls[sppName].append(sppTbl)
+    return sppTbls
+
+def makeMergedTable(mergedTbl,sppTbls,sppNames):
+    #Writes a merged table of the species (as UPLIFT_MergeUpliftResults does, ranked
+    # within each HUC) for 41 catchments, the last without any species
+    gridcodes = numpy.arange(1,42)
+    hucs = numpy.array([HUCS[min(i // 20,1)] for i in range(len(gridcodes))])
+    columns = []
+    species = []
+    allCur, allUplift = [], []
+    for sppName in sppNames:
+        sppFlds, arrCur, arrUplift = mergeTools.alignTables(gridcodes,sppTbls[sppName])
+        sppCur, sppUplift = mergeTools.firstSpeciesValues(arrCur,arrUplift)
+        columns += [(sppFlds[0][0],sppCur),(sppFlds[0][1],sppUplift)]
+        species.append((sppName,sppFlds[0][0],sppFlds[0][1]))
+        allCur.append(sppCur)
+        allUplift.append(sppUplift)
+    sumCur, sumUplift, counts = mergeTools.speciesTotals(numpy.column_stack(allCur),numpy.column_stack(allUplift))
+    columns += mergeTools.mergedColumns(sumCur,sumUplift,counts,mergeTools.rankBreaks("deciles"),"min",hucs)
+    dtype = [("GRIDCODE","i4"),(mergeTools.HUCFIELD,"U8")] + [(fld,"i4" if values.dtype.kind == "i" else "f8") for fld, values in columns]
+    arrMerged = numpy.zeros(len(gridcodes),dtype=dtype)
+    arrMerged["GRIDCODE"] = gridcodes
+    arrMerged[mergeTools.HUCFIELD] = hucs
+    arcpy.da.NumPyArrayToTable(arrMerged,mergedTbl)
+    mergeTools.writeColumns(mergedTbl,gridcodes,columns)
+    mergeTools.writeMergeInfo(mergedTbl,{"RankScheme":"deciles","Ties":"min","RankLevel":"HUC"},species)
+
+def readTable(tbl,flds):
+    #Returns a dictionary of each field's values (nulls read as NaN) in GRIDCODE order
+    gridcodes, arrValues = mergeTools.readKeyedValues(tbl,flds)
+    order = numpy.argsort(gridcodes)
+    return dict([(flds[i],arrValues[order,i]) for i in range(len(flds))])
+
+def runTool(scriptName,args):
+    #Runs the tool's script with the parameters as its command line arguments
+    argv = sys.argv
+    sys.argv = [os.path.join(scriptsFolder,scriptName)] + list(args)
+    try:
+        runpy.run_path(sys.argv[0],run_name="__main__")
+    finally:
+        sys.argv = argv
+
+@unittest.skipIf(arcpy is None,"arcpy is not available")
+class QuantileRanksTest(unittest.TestCase):
+    def testRankBreaks(self):
+        self.assertTrue(numpy.allclose(mergeTools.rankBreaks("deciles"),numpy.arange(1,10) / 10.0))
+        self.assertTrue(numpy.allclose(mergeTools.rankBreaks("Quartiles"),[0.25,0.5,0.75]))
+        self.assertEqual(len(mergeTools.rankBreaks("percentiles")),99)
+        self.assertTrue(numpy.allclose(mergeTools.rankBreaks("0.9;0.5;0.5"),[0.5,0.9]))
+        for scheme in ("tertiles","0.5;1.0","0;0.5",";"):
+            self.assertRaises(ValueError,mergeTools.rankBreaks,scheme)
+
+    def testTies(self):
+        #Positions of the tied 2s: 2 and 3 of 5, in the first half or not
+        values = numpy.array([3,1,2,2,5],dtype="float64")
+        breaks = [0.5]
+        self.assertEqual(mergeTools.quantileRanks(values,breaks,"min").tolist(),[2,1,1,1,2])
+        self.assertEqual(mergeTools.quantileRanks(values,breaks,"max").tolist(),[2,1,2,2,2])
+        self.assertEqual(mergeTools.quantileRanks(values,breaks,"ordinal").tolist(),[2,1,1,2,2])
+        self.assertRaises(ValueError,mergeTools.quantileRanks,values,breaks,"dense")
+
+    def testNaNRankZero(self):
+        values = numpy.array([numpy.nan,0.4,0.1,numpy.nan,0.2,0.3])
+        ranks = mergeTools.quantileRanks(values,mergeTools.rankBreaks("quartiles"))
+        self.assertEqual(ranks.tolist(),[0,4,1,0,2,3])
+        self.assertEqual(mergeTools.quantileRanks(numpy.array([numpy.nan,numpy.nan]),[0.5]).tolist(),[0,0])
+
+    def testCeilingDeciles(self):
+        #The ceiling walk put the last value of some counts (e.g. 11) in an 11th decile,
+        # its running ceiling falling just short of n; otherwise the deciles are the same
+        deciles = mergeTools.rankBreaks("deciles")
+        random = numpy.random.RandomState(3)
+        for n in list(range(10,300)) + [1234,5000]:
+            values = random.permutation(n) / float(n)
+            oldRanks = numpy.minimum(ceilingRanks(values),10)
+            for ties in ("min","max","ordinal"):
+                self.assertEqual(mergeTools.quantileRanks(values,deciles,ties).tolist(),oldRanks.tolist(),"{} values, {}".format(n,ties))
+        #With ties, "ordinal" follows the table order as the walk did
+        values = numpy.round(random.uniform(0,1,500),1)
+        self.assertEqual(mergeTools.quantileRanks(values,deciles,"ordinal").tolist(),numpy.minimum(ceilingRanks(values),10).tolist())
+
+    def testGroupRanks(self):
+        values = numpy.array([1,2,3,4,10,20,30,40],dtype="float64")
+        groups = numpy.array(["a","a","a","a","b","b","b","b"])
+        self.assertEqual(mergeTools.groupQuantileRanks(values,[0.5],"min",groups).tolist(),[1,1,2,2,1,1,2,2])
+        self.assertEqual(mergeTools.groupQuantileRanks(values,[0.5],"min").tolist(),[1,1,1,1,2,2,2,2])
+
+@unittest.skipIf(arcpy is None,"arcpy is not available")
+class SpeciesTotalsTest(unittest.TestCase):
+    def testTotalsAndMeans(self):
+        #Catchment 2 has only species 1, catchment 3 has species 2 missing its uplift,
+        # and catchment 4 has no species
+        nan = numpy.nan
+        arrCur = numpy.array([[0.2,0.4],[0.6,nan],[0.5,0.9],[nan,nan]])
+        arrUplift = numpy.array([[0.1,0.3],[0.2,nan],[0.4,nan],[nan,nan]])
+        sumCur, sumUplift, counts = mergeTools.speciesTotals(arrCur,arrUplift)
+        self.assertTrue(numpy.allclose(sumCur,[0.6,0.6,0.5,0.0]))
+        self.assertTrue(numpy.allclose(sumUplift,[0.4,0.2,0.4,0.0]))
+        self.assertEqual(counts.tolist(),[2,1,1,0])
+        meanCur, meanUplift = mergeTools.meanValues(sumCur,sumUplift,counts)
+        self.assertTrue(numpy.allclose(meanCur[:3],[0.3,0.6,0.5]))
+        self.assertTrue(numpy.allclose(meanUplift[:3],[0.2,0.2,0.4]))
+        self.assertTrue(numpy.isnan(meanCur[3]) and numpy.isnan(meanUplift[3]))
+
+    def testMergedColumns(self):
+        sumCur = numpy.array([0.6,0.6,0.5,0.0])
+        sumUplift = numpy.array([0.4,0.2,0.4,0.0])
+        counts = numpy.array([2,1,1,0],dtype="int32")
+        columns = dict(mergeTools.mergedColumns(sumCur,sumUplift,counts,[0.5]))
+        self.assertEqual(columns[mergeTools.CURRENTRANK].tolist(),[1,2,2,0])
+        self.assertEqual(columns[mergeTools.UPLIFTRANK].tolist(),[1,1,2,0])
+        self.assertEqual(columns[mergeTools.SPPCOUNT].tolist(),[2,1,1,0])
+
+    def testCombineHUCs(self):
+        #GRIDCODE 3 is in both HUCs; its first copy (from the first HUC) is kept
+        nan = numpy.nan
+        results = [(numpy.array([1,2,3]),["SppA","SppB"],[("SppA_cur","SppA_uplift"),("SppB_cur","SppB_uplift")],
+                    numpy.array([[0.1,0.2],[0.3,nan],[0.5,0.6]]),numpy.array([[1.0,2.0],[3.0,nan],[5.0,6.0]])),
+                   (numpy.array([3,4]),["SppC","SppA"],[("SppC_cur","SppC_uplift"),("SppA_cur_1","SppA_uplift_1")],
+                    numpy.array([[0.7,0.8],[0.9,0.0]]),numpy.array([[7.0,8.0],[9.0,0.0]]))]
+        gridcodes, hucIndex, sppNames, sppFlds, arrCur, arrUplift = mergeTools.combineHUCs(results)
+        self.assertEqual(gridcodes.tolist(),[1,2,3,4])
+        self.assertEqual(hucIndex.tolist(),[0,0,0,1])
+        self.assertEqual(sppNames,["SppA","SppB","SppC"])
+        self.assertEqual(sppFlds,[("SppA_cur","SppA_uplift"),("SppB_cur","SppB_uplift"),("SppC_cur","SppC_uplift")])
+        expected = numpy.array([[0.1,0.2,nan],[0.3,nan,nan],[0.5,0.6,nan],[0.0,nan,0.9]])
+        self.assertTrue(numpy.allclose(arrCur,expected,equal_nan=True))
+        self.assertTrue(numpy.allclose(arrUplift,expected * 10,equal_nan=True))
+
+    def testFirstSpeciesValues(self):
+        #Each catchment keeps the values of the first table with a value for it
+        nan = numpy.nan
+        arrCur = numpy.array([[0.1,0.2],[nan,0.3],[nan,nan],[0.4,nan]])
+        arrUplift = numpy.array([[1.0,2.0],[nan,3.0],[nan,nan],[4.0,nan]])
+        sppCur, sppUplift = mergeTools.firstSpeciesValues(arrCur,arrUplift)
+        self.assertTrue(numpy.allclose(sppCur,[0.1,0.3,nan,0.4],equal_nan=True))
+        self.assertTrue(numpy.allclose(sppUplift,[1.0,3.0,nan,4.0],equal_nan=True))
+
+#The tool is run with ArcGIS' Python 2
+@unittest.skipIf(arcpy is None or sys.version_info[0] > 2,"needs arcpy and ArcGIS' Python 2")
+class UpdateMergedSpeciesTest(unittest.TestCase):
+    def setUp(self):
+        self.tempFolder = tempfile.mkdtemp()
+        arcpy.CreateFileGDB_management(self.tempFolder,"Test.gdb")
+        gdb = os.path.join(self.tempFolder,"Test.gdb")
+        self.sppTbls = makeSpeciesTables(gdb,numpy.random.RandomState(11))
+        self.mergedTbl = os.path.join(gdb,"BU_Uplift")
+        makeMergedTable(self.mergedTbl,self.sppTbls,["SppA","SppB"])
+
+    def tearDown(self):
+        shutil.rmtree(self.tempFolder)
+
+    def testAddThenRemove(self):
+        totalFlds = [mergeTools.SUMLIKELIHOOD,mergeTools.SUMUPLIFT,mergeTools.SPPCOUNT,
+                     mergeTools.MEANLIKELIHOOD,mergeTools.MEANUPLIFT,mergeTools.CURRENTRANK,mergeTools.UPLIFTRANK]
+        original = readTable(self.mergedTbl,totalFlds)
+        originalFlds = [fld.name for fld in arcpy.ListFields(self.mergedTbl)]
+        originalSettings, originalSpecies = mergeTools.readMergeInfo(self.mergedTbl)
+        #Catchment 41 has no species: no mean and rank 0
+        self.assertTrue(numpy.isnan(original[mergeTools.MEANLIKELIHOOD][-1]))
+        self.assertEqual(original[mergeTools.CURRENTRANK][-1],0)
+
+        #Adding SppC (both its HUC tables) matches merging the three species at once
+        runTool("UPLIFT_UpdateMergedSpecies.py",[self.mergedTbl,";".join(self.sppTbls["SppC"]),"Add"])
+        added = readTable(self.mergedTbl,totalFlds + ["SppC_cur","SppC_uplift"])
+        allTbl = os.path.join(os.path.dirname(self.mergedTbl),"All_Uplift")
+        makeMergedTable(allTbl,self.sppTbls,["SppA","SppB","SppC"])
+        merged = readTable(allTbl,totalFlds + ["SppC_cur","SppC_uplift"])
+        for fld in merged:
+            self.assertTrue(numpy.allclose(added[fld],merged[fld],equal_nan=True),"{} differs after adding".format(fld))
+        self.assertEqual([spp[0] for spp in mergeTools.readMergeInfo(self.mergedTbl)[1]],["SppA","SppB","SppC"])
+
+        #Removing it returns the original totals, means, ranks, fields and merge tables
+        runTool("UPLIFT_UpdateMergedSpecies.py",[self.mergedTbl,self.sppTbls["SppC"][0],"Remove"])
+        removed = readTable(self.mergedTbl,totalFlds)
+        for fld in totalFlds:
+            self.assertTrue(numpy.allclose(removed[fld],original[fld],equal_nan=True),"{} differs after removing".format(fld))
+        self.assertEqual([fld.name for fld in arcpy.ListFields(self.mergedTbl)],originalFlds)
+        self.assertEqual(mergeTools.readMergeInfo(self.mergedTbl),(originalSettings,originalSpecies))
+
+if __name__ == "__main__":
+    unittest.main()
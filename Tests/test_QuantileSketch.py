@@ -0,0 +1,90 @@
+# test_QuantileSketch.py
+#
+# Description: Checks the rank error of the quantile sketches of UPLIFT_QuantileSketch
+#  (used by UPLIFT_MergeUpliftResults to rank catchments statewide) on synthetic data:
+#  means of 25 made-up HUCs of 500 to 20000 catchments each, sketched separately and
+#  merged as the HUCs' worker processes do. Run from the project folder with
+#  "python -m unittest discover Tests".
+#
+# The documented error: the exact position of each break value is within the sketch's
+#  error bound of the break's position, the bound is at most log2(n / k) / k of the n
+#  values, and a sketch of fewer than k values is exact.
+#
+# Fall 2026
+
+import os, sys, unittest
+import numpy
+
+testsFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(os.path.dirname(testsFolder),"Scripts"))
+import UPLIFT_QuantileSketch as sketchTools
+
+# Percentile and decile breaks
+BREAKS = numpy.arange(1,100) / 100.0
+DECILES = numpy.arange(1,10) / 10.0
+
+## ---Functions---
+def hucValues(seed):
+    #Returns a list of arrays of made-up mean values of 25 HUCs, each with its own
+    # distribution, rounded so some values are tied
+    random = numpy.random.RandomState(seed)
+    return [numpy.round(random.lognormal(random.uniform(-1,1),random.uniform(0.3,1.0),random.randint(500,20000)),3) for i in range(25)]
+
+def exactRanks(values,breaks):
+    #Returns the exact quantile class of each value, tied values being given their
+    # lowest position (as UPLIFT_MergeTools.quantileRanks with "min")
+    sortedValues = numpy.sort(values)
+    positions = numpy.searchsorted(sortedValues,values,"left") + 1
+    return 1 + numpy.searchsorted(breaks,positions / float(len(values)),"left"), positions
+
+class QuantileSketchTest(unittest.TestCase):
+    def setUp(self):
+        self.hucs = hucValues(42)
+        self.values = numpy.concatenate(self.hucs)
+
+    def mergedSketch(self,k):
+        return sketchTools.mergeSketches([sketchTools.updateSketch(sketchTools.newSketch(k),values) for values in self.hucs])
+
+    def testBreakError(self):
+        #The break values' exact positions are within the bound, which is within the documented bound
+        n = len(self.values)
+        for k in (50,200,2000):
+            sketch = self.mergedSketch(k)
+            self.assertEqual(sketch["n"],n)
+            bound = sketchTools.sketchErrorBound(sketch)
+            breakValues = sketchTools.sketchQuantiles(sketch,BREAKS)
+            self.assertTrue(sketchTools.breakError(self.values,BREAKS,breakValues) <= bound)
+            self.assertTrue(bound <= numpy.log2(n / float(k)) / k)
+
+    def testRanks(self):
+        #Decile ranks differ from the exact ranks only for values within the bound of a
+        # break, and then by one class
+        sketch = self.mergedSketch(sketchTools.SKETCHSIZE)
+        ranks = sketchTools.breakRanks(self.values,sketchTools.sketchQuantiles(sketch,DECILES))
+        exact, positions = exactRanks(self.values,DECILES)
+        n = len(self.values)
+        errorPositions = sketchTools.sketchErrorBound(sketch) * n
+        distance = numpy.abs(positions[:,None] - sketchTools.sketchPositions(n,DECILES)[None,:]).min(axis=1)
+        isFar = distance > errorPositions + 1
+        self.assertTrue(isFar.sum() > 0.9 * n)
+        self.assertTrue((ranks[isFar] == exact[isFar]).all())
+        self.assertTrue((numpy.abs(ranks - exact) <= 1).all())
+
+    def testExactSketch(self):
+        #A sketch of fewer than k values has no error and gives the exact ranks
+        values = self.hucs[0][:400]
+        sketch = sketchTools.updateSketch(sketchTools.newSketch(500),values)
+        self.assertEqual(sketchTools.sketchErrorBound(sketch),0.0)
+        ranks = sketchTools.breakRanks(values,sketchTools.sketchQuantiles(sketch,BREAKS))
+        self.assertTrue((ranks == exactRanks(values,BREAKS)[0]).all())
+
+    def testNaN(self):
+        #NaN values are skipped by the sketch and ranked 0
+        values = numpy.array([0.3,numpy.nan,0.1,0.2])
+        sketch = sketchTools.updateSketch(sketchTools.newSketch(),values)
+        self.assertEqual(sketch["n"],3)
+        ranks = sketchTools.breakRanks(values,sketchTools.sketchQuantiles(sketch,[0.5]))
+        self.assertEqual(ranks.tolist(),[2,0,1,2])
+
+if __name__ == "__main__":
+    unittest.main()